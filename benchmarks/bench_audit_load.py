@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Load test for the CERL-Preemptive audit trail API.
+
+Starts the audit server in-process over a synthetic ledger (or targets
+--url) and drives it with many concurrent keep-alive clients, reporting
+throughput and p50/p99 request latency.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from http.server import HTTPServer
+from urllib.parse import urlsplit
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive import audit_trail_api
+from cerl_preemptive.consent_ledger import LedgerWriter
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def drive(host, port, path, clients, requests_per_client):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+
+    def client():
+        own = []
+        conn = HTTPConnection(host, port, timeout=60)
+        barrier.wait()
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    raise OSError(resp.status)
+            except OSError:
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = HTTPConnection(host, port, timeout=60)
+                continue
+            own.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=None, help="existing server to load instead of an in-process one")
+    parser.add_argument("--path", default="/ledger?after=1000&limit=50")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=128)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--max-connections", type=int, default=audit_trail_api.MAX_CONNECTIONS)
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        print(drive(url.hostname, url.port or 80, args.path, args.clients, args.requests))
+        return
+
+    temp_dir = tempfile.mkdtemp()
+    audit_trail_api.LEDGER_PATH = os.path.join(temp_dir, "ledger.jsonl")
+    writer = LedgerWriter(audit_trail_api.LEDGER_PATH)
+    writer.append_batch([("bench", "consent_validation_passed", {"i": i}, None) for i in range(args.events)])
+    writer.close()
+
+    servers = (
+        ("single-threaded", lambda: HTTPServer(("127.0.0.1", 0), audit_trail_api.AuditHandler)),
+        ("bounded-pool", lambda: audit_trail_api.BoundedThreadingHTTPServer(
+            ("127.0.0.1", 0), audit_trail_api.AuditHandler, max_connections=args.max_connections, backlog=1024)),
+    )
+    try:
+        print(f"{args.clients} keep-alive clients x {args.requests} requests of {args.path}")
+        print(f"{'server':<18}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, factory in servers:
+            server = factory()
+            thread = serve(server)
+            result = drive("127.0.0.1", server.server_address[1], args.path, args.clients, args.requests)
+            server.shutdown()
+            server.server_close()
+            thread.join()
+            print(f"{name:<18}{result['rps']:>10,.0f}{result['p50_ms']:>10.1f}"
+                  f"{result['p99_ms']:>10.1f}{result['errors']:>8}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
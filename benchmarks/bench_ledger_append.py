@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Append throughput for the CERL-Preemptive consent ledger.
+
+Compares synchronous append_event (one write per event) with group commit
+under each durability policy, using several concurrent producer threads.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive.consent_ledger import LedgerWriter, GroupCommitWriter
+
+
+def run_sync(path, events, threads, durability):
+    writer = LedgerWriter(path, durability=durability)
+    per_thread = events // threads
+
+    def work():
+        for i in range(per_thread):
+            writer.append("bench", "sync_append", {"i": i})
+
+    elapsed = _run_threads(work, threads)
+    writer.close()
+    return per_thread * threads / elapsed
+
+
+def run_group(path, events, threads, durability):
+    committer = GroupCommitWriter(LedgerWriter(path, durability=durability))
+    per_thread = events // threads
+
+    def work():
+        for i in range(per_thread):
+            committer.submit("bench", "group_append", {"i": i}).result()
+
+    elapsed = _run_threads(work, threads)
+    committer.close()
+    return per_thread * threads / elapsed
+
+
+def _run_threads(work, threads):
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'mode':<12}{'durability':<14}{'events/s':>12}")
+        for durability in ("none", "batch", "every-event"):
+            for mode, runner in (("sync", run_sync), ("group", run_group)):
+                events = args.events if durability == "none" else args.events // 10
+                path = os.path.join(temp_dir, f"{mode}-{durability}.jsonl")
+                rate = runner(path, events, args.threads, durability)
+                print(f"{mode:<12}{durability:<14}{rate:>12,.0f}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Line format microbenchmarks for the CERL-Preemptive consent ledger.
+
+Times writing events and verifying the chain with the v1 line format (stored
+with json.dumps, verified by parse and re-dump) and the v2 canonical format
+(stored as the hashed bytes, verified by hashing them directly).
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.consent_ledger import LedgerWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    batch = [("bench", "consent_validation_passed", {"target": "private_data", "i": i}, None)
+             for i in range(args.batch)]
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{args.events} events")
+        print(f"{'format':<8}{'write ev/s':>14}{'verify ev/s':>14}{'bytes/event':>13}")
+        for version in consent_ledger.LINE_VERSIONS:
+            path = os.path.join(temp_dir, f"v{version}.jsonl")
+            writer = LedgerWriter(path, index=False, line_version=version)
+            start = time.perf_counter()
+            for _ in range(args.events // args.batch):
+                writer.append_batch(batch)
+            write_rate = args.events / (time.perf_counter() - start)
+            writer.close()
+
+            start = time.perf_counter()
+            result = consent_ledger.verify_chain(path=path)
+            verify_rate = result.seq / (time.perf_counter() - start)
+            assert result, result
+            print(f"v{version:<7}{write_rate:>14,.0f}{verify_rate:>14,.0f}"
+                  f"{os.path.getsize(path) / result.seq:>13.0f}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
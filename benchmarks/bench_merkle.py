@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Merkle accumulator cost for the CERL-Preemptive consent ledger.
+
+Times appends with and without the Merkle tree, a full rebuild of the tree
+from the ledger, and inclusion and consistency proofs at growing ledger
+sizes, showing that proof size and latency grow with log2(n).
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive.consent_ledger import LedgerWriter, read_event
+from cerl_preemptive.merkle import MerkleAccumulator, verify_inclusion
+
+
+def append_rate(path, events, merkle, batch_size):
+    writer = LedgerWriter(path, lock=False, merkle=merkle)
+    batch = [("bench", "consent_validation_passed", {"target": "private_data", "i": i}, None)
+             for i in range(batch_size)]
+    start = time.perf_counter()
+    for _ in range(events // batch_size):
+        writer.append_batch(batch)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return events / elapsed
+
+
+def proof_latency(path, tree, size, samples):
+    rng = random.Random(size)
+    root = tree.root(size)
+    leaves = [rng.randrange(size) for _ in range(samples)]
+    start = time.perf_counter()
+    proofs = [tree.inclusion_proof(seq, size) for seq in leaves]
+    inclusion = (time.perf_counter() - start) / samples
+    for seq, proof in list(zip(leaves, proofs))[:10]:
+        assert verify_inclusion(read_event(seq, path)["hash"], seq, size, proof, root)
+    start = time.perf_counter()
+    for old in leaves:
+        tree.consistency_proof(old + 1, size)
+    consistency = (time.perf_counter() - start) / samples
+    return inclusion, consistency, max(len(p) for p in proofs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{args.events} events")
+        for batch_size in (1, 100):
+            events = args.events // 20 if batch_size == 1 else args.events
+            plain = append_rate(os.path.join(temp_dir, f"plain-{batch_size}.jsonl"), events, False, batch_size)
+            tree = append_rate(os.path.join(temp_dir, f"merkle-{batch_size}.jsonl"), events, True, batch_size)
+            print(f"  append, batches of {batch_size:>3}:  {plain:>9,.0f} ev/s plain   {tree:>9,.0f} ev/s with Merkle tree")
+
+        path = os.path.join(temp_dir, "merkle-100.jsonl")
+        tree = MerkleAccumulator(path)
+        start = time.perf_counter()
+        tree.rebuild()
+        print(f"  rebuild from ledger:   {time.perf_counter() - start:.2f} s")
+
+        print(f"  {'size':>8}  {'inclusion':>10}  {'consistency':>11}  {'path':>4}")
+        size = 1000
+        while size <= args.events:
+            inclusion, consistency, length = proof_latency(path, tree, size, args.samples)
+            print(f"  {size:>8}  {inclusion * 1e6:>8.1f}us  {consistency * 1e6:>9.1f}us  {length:>4}")
+            size *= 10
+        tree.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Overhead of CERL-Preemptive metrics on the hot paths.
+
+Times a no-op function plain, timed with metrics on and timed with metrics
+off, then validates --requests requests against a temporary ledger with
+metrics on and off, and counts from --threads threads at once.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from timeit import timeit
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive import consent_ledger, metrics
+from cerl_preemptive.consent_validator import ConsentValidator
+
+REQUEST = {"action": "read_profile", "target": "private_data", "purpose": "support",
+           "consent_status": "granted", "urgency": "none", "potential_harm": "none", "actor": "bench"}
+
+
+def noop():
+    pass
+
+
+def validate(requests):
+    validator = ConsentValidator()
+    start = time.perf_counter()
+    for _ in range(requests):
+        validator.validate_request(REQUEST)
+    return requests / (time.perf_counter() - start)
+
+
+def count_in_threads(threads, per_thread):
+    counter = metrics.counter("bench_increments_total", "Benchmark counter")
+    workers = [threading.Thread(target=lambda: [counter.inc() for _ in range(per_thread)]) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    assert counter.value() == threads * per_thread
+    return threads * per_thread / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    if not metrics.enabled():
+        print("CERL_METRICS is off: timed functions are left undecorated and nothing is recorded")
+    timed = metrics.timed("bench_noop")(noop)
+    plain = timeit(noop, number=args.calls) / args.calls
+    on = timeit(timed, number=args.calls) / args.calls
+    initial = metrics.enabled()
+    metrics.set_enabled(False)
+    off = timeit(timed, number=args.calls) / args.calls
+    metrics.set_enabled(initial)
+    print(f"no-op call: plain {plain * 1e9:.0f} ns, timed {on * 1e9:.0f} ns, "
+          f"timed with metrics off {off * 1e9:.0f} ns")
+
+    temp_dir = tempfile.mkdtemp()
+    consent_ledger.LEDGER_PATH = os.path.join(temp_dir, "ledger.jsonl")
+    try:
+        validate(1000)
+        rate_on = validate(args.requests)
+        metrics.set_enabled(False)
+        rate_off = validate(args.requests)
+        metrics.set_enabled(initial)
+        print(f"validate_request: {rate_on:,.0f} req/s with metrics, {rate_off:,.0f} req/s without "
+              f"({(rate_off / rate_on - 1) * 100:+.1f}%)")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if not metrics.enabled():
+        return
+    rate = count_in_threads(args.threads, args.calls // args.threads)
+    print(f"counter.inc from {args.threads} threads: {rate:,.0f} increments/s")
+
+
+if __name__ == "__main__":
+    main()
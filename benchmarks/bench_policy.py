@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Sensitive-target matching cost for the CERL-Preemptive policy engine.
+
+Times PolicyEngine.match against a loop of substring tests as the number of
+rules grows, over a mix of matching and non-matching targets.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive.policy_engine import PolicyEngine
+
+
+def make_words(count, rng):
+    alphabet = "abcdefghijklmnopqrstuvwxyz_"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(6, 14))) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", type=int, nargs="+", default=[2, 10, 100, 1000, 10000])
+    parser.add_argument("--targets", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'rules':>8}{'engine us':>12}{'loop us':>12}")
+    for count in args.rules:
+        words = make_words(count, rng)
+        engine = PolicyEngine({"default": {"substrings": words}})
+        targets = [
+            f"user_{rng.choice(words)}_v{i}" if i % 4 == 0 else f"public_dataset_{i}_summary_table"
+            for i in range(args.targets)
+        ]
+
+        start = time.perf_counter()
+        hits = sum(engine.is_sensitive(t) for t in targets)
+        engine_us = (time.perf_counter() - start) / len(targets) * 1e6
+
+        start = time.perf_counter()
+        loop_hits = sum(any(w in t.lower() for w in words) for t in targets)
+        loop_us = (time.perf_counter() - start) / len(targets) * 1e6
+
+        assert hits == loop_hits, (hits, loop_hits)
+        print(f"{count:>8}{engine_us:>12.2f}{loop_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Replication throughput and lag for the CERL-Preemptive consent ledger.
+
+Starts the audit API as a leader in a separate process and replicates its
+ledger into a follower in this one. It times a follower catching up on
+--events events from empty, then appends --rate events per second on the
+leader and measures how long each takes to reach the follower.
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cerl_preemptive.consent_ledger import LedgerWriter, list_seals, read_event
+from cerl_preemptive.ledger_replica import LedgerFollower
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_leader(path, port):
+    proc = subprocess.Popen([sys.executable, "-m", "cerl_preemptive.audit_trail_api", "--port", str(port),
+                             "--ledger", path], cwd=ROOT, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("leader did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--rate", type=float, default=200, help="steady-state leader appends per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    leader_path = os.path.join(temp_dir, "leader.jsonl")
+    follower_path = os.path.join(temp_dir, "follower.jsonl")
+    leader = LedgerWriter(leader_path, lock=False, rotate_bytes=8 << 20)
+    batch = [("bench", "consent_validation_passed", {"target": "private_data", "i": i}, None) for i in range(1000)]
+    for _ in range(args.events // len(batch)):
+        leader.append_batch(batch)
+    port = free_port()
+    proc = start_leader(leader_path, port)
+    try:
+        follower = LedgerFollower(f"http://127.0.0.1:{port}", follower_path, wait=1.0)
+        start = time.perf_counter()
+        applied = follower.sync_once()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(leader_path) + sum(seal["bytes"] for seal in list_seals(leader_path))
+        print(f"catch-up: {applied} events ({size / 2 ** 20:.0f} MB) in {elapsed:.2f} s, "
+              f"{applied / elapsed:,.0f} ev/s")
+
+        lags = []
+        done = threading.Event()
+
+        def follow():
+            while not done.is_set():
+                seq = follower.writer.event_count()
+                if follower.sync_once(wait=1.0):
+                    now = time.time()
+                    for s in range(seq, follower.writer.event_count()):
+                        lags.append(now - read_event(s, follower_path)["timestamp"])
+
+        thread = threading.Thread(target=follow)
+        thread.start()
+        interval = 1.0 / args.rate
+        end = time.monotonic() + args.seconds
+        next_at = time.monotonic()
+        while time.monotonic() < end:
+            leader.append("bench", "consent_validation_passed", {"target": "private_data"})
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+        time.sleep(0.5)
+        done.set()
+        thread.join()
+        lags.sort()
+        print(f"steady state at {args.rate:.0f} ev/s: {len(lags)} events, lag p50 {lags[len(lags) // 2] * 1e3:.1f} ms, "
+              f"p99 {lags[int(len(lags) * 0.99)] * 1e3:.1f} ms, max {lags[-1] * 1e3:.1f} ms")
+        follower.close()
+        follower.writer.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+        leader.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
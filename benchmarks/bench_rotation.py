@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Verification cost for a rotated CERL-Preemptive consent ledger.
+
+Writes the same synthetic events to a single-file ledger and to one rotated
+every --segment-mb megabytes, then times verify_chain on both: a full run,
+a full run with one worker per segment, and an incremental run, which skips
+the events of sealed segments.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.consent_ledger import LedgerWriter
+
+
+def build_ledger(path, events, rotate_bytes=None):
+    writer = LedgerWriter(path, lock=False, rotate_bytes=rotate_bytes)
+    batch = [("bench", "consent_validation_passed", {"target": "private_data", "i": i}, None) for i in range(1000)]
+    start = time.perf_counter()
+    for _ in range(events // len(batch)):
+        writer.append_batch(batch)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return events / elapsed
+
+
+def timed_verify(path, **kwargs):
+    start = time.perf_counter()
+    result = consent_ledger.verify_chain(path=path, **kwargs)
+    elapsed = time.perf_counter() - start
+    assert result, result
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--segment-mb", type=float, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        single = os.path.join(temp_dir, "single.jsonl")
+        rotated = os.path.join(temp_dir, "rotated.jsonl")
+        rates = (build_ledger(single, args.events), build_ledger(rotated, args.events, int(args.segment_mb * 2 ** 20)))
+        # A checkpoint covering the active file, as left by a previous incremental run.
+        for path in (single, rotated):
+            consent_ledger.verify_chain(path=path, incremental=True)
+
+        print(f"{args.events} events, {len(consent_ledger.list_seals(rotated))} sealed segments")
+        print(f"{'':<28}{'single file':>14}{'rotated':>14}")
+        print(f"{'append events/s':<28}{rates[0]:>14,.0f}{rates[1]:>14,.0f}")
+        for label, kwargs in (("full verify (s)", {}), (f"full, {args.workers} workers (s)", {"workers": args.workers}),
+                              ("incremental, no new events", {"incremental": True})):
+            times = [timed_verify(path, **kwargs) for path in (single, rotated)]
+            print(f"{label:<28}{times[0]:>14.3f}{times[1]:>14.3f}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
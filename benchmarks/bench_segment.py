@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Binary segment vs JSONL storage for the CERL-Preemptive consent ledger.
+
+Writes a synthetic JSONL ledger, converts it to a .cerlseg segment and
+compares file size, full scans (every event decoded), filtered scans (one
+action in a hundred) and chain verification.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive import consent_ledger, ledger_segment
+from cerl_preemptive.consent_ledger import LedgerWriter
+
+
+def build_ledger(path, events):
+    writer = LedgerWriter(path, lock=False, index=False)
+    for start in range(0, events, 1000):
+        writer.append_batch([
+            (f"service_{i % 20}", "consent_violation_detected" if i % 100 == 0 else "consent_validation_passed",
+             {"target": "private_data", "purpose": "service_provision", "i": i}, None)
+            for i in range(start, min(start + 1000, events))
+        ])
+    writer.close()
+
+
+def scan_jsonl(path, action=None):
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            event = json.loads(line)
+            if action is None or event["action"] == action:
+                count += 1
+    return count
+
+
+def scan_segment(path, action=None):
+    with ledger_segment.SegmentReader(path) as reader:
+        return sum(1 for _ in reader.scan(action=action))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        jsonl = os.path.join(temp_dir, "ledger.jsonl")
+        segment = os.path.join(temp_dir, "ledger.cerlseg")
+        build_ledger(jsonl, args.events)
+        _, convert = timed(ledger_segment.jsonl_to_segment, jsonl, segment)
+
+        print(f"{args.events} events, converted in {convert:.2f} s")
+        print(f"{'':<22}{'JSONL':>14}{'segment':>14}")
+        sizes = [os.path.getsize(p) for p in (jsonl, segment)]
+        print(f"{'bytes/event':<22}{sizes[0] / args.events:>14.0f}{sizes[1] / args.events:>14.0f}")
+        for label, action in (("full scan ev/s", None), ("filtered scan ev/s", "consent_violation_detected")):
+            rates = []
+            for scan, path in ((scan_jsonl, jsonl), (scan_segment, segment)):
+                found, elapsed = timed(scan, path, action)
+                rates.append(args.events / elapsed)
+            print(f"{label:<22}{rates[0]:>14,.0f}{rates[1]:>14,.0f}")
+        rates = []
+        for path in (jsonl, segment):
+            result, elapsed = timed(consent_ledger.verify_chain, False, None, None, None, path)
+            assert result, result
+            rates.append(result.seq / elapsed)
+        print(f"{'verify ev/s':<22}{rates[0]:>14,.0f}{rates[1]:>14,.0f}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
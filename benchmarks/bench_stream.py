@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Fan-out latency of the CERL-Preemptive /ledger/stream endpoint.
+
+Serves a ledger from the audit API, connects --subscribers Server-Sent
+Events clients and appends --rate events per second, either from this
+process (the writer wakes the broadcaster directly) or from a separate
+process (the broadcaster notices by polling). Reports the time from each
+event's timestamp to its arrival at every subscriber.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cerl_preemptive import audit_trail_api, ledger_stream
+from cerl_preemptive.consent_ledger import LedgerWriter
+
+WRITER = """
+import sys, time
+from cerl_preemptive.consent_ledger import LedgerWriter
+writer = LedgerWriter(sys.argv[1])
+interval, count = 1.0 / float(sys.argv[2]), int(sys.argv[3])
+next_at = time.monotonic()
+for i in range(count):
+    writer.append("bench", "consent_validation_passed", {"target": "private_data", "i": i})
+    next_at += interval
+    time.sleep(max(0.0, next_at - time.monotonic()))
+"""
+
+
+def subscribe(port, count, lags, ready):
+    conn = HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/ledger/stream")
+    resp = conn.getresponse()
+    resp.readline()
+    ready.release()
+    received = 0
+    while received < count:
+        line = resp.readline()
+        if line.startswith(b"data: "):
+            lags.append(time.time() - json.loads(line[6:])["timestamp"])
+            received += 1
+    conn.close()
+
+
+def run(path, port, subscribers, rate, count, external):
+    lags = []
+    ready = threading.Semaphore(0)
+    threads = [threading.Thread(target=subscribe, args=(port, count, lags, ready)) for _ in range(subscribers)]
+    for t in threads:
+        t.start()
+    for _ in threads:
+        ready.acquire()
+    if external:
+        subprocess.run([sys.executable, "-c", WRITER, path, str(rate), str(count)], cwd=ROOT, check=True)
+    else:
+        writer = LedgerWriter(path)
+        interval, next_at = 1.0 / rate, time.monotonic()
+        for i in range(count):
+            writer.append("bench", "consent_validation_passed", {"target": "private_data", "i": i})
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+        writer.close()
+    for t in threads:
+        t.join()
+    lags.sort()
+    return lags[len(lags) // 2], lags[int(len(lags) * 0.99)], lags[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=100, help="appends per second")
+    parser.add_argument("--events", type=int, default=300)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    path = os.path.join(temp_dir, "ledger.jsonl")
+    LedgerWriter(path).append("bench", "start", {})
+    audit_trail_api.LEDGER_PATH = path
+    server = audit_trail_api.BoundedThreadingHTTPServer(("127.0.0.1", 0), audit_trail_api.AuditHandler,
+                                                        max_connections=128)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_address[1]
+    try:
+        print(f"{args.events} events at {args.rate:.0f}/s")
+        for external in (False, True):
+            for subscribers in (1, 10, 50):
+                p50, p99, worst = run(path, port, subscribers, args.rate, args.events, external)
+                print(f"  {'other process' if external else 'same process':>13}, {subscribers:>2} subscribers: "
+                      f"p50 {p50 * 1e3:6.1f} ms  p99 {p99 * 1e3:6.1f} ms  max {worst * 1e3:6.1f} ms")
+    finally:
+        server.shutdown()
+        server.server_close()
+        ledger_stream.close_broadcaster(path)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
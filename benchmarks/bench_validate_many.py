@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Batch validation throughput for the CERL-Preemptive consent validator.
+
+Compares looping over validate_request with one validate_many call for the
+same requests, under each ledger durability policy.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.consent_validator import ConsentValidator, ConsentViolationError
+
+
+def make_requests(count):
+    """Every tenth request asks for private data without consent."""
+    return [
+        {
+            "action": "access_user_data",
+            "target": "private_data" if i % 2 else "public_stats",
+            "purpose": "service_provision",
+            "consent_status": "not_granted" if i % 10 == 1 else "granted",
+            "actor": f"gateway-{i % 8}",
+        }
+        for i in range(count)
+    ]
+
+
+def run_loop(requests):
+    validator = ConsentValidator()
+    start = time.perf_counter()
+    for request in requests:
+        try:
+            validator.validate_request(request)
+        except ConsentViolationError:
+            pass
+    return time.perf_counter() - start
+
+
+def run_batch(requests):
+    validator = ConsentValidator()
+    start = time.perf_counter()
+    validator.validate_many(requests)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--durability", nargs="+", default=["none", "batch", "every-event"],
+                        choices=consent_ledger.DURABILITY_POLICIES)
+    args = parser.parse_args()
+
+    requests = make_requests(args.requests)
+    temp_dir = tempfile.mkdtemp()
+    original = consent_ledger.LEDGER_PATH
+    try:
+        print(f"{args.requests} requests")
+        print(f"{'mode':<18}{'durability':<14}{'seconds':>10}{'requests/s':>14}")
+        for durability in args.durability:
+            for mode, run in (("validate_request", run_loop), ("validate_many", run_batch)):
+                consent_ledger.LEDGER_PATH = os.path.join(temp_dir, f"{mode}-{durability}.jsonl")
+                consent_ledger.get_writer().durability = durability
+                elapsed = run(requests)
+                consent_ledger.get_writer().close()
+                print(f"{mode:<18}{durability:<14}{elapsed:>10.2f}{len(requests) / elapsed:>14,.0f}")
+    finally:
+        consent_ledger.LEDGER_PATH = original
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Chain verification throughput for the CERL-Preemptive consent ledger.
+
+Writes a synthetic ledger of roughly --size-mb megabytes (or reuses --ledger)
+and times verify_chain with one and several worker processes.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.consent_ledger import LedgerWriter
+
+
+def build_ledger(path, size_mb):
+    writer = LedgerWriter(path, lock=False)
+    target = size_mb * 1024 * 1024
+    batch = [("bench", "consent_validation_passed", {"target": "private_data", "i": i}, None) for i in range(1000)]
+    written = 0
+    while written < target:
+        writer.append_batch(batch)
+        written = os.path.getsize(path)
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--ledger", default=None, help="existing ledger to verify instead of a synthetic one")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    path = args.ledger
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "bench_ledger.jsonl")
+        print(f"Generating ~{args.size_mb} MB synthetic ledger at {path} ...")
+        build_ledger(path, args.size_mb)
+
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"{'workers':>8}{'seconds':>10}{'MB/s':>10}{'events/s':>14}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        result = consent_ledger.verify_chain(path=path, workers=workers)
+        elapsed = time.perf_counter() - start
+        assert result, result
+        print(f"{workers:>8}{elapsed:>10.2f}{size_mb / elapsed:>10.1f}{result.seq / elapsed:>14,.0f}")
+
+    if args.ledger is None:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare two CERL-Preemptive benchmark results written by benchmarks/suite.py.
+
+Prints every metric's change from BASE to NEW and exits with status 1 if
+any moved in its worse direction by more than --threshold percent, so it
+can gate a commit in CI:
+
+    python benchmarks/compare.py main.json branch.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+from synthetic import format_count
+
+
+def load(path) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    if report.get("schema") != 1:
+        raise ValueError(f"{path}: unsupported results schema {report.get('schema')!r}")
+    return report
+
+
+def _key(result) -> tuple:
+    return result["scenario"], result["size"], result["metric"]
+
+
+def compare(base: dict, new: dict, threshold: float) -> list:
+    """Return (scenario, size, metric, base value, new value, change %, regressed) for metrics in both reports."""
+    before = {_key(r): r for r in base["results"]}
+    rows = []
+    for result in new["results"]:
+        old = before.get(_key(result))
+        if old is None or not old["value"]:
+            continue
+        change = (result["value"] - old["value"]) / old["value"] * 100
+        worse = -change if result["better"] == "higher" else change
+        rows.append(_key(result) + (old["value"], result["value"], change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change that counts as a regression")
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    for field in ("python", "platform", "cpus"):
+        if base["environment"].get(field) != new["environment"].get(field):
+            print(f"[BENCH] Warning: {field} differs ({base['environment'].get(field)} vs "
+                  f"{new['environment'].get(field)}); changes may not be comparable")
+    print(f"{(base['environment'].get('commit') or '?')[:10]} -> {(new['environment'].get('commit') or '?')[:10]}")
+    rows = compare(base, new, args.threshold)
+    print(f"{'scenario':<10}{'size':>10}  {'metric':<28}{'base':>14}{'new':>14}{'change':>9}")
+    for scenario, size, metric, old, value, change, regressed in rows:
+        label = "-" if size is None else format_count(size)
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{scenario:<10}{label:>10}  {metric:<28}{old:>14,.1f}{value:>14,.1f}{change:>+8.1f}%{flag}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"{len(rows)} metrics compared, {regressions} regressed by more than {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for CERL-Preemptive, with JSON results to compare across commits.
+
+Runs each scenario at each --sizes count over synthetic data from
+benchmarks/synthetic.py, cached in --data-dir so that large ledgers are
+generated once. Scenarios:
+
+    append        appends onto a copy of a ledger of `size` events
+    validate      validate_request latency and validate_many throughput
+                  (runs once; validation cost does not depend on ledger size)
+    tokens        building the index of a `size`-record tokens file, then lookups
+    verify        full verify_chain of a `size`-event ledger
+    audit_api     concurrent /ledger page requests against a `size`-event ledger
+
+Each metric is the median of --repeat runs. Write results with
+--output results.json and check for regressions with
+benchmarks/compare.py base.json results.json.
+
+    python benchmarks/suite.py --sizes 1k 100k 1M --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cerl_preemptive import audit_trail_api, consent_ledger, metrics
+from cerl_preemptive.consent_ledger import LedgerWriter
+from cerl_preemptive.consent_token_manager import TokenStore
+from cerl_preemptive.consent_validator import ConsentValidator, ConsentViolationError
+
+from bench_audit_load import drive, percentile, serve
+from synthetic import dataset, format_count, make_requests, parse_count, token_id
+
+SCHEMA = 1
+DEFAULT_SIZES = ["1k", "10k", "100k"]
+SCENARIOS = {}
+
+
+def scenario(name: str, sized: bool = True):
+    """Register `fn(ctx, size)`, returning {metric: (value, unit, better)}; `better` is "higher" or "lower"."""
+    def register(fn):
+        SCENARIOS[name] = (fn, sized)
+        return fn
+    return register
+
+
+def _latencies(fn, args_list) -> list:
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+@scenario("append")
+def bench_append(ctx, size):
+    path = os.path.join(ctx.work_dir, "append.jsonl")
+    _copy_ledger(dataset("ledger", size, ctx.seed, ctx.data_dir), path)
+    try:
+        start = time.perf_counter()
+        writer = LedgerWriter(path)
+        writer.append("bench", "consent_validation_passed", {"i": -1})
+        first = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(ctx.ops):
+            writer.append("bench", "consent_validation_passed", {"i": i})
+        single = ctx.ops / (time.perf_counter() - start)
+
+        batch = [("bench", "consent_validation_passed", {"i": i}, None) for i in range(100)]
+        start = time.perf_counter()
+        for _ in range(max(ctx.ops // 100, 1)):
+            writer.append_batch(batch)
+        batched = max(ctx.ops // 100, 1) * 100 / (time.perf_counter() - start)
+        writer.close()
+        return {
+            "open_and_first_append_ms": (first * 1e3, "ms", "lower"),
+            "append_events_per_s": (single, "ev/s", "higher"),
+            "append_batch_events_per_s": (batched, "ev/s", "higher"),
+        }
+    finally:
+        _remove_ledger(path)
+
+
+@scenario("validate", sized=False)
+def bench_validate(ctx, size):
+    consent_ledger.LEDGER_PATH = os.path.join(ctx.work_dir, "validate.jsonl")
+    try:
+        requests = make_requests(ctx.ops, ctx.seed)
+        validator = ConsentValidator()
+
+        def validate(request):
+            try:
+                validator.validate_request(request)
+            except ConsentViolationError:
+                pass
+
+        validate(requests[0])
+        latencies = _latencies(validate, [(r,) for r in requests])
+        start = time.perf_counter()
+        for i in range(0, len(requests), 100):
+            validator.validate_many(requests[i:i + 100])
+        batched = len(requests) / (time.perf_counter() - start)
+        consent_ledger.get_writer().close()
+        return {
+            "validate_request_p50_us": (percentile(latencies, 50) * 1e6, "us", "lower"),
+            "validate_request_p99_us": (percentile(latencies, 99) * 1e6, "us", "lower"),
+            "validate_request_per_s": (len(latencies) / sum(latencies), "req/s", "higher"),
+            "validate_many_per_s": (batched, "req/s", "higher"),
+        }
+    finally:
+        _remove_ledger(consent_ledger.LEDGER_PATH)
+        consent_ledger.LEDGER_PATH = ctx.ledger_path
+
+
+@scenario("tokens")
+def bench_tokens(ctx, size):
+    path = dataset("tokens", size, ctx.seed, ctx.data_dir)
+    start = time.perf_counter()
+    store = TokenStore(path, snapshot_path=os.path.join(ctx.work_dir, "no.snapshot"))
+    load = time.perf_counter() - start
+    rng = random.Random(f"cerl-lookups:{ctx.seed}")
+    # Nine in ten lookups hit an issued token (some of them expired); the rest miss.
+    ids = [(token_id(rng.randrange(size), ctx.seed) if i % 10 else token_id(size + i, ctx.seed),)
+           for i in range(ctx.ops)]
+    store.get(token_id(0, ctx.seed))  # the first lookup evicts every expired token
+    latencies = _latencies(store.get, ids)
+    return {
+        "index_build_s": (load, "s", "lower"),
+        "lookup_p50_us": (percentile(latencies, 50) * 1e6, "us", "lower"),
+        "lookup_p99_us": (percentile(latencies, 99) * 1e6, "us", "lower"),
+        "lookups_per_s": (len(latencies) / sum(latencies), "lookups/s", "higher"),
+    }
+
+
+@scenario("verify")
+def bench_verify(ctx, size):
+    path = dataset("ledger", size, ctx.seed, ctx.data_dir)
+    start = time.perf_counter()
+    result = consent_ledger.verify_chain(path=path, workers=ctx.workers)
+    elapsed = time.perf_counter() - start
+    if not result:
+        raise RuntimeError(f"synthetic ledger {path} does not verify: {result!r}")
+    return {
+        "verify_events_per_s": (result.seq / elapsed, "ev/s", "higher"),
+        "verify_mb_per_s": (os.path.getsize(path) / 2 ** 20 / elapsed, "MB/s", "higher"),
+    }
+
+
+@scenario("audit_api")
+def bench_audit_api(ctx, size):
+    audit_trail_api.LEDGER_PATH = dataset("ledger", size, ctx.seed, ctx.data_dir)
+    server = audit_trail_api.BoundedThreadingHTTPServer(("127.0.0.1", 0), audit_trail_api.AuditHandler,
+                                                        backlog=1024)
+    thread = serve(server)
+    try:
+        path = f"/ledger?after={size // 2}&limit=50"
+        port = server.server_address[1]
+        drive("127.0.0.1", port, path, 1, 1)  # warm up the index and page cache before timing
+        result = drive("127.0.0.1", port, path, ctx.clients, max(ctx.ops // ctx.clients, 1))
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+    if result["errors"]:
+        raise RuntimeError(f"{result['errors']} audit API requests failed")
+    return {
+        "requests_per_s": (result["rps"], "req/s", "higher"),
+        "p50_ms": (result["p50_ms"], "ms", "lower"),
+        "p99_ms": (result["p99_ms"], "ms", "lower"),
+    }
+
+
+def _sidecars(path) -> list:
+    directory, name = os.path.split(path)
+    return [entry for entry in os.listdir(directory) if entry.startswith(name + ".")]
+
+
+def _copy_ledger(source, path):
+    """Copy a ledger and its sidecar files."""
+    shutil.copyfile(source, path)
+    for entry in _sidecars(source):
+        target = os.path.join(os.path.dirname(source), entry)
+        copy = path + entry[len(os.path.basename(source)):]
+        shutil.copytree(target, copy) if os.path.isdir(target) else shutil.copyfile(target, copy)
+
+
+def _remove_ledger(path):
+    """Remove a ledger and its sidecar files."""
+    if os.path.exists(path):
+        os.remove(path)
+    for entry in _sidecars(path):
+        target = os.path.join(os.path.dirname(path), entry)
+        shutil.rmtree(target) if os.path.isdir(target) else os.remove(target)
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def environment() -> dict:
+    """Where the results came from: commit, interpreter and machine."""
+    return {
+        "commit": _git("rev-parse", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "metrics_enabled": metrics.enabled(),
+    }
+
+
+def run(scenarios, sizes, ctx) -> list:
+    """Run every scenario at every size; return one result dict per metric."""
+    results = []
+    for name in scenarios:
+        fn, sized = SCENARIOS[name]
+        for size in sizes if sized else [None]:
+            runs = [fn(ctx, size) for _ in range(ctx.repeat)]
+            for metric, (_, unit, better) in runs[0].items():
+                value = statistics.median(r[metric][0] for r in runs)
+                results.append({"scenario": name, "size": size, "metric": metric, "value": value,
+                                "unit": unit, "better": better})
+                label = format_count(size) if size is not None else "-"
+                print(f"[BENCH] {name:<10}{label:>6}  {metric:<28}{value:>14,.1f} {unit}", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__.split("\n\n", 1)[1])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="event counts, e.g. 1k 1M 100M")
+    parser.add_argument("--ops", type=int, default=5000, help="operations timed per scenario run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="verify_chain worker processes")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent audit API clients")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "cerl-bench-data"),
+                        help="cache of generated ledgers and tokens files")
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout)")
+    args = parser.parse_args()
+    args.sizes = [parse_count(size) for size in args.sizes]
+    args.ledger_path = consent_ledger.LEDGER_PATH
+
+    args.work_dir = tempfile.mkdtemp()
+    try:
+        started = datetime.now(timezone.utc).isoformat()
+        results = run(args.scenarios, args.sizes, args)
+    finally:
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+    report = {
+        "schema": SCHEMA,
+        "started": started,
+        "environment": environment(),
+        "settings": {"ops": args.ops, "repeat": args.repeat, "seed": args.seed,
+                     "workers": args.workers, "clients": args.clients},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2) + "\n"
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"[BENCH] Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
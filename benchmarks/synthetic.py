@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic data for CERL-Preemptive benchmarks.
+
+Writes hash-chained ledgers and tokens files of any size, streaming, so
+1k and 100M events cost the same memory. The same count and --seed always
+produce byte-identical files: timestamps advance by a fixed step from
+START, IDs come from a seeded generator, and token IDs are derived from
+(seed, index) so a benchmark can look up token i without reading the file.
+About half of the ledger's events reference a token of a tokens file
+generated with the same count and seed. Ledgers get the sidecar index and
+Merkle tree a LedgerWriter would have kept, so readers see a realistic ledger.
+
+    python benchmarks/synthetic.py ledger 1M /data/ledger.jsonl
+    python benchmarks/synthetic.py tokens 10k /data/tokens.jsonl --seed 3
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import uuid
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cerl_preemptive.consent_ledger import GENESIS_HASH, _hash, _v2_line
+from cerl_preemptive.ledger_index import LedgerIndex
+from cerl_preemptive.merkle import MerkleAccumulator
+
+START = 1700000000.0  # timestamp of event 0; events are 1 ms apart
+VALID_UNTIL = 4102444800.0  # 2100-01-01, expiry of live tokens
+EXPIRED_EVERY = 10  # every tenth token has already expired
+WRITE_EVENTS = 10000
+
+ACTORS = [f"gateway-{i}" for i in range(16)] + ["marketing_system", "analytics_job", "support_agent"]
+TARGETS = ["private_data", "medical_records", "location_history", "public_stats", "product_catalog"]
+PURPOSES = ["service_provision", "marketing", "fraud_detection", "research"]
+_SUFFIXES = {"k": 10 ** 3, "m": 10 ** 6, "g": 10 ** 9}
+
+
+def parse_count(text: str) -> int:
+    """Parse an event count such as "5000", "1k", "10M"."""
+    text = text.strip().lower()
+    if text[-1:] in _SUFFIXES:
+        return int(float(text[:-1]) * _SUFFIXES[text[-1]])
+    return int(text)
+
+
+def format_count(count: int) -> str:
+    """Inverse of `parse_count` for round counts: 1000000 -> "1M"."""
+    for suffix, scale in (("G", 10 ** 9), ("M", 10 ** 6), ("k", 10 ** 3)):
+        if count >= scale and count % scale == 0:
+            return f"{count // scale}{suffix}"
+    return str(count)
+
+
+def token_id(index: int, seed: int = 0) -> str:
+    """ID of token `index` in the tokens file generated with `seed`."""
+    digest = hashlib.sha256(f"cerl-token:{seed}:{index}".encode("ascii")).digest()
+    return str(uuid.UUID(bytes=digest[:16], version=4))
+
+
+def make_requests(count: int, seed: int = 0) -> list:
+    """Validation requests in the ledger's mix: a quarter touch private data without consent."""
+    rng = random.Random(f"cerl-requests:{seed}")
+    requests = []
+    for _ in range(count):
+        request = {
+            "action": "access_user_data",
+            "target": rng.choice(TARGETS),
+            "purpose": rng.choice(PURPOSES),
+            "consent_status": "not_granted" if rng.random() < 0.25 else "granted",
+            "urgency": "none",
+            "potential_harm": "privacy_violation",
+            "actor": rng.choice(ACTORS),
+        }
+        requests.append(request)
+    return requests
+
+
+def _events(count: int, seed: int):
+    """Yield the stored lines of a valid v2 ledger of `count` events."""
+    rng = random.Random(f"cerl-ledger:{seed}")
+    prev = GENESIS_HASH
+    for i in range(count):
+        timestamp = START + i / 1000
+        target = rng.choice(TARGETS)
+        granted = rng.random() >= 0.25
+        payload = {
+            "action": "access_user_data",
+            "target": target,
+            "purpose": rng.choice(PURPOSES),
+            "consent_status": "granted" if granted else "not_granted",
+            "urgency": "none",
+            "potential_harm": "privacy_violation",
+            "timestamp": timestamp,
+        }
+        if granted or target in ("public_stats", "product_catalog"):
+            action = "consent_validation_passed"
+            payload["validated"] = True
+        else:
+            action = "consent_violation_detected"
+            payload.update(violation_type="access_without_consent", blocked=True)
+        event = {
+            "timestamp": timestamp,
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "actor": rng.choice(ACTORS),
+            "action": action,
+            "payload": payload,
+            "consent_token": token_id(rng.randrange(count), seed) if rng.random() < 0.5 else None,
+            "prev_hash": prev,
+        }
+        raw = json.dumps(event, sort_keys=True)
+        prev = _hash(raw)
+        yield _v2_line(raw, prev)
+
+
+def _tokens(count: int, seed: int):
+    """Yield the lines of a tokens file of `count` records, as `TokenStore.append` writes them."""
+    rng = random.Random(f"cerl-tokens:{seed}")
+    for i in range(count):
+        record = {"token": token_id(i, seed), "actor": rng.choice(ACTORS), "scope": rng.choice(PURPOSES),
+                  "expiry": START if i % EXPIRED_EVERY == EXPIRED_EVERY - 1 else VALID_UNTIL}
+        yield (json.dumps(record) + "\n").encode("utf-8")
+
+
+def _write(path, lines):
+    """Write `lines` to `path` in large chunks, replacing it only once complete."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) == WRITE_EVENTS:
+                f.write(b"".join(chunk))
+                chunk = []
+        f.write(b"".join(chunk))
+    os.replace(tmp, path)
+    return path
+
+
+def generate_ledger(path, count: int, seed: int = 0, sidecars: bool = True):
+    """Write a ledger of `count` chained events to `path`, with its index and Merkle tree; return the path."""
+    _write(path, _events(count, seed))
+    if sidecars:
+        index = LedgerIndex(path)
+        index.rebuild()
+        index.close()
+        merkle = MerkleAccumulator(path)
+        merkle.rebuild()
+        merkle.close()
+    return path
+
+
+def generate_tokens(path, count: int, seed: int = 0):
+    """Write a tokens file of `count` records to `path`; return the path."""
+    return _write(path, _tokens(count, seed))
+
+
+GENERATORS = {"ledger": generate_ledger, "tokens": generate_tokens}
+
+
+def dataset(kind: str, count: int, seed: int, data_dir) -> str:
+    """Return the path of a cached `kind` file ("ledger" or "tokens") under `data_dir`, generating it if missing."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{kind}-{format_count(count)}-s{seed}.jsonl")
+    if not os.path.exists(path):
+        print(f"[BENCH] Generating {kind} of {count:,} records at {path}", file=sys.stderr)
+        GENERATORS[kind](path, count, seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("kind", choices=sorted(GENERATORS))
+    parser.add_argument("count", type=parse_count, help="number of records, e.g. 1000, 1k, 100M")
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-sidecars", action="store_true", help="write a ledger without its index and Merkle tree")
+    args = parser.parse_args()
+    if args.kind == "ledger":
+        generate_ledger(args.path, args.count, args.seed, sidecars=not args.no_sidecars)
+    else:
+        generate_tokens(args.path, args.count, args.seed)
+    print(f"[BENCH] Wrote {args.count:,} {args.kind} records to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+CERL-Preemptive asyncio ledger writer
+Appends consent ledger events from asyncio code without blocking the event loop.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# Handle both relative and absolute imports
+try:
+    from . import consent_ledger
+except ImportError:
+    import consent_ledger
+
+
+class AsyncLedgerWriter:
+    """Coalesces ledger appends from coroutines into batched background writes.
+
+    `submit` puts the event on an `asyncio.Queue` and returns at once. A
+    writer task drains the queue (up to `max_batch` events), hands the batch
+    to `consent_ledger.append_events` on a dedicated thread, and resolves each
+    caller's future with its event hash, so the file I/O never runs on the
+    loop and concurrent callers share one write.
+    """
+
+    _BARRIER = object()
+
+    def __init__(self, path=None, max_batch: int = 1024):
+        self.path = path
+        self.max_batch = max_batch
+        self._queue = None
+        self._task = None
+        self._executor = None
+        self._closed = False
+
+    def _start(self):
+        if self._closed:
+            raise RuntimeError("AsyncLedgerWriter is closed")
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-ledger")
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, actor: str, action: str, payload: dict, consent_token: Optional[str] = None) -> asyncio.Future:
+        """Queue an event; the returned future resolves to its hash once written."""
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((future, (actor, action, payload, consent_token)))
+        return future
+
+    async def append(self, actor: str, action: str, payload: dict, consent_token: Optional[str] = None) -> str:
+        """Append one event and return its hash, like `consent_ledger.append_event`."""
+        return await self.submit(actor, action, payload, consent_token)
+
+    async def append_batch(self, items) -> list:
+        """Append `(actor, action, payload, consent_token)` tuples in order; return their hashes."""
+        futures = [self.submit(*item) for item in items]
+        return list(await asyncio.gather(*futures))
+
+    async def flush(self):
+        """Wait until every event submitted before this call has been written."""
+        if self._task is None:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((future, self._BARRIER))
+        await future
+
+    async def close(self):
+        if self._closed:
+            return
+        await self.flush()
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._commit(batch)
+
+    async def _commit(self, batch):
+        # Kept out of `_run` so the tracebacks handed to callers do not
+        # reference the long-lived writer task's frame.
+        pending = [entry for entry in batch if entry[1] is not self._BARRIER]
+        try:
+            hashes = await asyncio.get_running_loop().run_in_executor(
+                self._executor, consent_ledger.append_events, [item for _, item in pending], self.path)
+        except Exception as e:
+            for future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (future, _), event_hash in zip(pending, hashes):
+            if not future.done():
+                future.set_result(event_hash)
+        for future, item in batch:
+            if item is self._BARRIER and not future.done():
+                future.set_result(None)
@@ -1,51 +1,698 @@
 import json
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import chain, islice
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
+
+# Handle both relative and absolute imports
+try:
+    from . import metrics
+    from .consent_ledger import _iter_lines, _tail_line, count_events, find_seq, get_index, get_merkle, list_seals, read_event
+    from .ledger_stream import get_broadcaster
+except ImportError:
+    import metrics
+    from consent_ledger import _iter_lines, _tail_line, count_events, find_seq, get_index, get_merkle, list_seals, read_event
+    from ledger_stream import get_broadcaster
 
 LEDGER_PATH = Path(__file__).resolve().parents[0] / "ledger.jsonl"
 PORT = 8080
+CHUNK_SIZE = 64 * 1024
+MAX_CONNECTIONS = 64
+IDLE_TIMEOUT = 15
+MAX_TAIL_WAIT = 30.0
+TAIL_POLL_INTERVAL = 0.005
+STREAM_KEEPALIVE = 15.0
+STREAM_CATCHUP_PAGE = 1000
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+_SEGMENT = re.compile(r"/ledger/segments/(\d+)$")
+_PROOF = re.compile(r"/proof/([^/]+)$")
+_EVENT_HASH = re.compile(r"[0-9a-f]{64}$")
+
+
+class _ChunkedWriter:
+    """Buffers response bytes and writes them with chunked transfer encoding.
+
+    For HTTP/1.0 clients the bytes are written as-is and the connection is
+    closed at the end of the response instead.
+    """
+
+    def __init__(self, wfile, chunked: bool):
+        self.wfile = wfile
+        self.chunked = chunked
+        self._buf = []
+        self._size = 0
+
+    def write(self, data: bytes):
+        self._buf.append(data)
+        self._size += len(data)
+        if self._size >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self, last: bool = False):
+        data = b"".join(self._buf)
+        if self.chunked:
+            out = b"%x\r\n%s\r\n" % (len(data), data) if data else b""
+            if last:
+                out += b"0\r\n\r\n"  # in the same write as the data, so it is not held back by Nagle
+            if out:
+                self.wfile.write(out)
+        elif data:
+            self.wfile.write(data)
+        self._buf, self._size = [], 0
+
+    def close(self):
+        self.flush(last=True)
+
+
+def _iter_ledger(f, after: int, limit, offset: int = 0, seq: int = 0):
+    """Yield (seq, raw line) for events with seq > `after`, at most `limit` of them.
+
+    Reading starts at byte `offset`, which must be the start of event `seq`.
+    """
+    f.seek(offset)
+    seq -= 1
+    sent = 0
+    for line in f:
+        if not line.endswith(b"\n"):
+            return  # an append still in progress
+        if not line.strip():
+            continue
+        seq += 1
+        if seq <= after:
+            continue
+        if limit is not None and sent >= limit:
+            return
+        yield seq, line.rstrip(b"\r\n")
+        sent += 1
+
+
+def _iter_parts(seals, after: int, actor=None, action=None, since=None, until=None):
+    """Yield (seq, raw line) for events after `after` from the sealed segments, then the active file.
+
+    Each part is read through its own sidecar index, which moves with a
+    segment when it is sealed; sequence numbers run across all of them.
+    """
+    filtered = any(v is not None for v in (actor, action, since, until))
+    parts = [(seal["path"], seal["first_seq"], seal["first_seq"] + seal["count"]) for seal in seals]
+    parts.append((os.fspath(LEDGER_PATH), parts[-1][2] if parts else 0, None))
+    for path, first, end in parts:
+        if end is not None and after >= end - 1:
+            continue
+        local = max(after - first, -1)
+        index = get_index(path)
+        if filtered:
+            for seq, line in index.iter_matches(actor, action, since, until, local):
+                yield first + seq, line
+            continue
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            continue
+        with f:
+            offset, seq = index.locate(local + 1)
+            for seq, line in _iter_ledger(f, local, None, offset, seq):
+                yield first + seq, line
+
+
+def _complete_view(f):
+    """Return (length, head hash) of the complete lines in an open ledger file.
+
+    A trailing partial line (an append still in progress) is left out, and
+    so is a last line that does not parse, so the length and head always
+    describe the complete lines before it.
+    """
+    end = os.fstat(f.fileno()).st_size
+    while end > 0:
+        start = max(0, end - CHUNK_SIZE)
+        f.seek(start)
+        nl = f.read(end - start).rfind(b"\n")
+        if nl != -1:
+            end = start + nl + 1
+            break
+        end = start
+    while end > 0:
+        offset, line = _tail_line(f, end)
+        try:
+            return end, json.loads(line)["hash"]
+        except (ValueError, KeyError, TypeError):
+            end = offset
+    return 0, ""
+
+
+def _parse_range(header: str, length: int):
+    """Return (start, stop) for a single `bytes=` range, None to ignore it, or () if unsatisfiable."""
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        start, stop = max(0, length - int(last)), length
+    else:
+        start = int(first)
+        stop = min(length, int(last) + 1) if last else length
+    if start >= length or start >= stop:
+        return ()
+    return start, stop
+
+
+def _parse_time(value: str) -> float:
+    """Parse epoch seconds or an ISO 8601 timestamp (naive values are UTC)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
 
 class AuditHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = IDLE_TIMEOUT
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def setup(self):
+        self.timeout = getattr(self.server, "idle_timeout", self.timeout)
+        super().setup()
+
     def do_GET(self):
-        if self.path == "/ledger" or self.path == "/ledger/":
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Access-Control-Allow-Origin", "*")
-            self.end_headers()
-            
-            events = []
-            if os.path.exists(LEDGER_PATH):
-                try:
-                    with open(LEDGER_PATH, "r", encoding="utf-8") as f:
-                        for line in f:
-                            line = line.strip()
-                            if line:
-                                events.append(json.loads(line))
-                except Exception as e:
-                    self.send_error(500, f"Error reading ledger: {str(e)}")
+        url = urlsplit(self.path)
+        if url.path == "/ledger" or url.path == "/ledger/":
+            self._send_ledger(parse_qs(url.query))
+        elif url.path == "/ledger/raw":
+            self._send_raw()
+        elif url.path == "/ledger/segments":
+            self._send_segments()
+        elif _SEGMENT.match(url.path):
+            self._send_segment(int(_SEGMENT.match(url.path).group(1)))
+        elif url.path == "/ledger/stream":
+            self._send_stream(parse_qs(url.query))
+        elif url.path == "/ledger/tail":
+            self._send_tail(parse_qs(url.query))
+        elif url.path == "/root":
+            self._send_root(parse_qs(url.query))
+        elif _PROOF.match(url.path):
+            self._send_proof(unquote(_PROOF.match(url.path).group(1)), parse_qs(url.query))
+        elif url.path == "/metrics":
+            self._send_metrics()
+        else:
+            self._send_plain(404, b"Not Found")
+
+    def do_HEAD(self):
+        path = urlsplit(self.path).path
+        if path == "/ledger/raw":
+            self._send_raw(body=False)
+        elif _SEGMENT.match(path):
+            self._send_segment(int(_SEGMENT.match(path).group(1)), body=False)
+        else:
+            self._send_plain(404, b"", body=False)
+
+    def _send_plain(self, code: int, data: bytes, body: bool = True):
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def _send_json(self, data: dict):
+        data = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_metrics(self):
+        """Send this process's counters and latency histograms in Prometheus text format."""
+        data = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_raw(self, body: bool = True):
+        """Send the ledger file as stored (NDJSON) with sendfile, without parsing it.
+
+        The ETag is the length of the complete lines plus the chain head, so
+        `If-None-Match` gets a 304 until the ledger grows. A single `Range`
+        (e.g. `bytes=<size>-` to fetch only the new tail) gets a 206, and
+        `If-Range` falls back to the whole file if the ledger has changed.
+        """
+        try:
+            f = open(LEDGER_PATH, "rb")
+        except FileNotFoundError:
+            self._send_plain(404, b"Ledger not found", body)
+            return
+        except OSError as e:
+            self.send_error(500, f"Error reading ledger: {str(e)}")
+            return
+        with f:
+            length, head = _complete_view(f)
+            self._send_file(f, length, f'"{length:x}-{head[:16]}"', body)
+
+    def _send_segments(self):
+        """List the seals of the sealed segments, oldest first."""
+        try:
+            seals = list_seals(LEDGER_PATH)
+        except (OSError, ValueError) as e:
+            self.send_error(500, f"Error reading segments: {str(e)}")
+            return
+        for seal in seals:
+            seal.pop("path")
+        self._send_json({"status": "ok", "segments": seals})
+
+    def _send_tail(self, query):
+        """Stream the stored lines of every event after `after`, for replication.
+
+        Unlike `/ledger`, this reads through sealed segments too, so a
+        follower can catch up from any sequence number. If `hash` is given it
+        must be the hash of event `after`, otherwise the ledgers have diverged
+        and the answer is 409. With `wait=<seconds>` an up-to-date follower's
+        request is held open until new events arrive (long polling).
+        """
+        try:
+            after = int(query.get("after", ["-1"])[0])
+            limit = int(query["limit"][0]) if "limit" in query else None
+            wait = min(float(query.get("wait", ["0"])[0]), MAX_TAIL_WAIT)
+        except ValueError:
+            self.send_error(400, "after, limit and wait must be numbers")
+            return
+        claimed = query.get("hash", [None])[0]
+        try:
+            if claimed is not None and after >= 0:
+                event = read_event(after, LEDGER_PATH)
+                if event is None or event.get("hash") != claimed:
+                    self.send_error(409, f"Event {after} does not have hash {claimed}")
                     return
-            
-            response = {
+            deadline = time.monotonic() + wait
+            stamp = None
+            while True:
+                try:
+                    st = os.stat(LEDGER_PATH)
+                    current = (st.st_ino, st.st_size)
+                except FileNotFoundError:
+                    current = None
+                if current != stamp:
+                    stamp = current
+                    lines = _iter_lines(LEDGER_PATH, after + 1)
+                    first = next(lines, None)
+                    if first is not None and first[1].endswith(b"\n"):
+                        break
+                    lines.close()
+                if time.monotonic() >= deadline:
+                    first = None
+                    break
+                time.sleep(TAIL_POLL_INTERVAL)
+        except (OSError, ValueError) as e:
+            self.send_error(500, f"Error reading ledger: {str(e)}")
+            return
+
+        chunked = self.request_version != "HTTP/1.0"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        out = _ChunkedWriter(self.wfile, chunked)
+        if first is not None:
+            try:
+                sent = 0
+                for _, line in chain((first,), lines):
+                    if not line.endswith(b"\n") or (limit is not None and sent >= limit):
+                        break
+                    out.write(line)
+                    sent += 1
+            finally:
+                lines.close()
+        out.close()
+
+    def _send_stream(self, query):
+        """Push events to the client as Server-Sent Events while they are appended.
+
+        Each event is sent as `id: <seq>` plus its stored line as `data`, so
+        a reconnecting EventSource resumes from `Last-Event-ID`; `since=<seq>`
+        does the same explicitly (default: only events appended from now on).
+        `actor` and `action` filter the events sent. New events come from the
+        shared LedgerBroadcaster, so the ledger is read once for all
+        subscribers; only a client further behind than its buffer reads the
+        file itself, in pages, until it catches up. A comment line is sent
+        every STREAM_KEEPALIVE seconds while nothing happens.
+        """
+        cursor = query.get("since", [self.headers.get("Last-Event-ID")])[0]
+        try:
+            cursor = int(cursor) if cursor is not None else None
+        except ValueError:
+            self.send_error(400, "since and Last-Event-ID must be sequence numbers")
+            return
+        actor = query.get("actor", [None])[0]
+        action = query.get("action", [None])[0]
+        try:
+            broadcaster = get_broadcaster(LEDGER_PATH)
+        except (OSError, ValueError) as e:
+            self.send_error(500, f"Error reading ledger: {str(e)}")
+            return
+        if cursor is None:
+            cursor = broadcaster.next_seq - 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self.wfile.write(b"retry: 2000\n\n")
+            written = time.monotonic()
+            while not getattr(self.server, "_stopping", False):
+                try:
+                    entries = broadcaster.wait_for(cursor, STREAM_KEEPALIVE)
+                except LookupError:
+                    entries = []
+                    for seq, line in islice(_iter_lines(LEDGER_PATH, cursor + 1), STREAM_CATCHUP_PAGE):
+                        if not line.endswith(b"\n"):
+                            break
+                        try:
+                            event = json.loads(line)
+                            entries.append((seq, line.rstrip(b"\r\n"), event.get("actor"), event.get("action")))
+                        except (ValueError, AttributeError):
+                            print(f"[STREAM] Skipping unreadable ledger line at seq {seq}")
+                            entries.append((seq, None, None, None))
+                    if not entries:
+                        return  # the ledger no longer holds the events after the cursor
+                out = []
+                for seq, line, event_actor, event_action in entries:
+                    if line is not None and (actor is None or event_actor == actor) and \
+                            (action is None or event_action == action):
+                        out.append(b"id: %d\ndata: %s\n\n" % (seq, line))
+                    cursor = seq
+                if not out and time.monotonic() - written >= STREAM_KEEPALIVE:
+                    out.append(b": keepalive\n\n")
+                if out:
+                    self.wfile.write(b"".join(out))
+                    written = time.monotonic()
+        except OSError:
+            pass  # the client went away
+
+    def _send_root(self, query):
+        """Send the Merkle root over the ledger's events.
+
+        `size=N` gives the root over the first N events instead of all of
+        them, and `from=M` adds the proof that the tree of M events (a root
+        the client saw earlier) is a prefix of this one; check it with
+        `merkle.verify_consistency`.
+
+        `ledger_size` is the number of events in the ledger, so clients can
+        see when the tree lags behind it. A ledger without a tree (written
+        before trees were kept, or only by `merkle=False` writers) gets a 503
+        rather than the empty root.
+        """
+        merkle = get_merkle(LEDGER_PATH)
+        try:
+            size = int(query["size"][0]) if "size" in query else merkle.size()
+            old = int(query["from"][0]) if "from" in query else None
+        except ValueError:
+            self.send_error(400, "size and from must be integers")
+            return
+        try:
+            ledger_size = count_events(LEDGER_PATH)
+            if ledger_size and not merkle.size():
+                self._send_tree_missing(0, ledger_size)
+                return
+            result = {"status": "ok", "size": size, "ledger_size": ledger_size, "root": merkle.root(size)}
+            if old is not None:
+                result["from"] = old
+                result["from_root"] = merkle.root(old)
+                result["consistency"] = merkle.consistency_proof(old, size)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        except (OSError, LookupError) as e:
+            self.send_error(500, f"Error reading Merkle tree: {str(e)}")
+            return
+        self._send_json(result)
+
+    def _send_proof(self, event: str, query):
+        """Send an inclusion proof for one event, given by id or hash.
+
+        The response holds the event, its sequence number (the leaf index),
+        the audit path and the root of the tree it was proved against (all
+        events, or the first `size=N`); check it with
+        `merkle.verify_event_proof`. Events the tree does not cover yet get a
+        503, as does an unknown id while the tree is behind the ledger.
+        """
+        merkle = get_merkle(LEDGER_PATH)
+        try:
+            size = int(query["size"][0]) if "size" in query else merkle.size()
+        except ValueError:
+            self.send_error(400, "size must be an integer")
+            return
+        try:
+            seq = find_seq(event, LEDGER_PATH) if _EVENT_HASH.match(event) else merkle.seq_of_id(event)
+            tree_size = merkle.size()
+            if seq is None or seq >= tree_size:
+                ledger_size = count_events(LEDGER_PATH)
+                if seq is not None or (tree_size < ledger_size and not _EVENT_HASH.match(event)):
+                    self._send_tree_missing(tree_size, ledger_size)
+                else:
+                    self.send_error(404, "Unknown event")
+                return
+            if seq >= size:
+                self.send_error(400, f"Event {seq} is not in a tree of size {size}")
+                return
+            result = {
                 "status": "ok",
-                "count": len(events),
-                "events": events
+                "seq": seq,
+                "tree_size": size,
+                "root": merkle.root(size),
+                "audit_path": merkle.inclusion_proof(seq, size),
+                "event": read_event(seq, LEDGER_PATH),
             }
-            self.wfile.write(json.dumps(response, indent=2).encode("utf-8"))
-        else:
-            self.send_response(404)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        except (OSError, LookupError) as e:
+            self.send_error(500, f"Error reading Merkle tree: {str(e)}")
+            return
+        self._send_json(result)
+
+    def _send_tree_missing(self, tree_size: int, ledger_size: int):
+        """Send a 503 for a Merkle tree that does not cover the ledger yet."""
+        self.send_error(503, f"Merkle tree covers {tree_size} of {ledger_size} events; "
+                             "rebuild it with python -m cerl_preemptive.consent_ledger --merkle")
+
+    def _send_segment(self, number: int, body: bool = True):
+        """Send sealed segment `number` as stored. It never changes, so it is cacheable forever."""
+        try:
+            seal = next((s for s in list_seals(LEDGER_PATH) if s["segment"] == number), None)
+            f = open(seal["path"], "rb") if seal is not None else None
+        except (OSError, ValueError) as e:
+            self.send_error(500, f"Error reading segment: {str(e)}")
+            return
+        if f is None:
+            self._send_plain(404, b"Segment not found", body)
+            return
+        with f:
+            self._send_file(f, seal["bytes"], f'"{seal["sha256"]}"', body, immutable=True)
+
+    def _send_file(self, f, length: int, etag: str, body: bool, immutable: bool = False):
+        """Send the first `length` bytes of `f`, honouring If-None-Match, Range and If-Range."""
+        match = self.headers.get("If-None-Match")
+        if match is not None and (match.strip() == "*" or etag in (t.strip() for t in match.split(","))):
+            self.send_response(304)
+            self.send_header("ETag", etag)
             self.end_headers()
-            self.wfile.write(b"Not Found")
+            return
+
+        start, stop = 0, length
+        span = None
+        if "Range" in self.headers and self.headers.get("If-Range", etag) == etag:
+            span = _parse_range(self.headers["Range"], length)
+        if span == ():
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{length}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if span:
+            start, stop = span
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{stop - 1}/{length}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(stop - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if immutable:
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        if body and stop > start:
+            self.connection.sendfile(f, start, stop - start)
+
+    def _send_ledger(self, query):
+        """Stream ledger events as JSON or NDJSON without holding them in memory.
+
+        `after=<seq>` returns events with a larger sequence number (0-based
+        line position) and `after_hash=<hash>` those after the event with that
+        hash; both seek through the sidecar ledger index. `limit=N` caps the
+        page size, and `format=ndjson` (or an `Accept: application/x-ndjson`
+        header) writes one event per line. Stored lines are already JSON, so
+        they are copied through unparsed.
+
+        `actor`, `action`, `since` and `until` (epoch seconds or ISO 8601)
+        filter through the secondary indexes, so the cost follows the number
+        of matching events rather than the ledger size.
+
+        After rotation the sealed segments are served first, each through its
+        own index, then the active file; sequence numbers run across them.
+        """
+        try:
+            after = int(query.get("after", ["-1"])[0])
+            limit = int(query["limit"][0]) if "limit" in query else None
+        except ValueError:
+            self.send_error(400, "after and limit must be integers")
+            return
+        try:
+            since = _parse_time(query["since"][0]) if "since" in query else None
+            until = _parse_time(query["until"][0]) if "until" in query else None
+        except ValueError:
+            self.send_error(400, "since and until must be epoch seconds or ISO 8601")
+            return
+        actor = query.get("actor", [None])[0]
+        action = query.get("action", [None])[0]
+        if limit is not None and limit < 0:
+            self.send_error(400, "limit must not be negative")
+            return
+        try:
+            seals = list_seals(LEDGER_PATH)
+        except (OSError, ValueError) as e:
+            self.send_error(500, f"Error reading segments: {str(e)}")
+            return
+        if "after_hash" in query:
+            found = find_seq(query["after_hash"][0], LEDGER_PATH)
+            if found is None:
+                self.send_error(404, "Unknown event hash")
+                return
+            after = found
+        fmt = query.get("format", [""])[0]
+        ndjson = fmt == "ndjson" or (not fmt and "application/x-ndjson" in self.headers.get("Accept", ""))
+
+        chunked = self.request_version != "HTTP/1.0"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson" if ndjson else "application/json")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+        out = _ChunkedWriter(self.wfile, chunked)
+        count, last_seq = 0, None
+        if not ndjson:
+            out.write(b'{"status": "ok", "events": [')
+        events = _iter_parts(seals, after, actor, action, since, until)
+        try:
+            for last_seq, line in islice(events, limit):
+                if ndjson:
+                    out.write(line + b"\n")
+                else:
+                    out.write(b"\n" + line if count == 0 else b",\n" + line)
+                count += 1
+        finally:
+            events.close()
+        if not ndjson:
+            tail = {"count": count}
+            if limit is not None:
+                tail["next_after"] = last_seq if count == limit else None
+            out.write(b"], " + json.dumps(tail).encode("utf-8")[1:])
+        out.close()
 
     def log_message(self, format, *args):
         """Override to reduce log verbosity."""
         pass
 
-def run_server(port=PORT):
+class BoundedThreadingHTTPServer(HTTPServer):
+    """HTTP server that handles each connection on a bounded worker pool.
+
+    At most `max_connections` connections (keep-alive ones included) are
+    served at once. When every slot is busy the accept loop waits for one to
+    free up, leaving further clients queued in the listen backlog, so load
+    beyond the limit turns into latency instead of unbounded threads.
+    Idle keep-alive connections are closed after `idle_timeout` seconds.
+    """
+
+    def __init__(self, server_address, handler_class, max_connections: int = MAX_CONNECTIONS,
+                 idle_timeout: float = IDLE_TIMEOUT, backlog: int = 128):
+        self.request_queue_size = backlog
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="audit")
+        self._stopping = False
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        while not self._slots.acquire(timeout=0.5):
+            if self._stopping:
+                self.shutdown_request(request)
+                return
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def shutdown(self):
+        self._stopping = True
+        super().shutdown()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def run_server(port=PORT, threaded: bool = True, max_connections: int = MAX_CONNECTIONS,
+               idle_timeout: float = IDLE_TIMEOUT):
     server_address = ("", port)
-    with HTTPServer(server_address, AuditHandler) as httpd:
+    if threaded:
+        httpd = BoundedThreadingHTTPServer(server_address, AuditHandler, max_connections, idle_timeout)
+    else:
+        httpd = HTTPServer(server_address, AuditHandler)
+    with httpd:
         print(f"Audit Trail API running at http://localhost:{port}/")
         httpd.serve_forever()
 
 if __name__ == "__main__":
-    run_server()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CERL-Preemptive audit trail API")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--ledger", default=None, help=f"ledger to serve (default: {LEDGER_PATH})")
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+    parser.add_argument("--single-threaded", action="store_true")
+    args = parser.parse_args()
+    if args.ledger is not None:
+        LEDGER_PATH = args.ledger
+    run_server(args.port, not args.single_threaded, args.max_connections, args.idle_timeout)
@@ -1,26 +1,102 @@
-import hashlib, json, os, time, uuid
+import hashlib, hmac, json, mmap, os, queue, threading, time, uuid, weakref
+from concurrent.futures import Future, ProcessPoolExecutor
 from typing import Optional
 
+try:
+    import fcntl
+except ImportError:  # not available on Windows; appends are then only thread-safe
+    fcntl = None
+
+# Handle both relative and absolute imports
+try:
+    from . import metrics
+    from .ledger_index import LedgerIndex
+    from .merkle import MerkleAccumulator
+except ImportError:
+    import metrics
+    from ledger_index import LedgerIndex
+    from merkle import MerkleAccumulator
+
 LEDGER_PATH = "ledger.jsonl"
+SEGMENT_SUFFIX = ".cerlseg"  # ledgers with this suffix use the binary ledger_segment backend
+GENESIS_HASH = "0" * 64
+DURABILITY_POLICIES = ("none", "batch", "every-event")
+_TAIL_CHUNK = 8192
+_PARALLEL_MIN_BYTES = 1 << 20
+
+# Line formats. Both hash the same canonical encoding of the event,
+# json.dumps(event_without_hash, sort_keys=True), so an event has the same
+# hash in either format. v1 stores json.dumps(event) and must be parsed and
+# re-serialized to verify. v2 stores the canonical bytes themselves with the
+# version marker and hash appended at fixed offsets from the end:
+#   <canonical without its closing brace>, "v": 2, "hash": "<64 hex>"}
+# so the hashed bytes are line[:-85] + b"}" and no parse is needed. That
+# shortcut is only taken for lines in the writer's key layout, ending
+# `, "prev_hash": "<64 hex>", "timestamp": <number>` before the tail: with
+# no keys after them, that prev_hash can only be the top-level one. Other
+# lines are parsed and re-canonicalized.
+LINE_VERSION = 2
+LINE_VERSIONS = (1, 2)
+_V2_MARK = b', "v": 2'
+_V2_HASH = b', "hash": "'
+_V2_TAIL = len(_V2_MARK) + len(_V2_HASH) + 64 + 2
+_V2_HEAD = b'{"action": "'
+_V2_PREV = b', "prev_hash": "'
+_V2_TIME = b'", "timestamp": '
+_EVENT_KEYS = frozenset(("timestamp", "id", "actor", "action", "payload", "consent_token", "prev_hash", "hash"))
+
+# Sealed segments. A rotated ledger keeps its active file at the ledger path
+# and moves full segments to <ledger>.segments/NNNNNN.jsonl, each with a
+# NNNNNN.jsonl.seal JSON summary written after the segment verified. The
+# first event of each segment chains onto the last event of the one before.
+SEAL_SUFFIX = ".seal"
 
 def _hash(data: str) -> str:
     return hashlib.sha256(data.encode("utf-8")).hexdigest()
 
-def last_hash() -> str:
-    if not os.path.exists(LEDGER_PATH):
-        return "0" * 64
-    with open(LEDGER_PATH, "rb") as f:
-        lines = f.readlines()
-    if not lines:
-        return "0" * 64
-    try:
-        last = json.loads(lines[-1].decode())
-        return last.get("hash", "0" * 64)
+def _line_hash(line: bytes) -> str:
+    if not line:
+        return GENESIS_HASH
+    parts = _v2_split(line)
+    if parts is not None:
+        return parts[1]
+    try:
+        return json.loads(line.decode()).get("hash", GENESIS_HASH)
     except Exception:
-        return "0" * 64
+        return GENESIS_HASH
 
-def append_event(actor: str, action: str, payload: dict, consent_token: Optional[str] = None):
-    prev = last_hash()
+def _tail_line(f, end: int):
+    """Return (offset, line) of the last non-blank line before `end`, reading backward."""
+    buf = b""
+    pos = end
+    while pos > 0:
+        step = min(_TAIL_CHUNK, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+        stripped = buf.rstrip()
+        nl = stripped.rfind(b"\n")
+        if nl != -1:
+            return pos + nl + 1, stripped[nl + 1:]
+    return 0, buf.rstrip()
+
+def _count_lines(f, start: int, end: int) -> int:
+    f.seek(start)
+    count, remaining = 0, end - start
+    while remaining > 0:
+        chunk = f.read(min(1 << 20, remaining))
+        if not chunk:
+            break
+        count += chunk.count(b"\n")
+        remaining -= len(chunk)
+    return count
+
+def _build_event(actor: str, action: str, payload: dict, consent_token: Optional[str], prev: str) -> dict:
+    return _encode_event(actor, action, payload, consent_token, prev, 1)[0]
+
+def _encode_event(actor: str, action: str, payload: dict, consent_token: Optional[str], prev: str,
+                  version: int = LINE_VERSION):
+    """Return (event dict, stored line bytes), serializing the event only once for v2."""
     event = {
         "timestamp": time.time(),
         "id": str(uuid.uuid4()),
@@ -32,24 +108,1125 @@ def append_event(actor: str, action: str, payload: dict, consent_token: Optional
     }
     raw = json.dumps(event, sort_keys=True)
     event["hash"] = _hash(raw)
-    with open(LEDGER_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(event) + "\n")
-    return event["hash"]
-
-def verify_chain() -> bool:
-    if not os.path.exists(LEDGER_PATH):
-        return True
-    prev = "0" * 64
-    with open(LEDGER_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            event = json.loads(line)
-            raw = {k: event[k] for k in event if k != "hash"}
-            check = _hash(json.dumps(raw, sort_keys=True))
-            if check != event["hash"] or event["prev_hash"] != prev:
-                return False
-            prev = event["hash"]
-    return True
+    if version == 2:
+        return event, _v2_line(raw, event["hash"])
+    return event, (json.dumps(event) + "\n").encode("utf-8")
+
+def _v2_line(canonical: str, event_hash: str) -> bytes:
+    return f'{canonical[:-1]}, "v": 2, "hash": "{event_hash}"}}\n'.encode("utf-8")
+
+def _v2_split(line: bytes):
+    """Return (hashed bytes, hash, prev_hash) for a v2 line in the writer's key layout, else None."""
+    line = line.rstrip()
+    n = len(line)
+    if (n <= _V2_TAIL or line[n - 2:] != b'"}' or line[n - _V2_TAIL:n - 77] != _V2_MARK
+            or line[n - 77:n - 66] != _V2_HASH or not line.startswith(_V2_HEAD)):
+        return None
+    end = n - _V2_TAIL
+    t = line.rfind(_V2_TIME, end - 40, end)
+    if t < 80 or line[t - 80:t - 64] != _V2_PREV or not line[t + 16:end].lstrip(b"-").replace(b".", b"", 1).isdigit():
+        return None
+    return line[:end] + b"}", line[n - 66:n - 2].decode("ascii"), line[t - 64:t].decode("ascii")
+
+def _file_digest(f, length: int) -> str:
+    f.seek(0)
+    digest = hashlib.sha256()
+    while length > 0:
+        chunk = f.read(min(1 << 20, length))
+        if not chunk:
+            break
+        digest.update(chunk)
+        length -= len(chunk)
+    return digest.hexdigest()
+
+def segments_dir(path=None) -> str:
+    """Return the directory holding the sealed segments of the ledger at `path`."""
+    return f"{os.fspath(path if path is not None else LEDGER_PATH)}.segments"
+
+def _seal_order(name: str):
+    number = name.split(".", 1)[0]
+    return (int(number), name) if number.isdigit() else (-1, name)
+
+def list_seals(path=None) -> list:
+    """Return the seals of the ledger's sealed segments in chain order.
+
+    Each seal is the parsed `.seal` file plus `"path"`, the segment file. A
+    seal whose segment file is missing (sealing interrupted before the move)
+    is ignored; its events are still in the active file.
+    """
+    directory = segments_dir(path)
+    try:
+        names = sorted((n for n in os.listdir(directory) if n.endswith(SEAL_SUFFIX)), key=_seal_order)
+    except FileNotFoundError:
+        return []
+    seals = []
+    for name in names:
+        segment = os.path.join(directory, name[:-len(SEAL_SUFFIX)])
+        if not os.path.exists(segment):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                seal = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"Unreadable seal {name}: {e}") from e
+        seal["path"] = segment
+        seals.append(seal)
+    return seals
+
+def _sealed_tail(path) -> tuple:
+    """Return (last hash, event count) of the sealed segments, where the active file continues."""
+    directory = segments_dir(path)
+    try:
+        names = sorted((n for n in os.listdir(directory) if n.endswith(SEAL_SUFFIX)), key=_seal_order, reverse=True)
+    except FileNotFoundError:
+        return GENESIS_HASH, 0
+    for name in names:
+        if os.path.exists(os.path.join(directory, name[:-len(SEAL_SUFFIX)])):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                seal = json.load(f)
+            return seal["last_hash"], seal["first_seq"] + seal["count"]
+    return GENESIS_HASH, 0
+
+_APPEND_LISTENERS = []
+_LISTENERS_LOCK = threading.Lock()
+
+def add_append_listener(callback):
+    """Call `callback(path, records)` after a writer in this process appends; bound methods are held weakly.
+
+    `path` is the writer's ledger path and `records` its `(seq, hash)`
+    pairs. Callbacks run while the writer still holds its lock, so they
+    should only hand the news on (e.g. set an event).
+    """
+    ref = weakref.WeakMethod(callback) if hasattr(callback, "__func__") else (lambda: callback)
+    with _LISTENERS_LOCK:
+        _APPEND_LISTENERS.append(ref)
+
+def _notify_appended(path: str, records: list):
+    if not _APPEND_LISTENERS:
+        return
+    with _LISTENERS_LOCK:
+        callbacks = [ref() for ref in _APPEND_LISTENERS]
+        _APPEND_LISTENERS[:] = [ref for ref, cb in zip(_APPEND_LISTENERS, callbacks) if cb is not None]
+    for callback in callbacks:
+        if callback is not None:
+            callback(path, records)
+
+
+class LedgerWriter:
+    """Appends chained events to one ledger file, keeping the chain head in memory.
+
+    The head (last hash and the byte offset of the last event) is recovered once
+    by reading backward from the end of the file. Before each append the file is
+    stat'ed; if its size or inode no longer matches what this writer last saw,
+    the head is recovered again, so external appends or a replaced file are
+    picked up without rescanning the ledger.
+
+    `durability` controls fsync: "none" leaves flushing to the OS, "batch"
+    fsyncs once per append call (one event for `append`, the whole list for
+    `append_batch`) and "every-event" fsyncs after each event.
+
+    With `lock=True` (the default where fcntl is available) every append holds
+    an exclusive `flock` on the ledger while it re-reads the head and writes, so
+    several processes can share one ledger without forking the chain.
+
+    With `index=True` the writer also appends each event's sequence number,
+    byte offset and hash to the sidecar LedgerIndex, catching the index up
+    first if the ledger was changed by someone else. With `merkle=True` it
+    likewise extends the ledger's MerkleAccumulator, so `/root` and `/proof`
+    can be answered without reading the ledger.
+
+    New events are stored in `line_version` format (v2, the canonical
+    encoding, by default); a ledger may mix v1 and v2 lines.
+
+    With `rotate_bytes` or `rotate_seconds` set, the active file is sealed
+    and moved to the segments directory before an append once it has grown
+    past `rotate_bytes` or its first event is older than `rotate_seconds`
+    (see `rotate`). Sequence numbers and the chain continue across segments.
+    """
+
+    def __init__(self, path, durability: str = "none", lock: bool = True, index: bool = True,
+                 line_version: int = LINE_VERSION, rotate_bytes: Optional[int] = None,
+                 rotate_seconds: Optional[float] = None, merkle: bool = True):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy: {durability}")
+        if line_version not in LINE_VERSIONS:
+            raise ValueError(f"Unknown line version: {line_version}")
+        self.path = os.fspath(path)
+        self.durability = durability
+        self.line_version = line_version
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.lock = lock and fcntl is not None
+        self._lock = threading.Lock()
+        self._fd = None
+        self._fd_ino = None
+        self._head = GENESIS_HASH
+        self._offset = 0
+        self._size = 0
+        self._seq = 0
+        self._base = 0
+        self._ino = None
+        self._first_ts = None
+        self.index = LedgerIndex(self.path) if index else None
+        self._index_synced = False
+        self.merkle = MerkleAccumulator(self.path) if merkle else None
+        self._merkle_synced = False
+        with self._lock:
+            self._recover()
+
+    def _close_fd(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = self._fd_ino = None
+
+    def _recover(self):
+        self._index_synced = False
+        sealed_head, self._base = _sealed_tail(self.path)
+        try:
+            with open(self.path, "rb") as f:
+                st = os.fstat(f.fileno())
+                if self._seq is not None and st.st_ino == self._ino and st.st_size > self._size:
+                    self._seq += _count_lines(f, self._size, st.st_size)
+                else:
+                    self._seq = self._base if st.st_size == 0 else None
+                offset, line = _tail_line(f, st.st_size)
+        except FileNotFoundError:
+            self._close_fd()
+            self._head, self._offset, self._size, self._seq, self._ino = sealed_head, 0, 0, self._base, None
+            return
+        if self._fd_ino is not None and st.st_ino != self._fd_ino:
+            self._close_fd()
+        self._head = _line_hash(line) if line else sealed_head
+        self._offset = offset
+        self._size = st.st_size
+        self._ino = st.st_ino
+
+    def _revalidate(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._ino is not None:
+                self._recover()
+            return
+        if st.st_ino != self._ino or st.st_size != self._size:
+            self._recover()
+
+    def _ensure_seq(self):
+        if self.index is not None and not self._index_synced:
+            self.index.sync()
+            self._index_synced = True
+            self._seq = self._base + self.index.count()
+        elif self._seq is None:
+            with open(self.path, "rb") as f:
+                self._seq = self._base + _count_lines(f, 0, self._size)
+
+    def _open(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._fd_ino = os.fstat(self._fd).st_ino
+        return self._fd
+
+    def _acquire(self):
+        """Open the ledger for appending, lock it if enabled, and bring the head up to date."""
+        if not self.lock:
+            self._revalidate()
+            return self._open()
+        fd = self._open()
+        while True:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == self._fd_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._close_fd()
+            fd = self._open()
+        self._revalidate()
+        return fd
+
+    def _release(self, fd):
+        if self.lock:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def head(self) -> str:
+        """Return the hash of the last event in the ledger."""
+        with self._lock:
+            self._revalidate()
+            return self._head
+
+    def head_offset(self) -> int:
+        """Return the byte offset at which the last event's line starts."""
+        with self._lock:
+            self._revalidate()
+            return self._offset
+
+    def event_count(self) -> int:
+        """Return the number of events in the ledger (the next sequence number)."""
+        with self._lock:
+            self._revalidate()
+            self._ensure_seq()
+            return self._seq
+
+    def _write(self, fd, chunks):
+        if self.durability == "every-event":
+            for data in chunks:
+                os.write(fd, data)
+                os.fsync(fd)
+        else:
+            os.write(fd, b"".join(chunks))
+            if self.durability == "batch":
+                os.fsync(fd)
+
+    def _first_timestamp(self) -> Optional[float]:
+        """Return the timestamp of the active file's first event (read once per file)."""
+        if self._first_ts is None or self._first_ts[0] != self._ino:
+            try:
+                with open(self.path, "rb") as f:
+                    ts = json.loads(f.readline()).get("timestamp")
+            except (OSError, ValueError, AttributeError):
+                ts = None
+            self._first_ts = (self._ino, ts if isinstance(ts, (int, float)) else None)
+        return self._first_ts[1]
+
+    def _should_rotate(self) -> bool:
+        if self._size == 0:
+            return False
+        if self.rotate_bytes is not None and self._size >= self.rotate_bytes:
+            return True
+        if self.rotate_seconds is not None:
+            first = self._first_timestamp()
+            return first is not None and time.time() - first >= self.rotate_seconds
+        return False
+
+    def _seal(self) -> dict:
+        """Verify the locked active file, write its seal and move it into the segments directory."""
+        seals = list_seals(self.path)
+        prev = seals[-1]["last_hash"] if seals else GENESIS_HASH
+        first_seq = seals[-1]["first_seq"] + seals[-1]["count"] if seals else 0
+        with open(self.path, "rb") as f:
+            result = _verify_from(f, 0, first_seq, prev)
+            if not result:
+                raise ValueError(f"Active segment does not verify at byte offset {result.bad_offset} "
+                                 f"({result.reason}); not sealing")
+            f.seek(0)
+            first = json.loads(f.readline())
+            _, line = _tail_line(f, result.offset)
+            last = json.loads(line)
+            digest = _file_digest(f, result.offset)
+        number = seals[-1]["segment"] + 1 if seals else 1
+        directory = segments_dir(self.path)
+        target = os.path.join(directory, f"{number:06d}.jsonl")
+        seal = {
+            "segment": number,
+            "first_seq": first_seq,
+            "count": result.seq - first_seq,
+            "prev_hash": prev,
+            "first_hash": first["hash"],
+            "last_hash": result.head,
+            "bytes": result.offset,
+            "sha256": digest,
+            "first_timestamp": first.get("timestamp"),
+            "last_timestamp": last.get("timestamp"),
+            "sealed_at": time.time(),
+        }
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{target}{SEAL_SUFFIX}.tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            json.dump(seal, out, sort_keys=True)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, target + SEAL_SUFFIX)
+        seal["path"] = target
+        if self.index is not None:
+            # Sealed segments keep their sidecar index; only the active file's is written to.
+            self.index.sync()
+            self.index.close()
+            sealed = LedgerIndex(target)
+            for src, dst in ((self.index.index_path, sealed.index_path), (self.index.hash_path, sealed.hash_path),
+                             (self.index.secondary_dir, sealed.secondary_dir)):
+                if os.path.exists(src):
+                    os.replace(src, dst)
+        os.rename(self.path, target)
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return seal
+
+    def _rotate_locked(self, fd, strict: bool):
+        """Seal the active file while holding `fd`'s lock; return the fd to append through."""
+        try:
+            seal = self._seal()
+        except ValueError as e:
+            if strict:
+                raise
+            print(f"[LEDGER] Not rotating {self.path}: {e}")
+            return fd, None
+        self._release(fd)
+        self._close_fd()
+        return self._acquire(), seal
+
+    def rotate(self) -> Optional[dict]:
+        """Seal the active file now and start a new one; return the seal, or None if it is empty.
+
+        The active file is verified first (ValueError if it does not verify),
+        then summarized in `<segment>.seal` (first and last hash, event count,
+        byte length and SHA-256 digest) and moved to `segments_dir(path)`
+        together with its sidecar index. The next event chains onto its last hash.
+        """
+        with self._lock:
+            fd = self._acquire()
+            seal = None
+            try:
+                if self._size:
+                    fd, seal = self._rotate_locked(fd, strict=True)
+            finally:
+                self._release(fd)
+            return seal
+
+    def _append(self, items, want_seq: bool) -> list:
+        with self._lock:
+            fd = self._acquire()
+            try:
+                fd = self._prepare(fd, want_seq)
+                encoded, head = [], self._head
+                for actor, action, payload, consent_token in items:
+                    event, data = _encode_event(actor, action, payload, consent_token, head, self.line_version)
+                    head = event["hash"]
+                    encoded.append((event, data))
+                return self._write_events(fd, encoded)
+            finally:
+                self._release(fd)
+
+    def _prepare(self, fd, want_seq: bool):
+        """Rotate if due and make sure the sequence number is known; return the fd to append through."""
+        if self._should_rotate():
+            fd, _ = self._rotate_locked(fd, strict=False)
+        if want_seq or self.index is not None or self.merkle is not None:
+            self._ensure_seq()
+        return fd
+
+    def _write_events(self, fd, encoded) -> list:
+        """Write `(event, line bytes)` pairs chained onto the head, then update the index and Merkle tree."""
+        records, chunks, entries, events = [], [], [], []
+        offset, seq = self._size, self._seq
+        for event, data in encoded:
+            records.append((seq, event["hash"]))
+            events.append((event["hash"], event.get("id")))
+            if self.index is not None:
+                entries.append((seq - self._base, offset, event))
+            chunks.append(data)
+            offset += len(data)
+            if seq is not None:
+                seq += 1
+        if not chunks:
+            return records
+        self._write(fd, chunks)
+        if self.index is not None:
+            try:
+                self.index.add(entries)
+            except OSError:
+                self._index_synced = False
+        if self.merkle is not None:
+            self._extend_merkle(records, events)
+        self._ino = self._fd_ino
+        self._offset = offset - len(chunks[-1])
+        self._size = offset
+        self._head = records[-1][1]
+        self._seq = seq
+        _notify_appended(self.path, records)
+        return records
+
+    def append_raw(self, lines, prev: Optional[str] = None) -> list:
+        """Append stored event lines from another ledger unchanged; return `(seq, hash)` for each.
+
+        Every line must verify and chain onto the one before it, the first
+        onto this ledger's head. If `prev` is given, the head must also be
+        `prev`. On any mismatch ValueError is raised and nothing is written.
+        """
+        with self._lock:
+            fd = self._acquire()
+            try:
+                fd = self._prepare(fd, True)
+                if prev is not None and prev != self._head:
+                    raise ValueError(f"Ledger head is {self._head}, not {prev}")
+                encoded, head = [], self._head
+                for i, line in enumerate(lines):
+                    line = line.rstrip(b"\r\n") + b"\n"
+                    try:
+                        ok, event_hash, event_prev = _line_link(line, strict=True)
+                        event = json.loads(line)
+                    except (ValueError, KeyError, TypeError) as e:
+                        raise ValueError(f"Event {self._seq + i} is malformed: {e}") from e
+                    if not ok:
+                        raise ValueError(f"Event {self._seq + i} does not match its hash")
+                    if event_prev != head:
+                        raise ValueError(f"Event {self._seq + i} does not chain onto {head}")
+                    head = event_hash
+                    encoded.append((event, line))
+                return self._write_events(fd, encoded)
+            finally:
+                self._release(fd)
+
+    def _extend_merkle(self, records, events):
+        """Add just-written events to the Merkle tree, catching it up from the ledger if it lags."""
+        try:
+            if self._merkle_synced and self.merkle.size() == records[0][0]:
+                self.merkle.add(events)
+            else:
+                self.merkle.sync()
+                self._merkle_synced = True
+        except (OSError, ValueError) as e:
+            self._merkle_synced = False
+            print(f"[LEDGER] Merkle tree for {self.path} not updated: {e}")
+
+    def append_records(self, items) -> list:
+        """Chain `(actor, action, payload, consent_token)` tuples in order and write them together.
+
+        Returns `(seq, hash)` for each event, in the same order as `items`.
+        """
+        return self._append(items, want_seq=True)
+
+    def append_batch(self, items) -> list:
+        """Like `append_records`, but return only the event hashes."""
+        return [h for _, h in self._append(items, want_seq=False)]
+
+    def append_record(self, actor: str, action: str, payload: dict, consent_token: Optional[str] = None):
+        """Append one event and return its `(seq, hash)`."""
+        return self.append_records([(actor, action, payload, consent_token)])[0]
+
+    def append(self, actor: str, action: str, payload: dict, consent_token: Optional[str] = None) -> str:
+        """Chain a new event onto the head and append it to the ledger file."""
+        return self.append_batch([(actor, action, payload, consent_token)])[0]
+
+    def close(self):
+        with self._lock:
+            self._close_fd()
+            if self.index is not None:
+                self.index.close()
+            if self.merkle is not None:
+                self.merkle.close()
+
+
+class GroupCommitWriter:
+    """Queues events from concurrent callers and commits them in batches.
+
+    A background thread drains the queue, chains everything it finds (up to
+    `max_batch` events) through `LedgerWriter.append_batch` and resolves each
+    caller's future with its event hash. With the "batch" policy that is one
+    buffered write and one fsync per batch, however many callers contributed.
+    """
+
+    _BARRIER = object()
+
+    def __init__(self, writer: LedgerWriter, max_batch: int = 1024):
+        self.writer = writer
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="ledger-group-commit", daemon=True)
+        self._thread.start()
+
+    def _submit(self, item, with_seq: bool) -> Future:
+        if self._closed:
+            raise RuntimeError("GroupCommitWriter is closed")
+        future = Future()
+        self._queue.put((future, item, with_seq))
+        return future
+
+    def submit(self, actor: str, action: str, payload: dict, consent_token: Optional[str] = None) -> Future:
+        """Queue an event; the returned future resolves to its hash once written."""
+        return self._submit((actor, action, payload, consent_token), False)
+
+    def submit_record(self, actor: str, action: str, payload: dict, consent_token: Optional[str] = None) -> Future:
+        """Queue an event; the returned future resolves to its `(seq, hash)` once written."""
+        return self._submit((actor, action, payload, consent_token), True)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every event submitted before this call has been written."""
+        future = Future()
+        self._queue.put((future, self._BARRIER, False))
+        future.result(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._queue.put(None)
+                    break
+                batch.append(entry)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        pending = [entry for entry in batch if entry[1] is not self._BARRIER]
+        try:
+            records = self.writer.append_records([item for _, item, _ in pending])
+        except Exception as e:
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+        for (future, _, with_seq), record in zip(pending, records):
+            future.set_result(record if with_seq else record[1])
+        for future, item, _ in batch:
+            if item is self._BARRIER:
+                future.set_result(None)
+
+
+_WRITERS = {}
+_COMMITTERS = {}
+_REMOTES = {}
+_WRITERS_LOCK = threading.Lock()
+
+def _ledger_key(path=None) -> str:
+    return os.path.abspath(os.fspath(path if path is not None else LEDGER_PATH))
+
+def _segment_module():
+    try:
+        from . import ledger_segment
+    except ImportError:
+        import ledger_segment
+    return ledger_segment
+
+def get_writer(path=None) -> LedgerWriter:
+    """Return the shared writer for `path` (defaults to the current LEDGER_PATH).
+
+    Paths ending in SEGMENT_SUFFIX get a `ledger_segment.SegmentWriter`.
+    """
+    key = _ledger_key(path)
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            if key.endswith(SEGMENT_SUFFIX):
+                writer = _WRITERS[key] = _segment_module().SegmentWriter(key)
+            else:
+                writer = _WRITERS[key] = LedgerWriter(key)
+        return writer
+
+def enable_group_commit(path=None, durability: str = "batch", max_batch: int = 1024) -> GroupCommitWriter:
+    """Route `append_event` for `path` through a shared GroupCommitWriter."""
+    writer = get_writer(path)
+    with _WRITERS_LOCK:
+        committer = _COMMITTERS.get(writer.path)
+        if committer is None:
+            writer.durability = durability
+            committer = _COMMITTERS[writer.path] = GroupCommitWriter(writer, max_batch)
+        return committer
+
+def disable_group_commit(path=None):
+    """Flush and stop group commit for `path`; appends become synchronous again."""
+    with _WRITERS_LOCK:
+        committer = _COMMITTERS.pop(_ledger_key(path), None)
+    if committer is not None:
+        committer.close()
+
+def set_remote_writer(remote, path=None):
+    """Route `append_event` for `path` to `remote`, e.g. a `ledger_service.LedgerClient`.
+
+    Pass `remote=None` to go back to writing the file from this process.
+    """
+    key = _ledger_key(path)
+    with _WRITERS_LOCK:
+        if remote is None:
+            _REMOTES.pop(key, None)
+        else:
+            _REMOTES[key] = remote
+
+_INDEXES = {}
+
+def get_index(path=None) -> LedgerIndex:
+    """Return a shared read-side LedgerIndex for `path` (defaults to the current LEDGER_PATH)."""
+    key = _ledger_key(path)
+    with _WRITERS_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = LedgerIndex(key)
+        return index
+
+def read_event(seq: int, path=None) -> Optional[dict]:
+    """Return event number `seq` (0-based), seeking via the sidecar index where it is current.
+
+    Sequence numbers run across sealed segments; older events are read from
+    the segment that holds them.
+    """
+    if seq < 0:
+        return None
+    target = _ledger_key(path)
+    for seal in reversed(list_seals(target)):
+        if seq >= seal["first_seq"] + seal["count"]:
+            seq -= seal["first_seq"] + seal["count"]
+            break
+        if seq >= seal["first_seq"]:
+            target, seq = seal["path"], seq - seal["first_seq"]
+            break
+    offset, at = get_index(target).locate(seq)
+    try:
+        with open(target, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if at == seq:
+                    return json.loads(line)
+                at += 1
+    except FileNotFoundError:
+        pass
+    return None
+
+def find_seq(event_hash: str, path=None) -> Optional[int]:
+    """Return the sequence number of the event with hash `event_hash`, or None if unknown.
+
+    The active file's index is searched first, then the sealed segments' from newest to oldest.
+    Events a stale or missing index does not cover are scanned.
+    """
+    seals = list_seals(path)
+    seq = get_index(path).find_hash(event_hash)
+    if seq is not None:
+        return seq + (seals[-1]["first_seq"] + seals[-1]["count"] if seals else 0)
+    for seal in reversed(seals):
+        index = get_index(seal["path"])
+        if index.count() < seal["count"]:
+            index.sync()
+        seq = index.find_hash(event_hash)
+        if seq is not None:
+            return seal["first_seq"] + seq
+    return None
+
+def count_events(path=None) -> int:
+    """Return the number of complete events across the sealed segments and the active file."""
+    key = _ledger_key(path)
+    seals = list_seals(key)
+    return (seals[-1]["first_seq"] + seals[-1]["count"] if seals else 0) + get_index(key).ledger_count()
+
+def _iter_lines(path=None, start: int = 0):
+    """Yield `(seq, line)` for every event from `start` on, across sealed segments and the active file."""
+    key = _ledger_key(path)
+    seals = list_seals(key)
+    parts = [(seal["path"], seal["first_seq"], seal["first_seq"] + seal["count"]) for seal in seals]
+    parts.append((key, parts[-1][2] if parts else 0, None))
+    for target, first, end in parts:
+        if end is not None and start >= end:
+            continue
+        local = max(start - first, 0)
+        offset, at = get_index(target).locate(local)
+        try:
+            with open(target, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if at >= local:
+                        yield first + at, line
+                    at += 1
+        except FileNotFoundError:
+            pass
+
+_MERKLES = {}
+
+def get_merkle(path=None) -> MerkleAccumulator:
+    """Return a shared read-side MerkleAccumulator for `path` (defaults to the current LEDGER_PATH)."""
+    key = _ledger_key(path)
+    with _WRITERS_LOCK:
+        merkle = _MERKLES.get(key)
+        if merkle is None:
+            merkle = _MERKLES[key] = MerkleAccumulator(key)
+        return merkle
+
+@metrics.timed("last_hash")
+def last_hash() -> str:
+    return get_writer().head()
+
+@metrics.timed("append_event")
+def append_event(actor: str, action: str, payload: dict, consent_token: Optional[str] = None):
+    key = _ledger_key()
+    remote = _REMOTES.get(key)
+    if remote is not None:
+        return remote.append(actor, action, payload, consent_token)
+    committer = _COMMITTERS.get(key)
+    if committer is not None:
+        return committer.submit(actor, action, payload, consent_token).result()
+    return get_writer(key).append(actor, action, payload, consent_token)
+
+@metrics.timed("append_events")
+def append_events(items, path=None) -> list:
+    """Append `(actor, action, payload, consent_token)` tuples as one chained batch; return their hashes.
+
+    Routed like `append_event`: through the remote service or group committer
+    when one is installed, otherwise written by this process's writer in a
+    single locked append. `path` defaults to the current LEDGER_PATH.
+    """
+    items = list(items)
+    if not items:
+        return []
+    key = _ledger_key(path)
+    remote = _REMOTES.get(key)
+    if remote is not None:
+        return [h for _, h in remote.append_records(items)]
+    committer = _COMMITTERS.get(key)
+    if committer is not None:
+        futures = [committer.submit(*item) for item in items]
+        return [f.result() for f in futures]
+    return get_writer(key).append_batch(items)
+
+class VerifyResult:
+    """Outcome of `verify_chain`; truthy when the chain is intact.
+
+    `offset`, `seq` and `head` describe the verified prefix (end byte offset,
+    number of events, last hash). On failure `bad_offset` is the byte offset of
+    the first event that does not verify and `reason` says why.
+    """
+
+    def __init__(self, ok: bool, offset: int, seq: int, head: str,
+                 bad_offset: Optional[int] = None, reason: Optional[str] = None):
+        self.ok = ok
+        self.offset = offset
+        self.seq = seq
+        self.head = head
+        self.bad_offset = bad_offset
+        self.reason = reason
+
+    def __bool__(self):
+        return self.ok
+
+    def __repr__(self):
+        if self.ok:
+            return f"VerifyResult(ok=True, events={self.seq}, offset={self.offset})"
+        return f"VerifyResult(ok=False, bad_offset={self.bad_offset}, seq={self.seq}, reason={self.reason!r})"
+
+
+def _event_hash_ok(event: dict) -> bool:
+    raw = {k: event[k] for k in event if k != "hash" and k != "v"}
+    return _hash(json.dumps(raw, sort_keys=True)) == event["hash"]
+
+def _line_link(line: bytes, strict: bool = False):
+    """Return (hash verifies, hash, prev_hash) for one stored event line.
+
+    v2 lines in the writer's key layout are checked by hashing their stored
+    bytes; other lines are parsed and re-serialized. With `strict`, such v2
+    lines must also parse to an event whose canonical encoding is those
+    bytes, as lines taken from elsewhere must before they are stored.
+    Raises ValueError, KeyError or TypeError if malformed.
+    """
+    parts = _v2_split(line)
+    if parts is not None:
+        body, event_hash, prev = parts
+        ok = hashlib.sha256(body).hexdigest() == event_hash
+        if not ok or not strict:
+            return ok, event_hash, prev
+    event = json.loads(line)
+    return _event_hash_ok(event), event["hash"], event["prev_hash"]
+
+def _line_verifies(line: bytes) -> bool:
+    try:
+        return _line_link(line)[0]
+    except (ValueError, KeyError, TypeError):
+        return False
+
+def _verify_from(f, offset: int, seq: int, prev: str) -> VerifyResult:
+    f.seek(offset)
+    for line in f:
+        try:
+            ok, event_hash, event_prev = _line_link(line)
+        except (ValueError, KeyError, TypeError) as e:
+            return VerifyResult(False, offset, seq, prev, offset, f"malformed event: {e}")
+        if not ok:
+            return VerifyResult(False, offset, seq, prev, offset, "hash mismatch")
+        if event_prev != prev:
+            return VerifyResult(False, offset, seq, prev, offset, "broken prev_hash link")
+        prev = event_hash
+        offset += len(line)
+        seq += 1
+    return VerifyResult(True, offset, seq, prev)
+
+def _verify_chunk(path: str, start: int, end: int) -> dict:
+    """Verify hashes and internal links of the events in [start, end) of a ledger file.
+
+    Runs in a worker process. The first event's prev_hash is returned rather
+    than checked, so the caller can stitch chunk boundaries together.
+    """
+    out = {"count": 0, "first_prev": None, "head": None, "bad_offset": None, "reason": None}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos, prev = start, None
+        while pos < end:
+            nl = mm.find(b"\n", pos, end)
+            stop = end if nl == -1 else nl + 1
+            try:
+                ok, event_hash, event_prev = _line_link(mm[pos:stop])
+                if not ok:
+                    reason = "hash mismatch"
+                elif prev is not None and event_prev != prev:
+                    reason = "broken prev_hash link"
+                else:
+                    reason = None
+            except (ValueError, KeyError, TypeError) as e:
+                reason = f"malformed event: {e}"
+            if reason is not None:
+                out["bad_offset"], out["reason"] = pos, reason
+                return out
+            if prev is None:
+                out["first_prev"] = event_prev
+            prev = out["head"] = event_hash
+            out["count"] += 1
+            pos = stop
+    return out
+
+def _split_chunks(path: str, start: int, end: int, parts: int) -> list:
+    bounds = [start]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, parts):
+            nl = mm.find(b"\n", start + (end - start) * i // parts, end)
+            if nl == -1:
+                break
+            if nl + 1 > bounds[-1] and nl + 1 < end:
+                bounds.append(nl + 1)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+def _verify_parallel(path: str, offset: int, seq: int, prev: str, end: int, workers: int) -> VerifyResult:
+    chunks = _split_chunks(path, offset, end, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_verify_chunk, [path] * len(chunks), *zip(*chunks))
+        for (chunk_start, chunk_end), r in zip(chunks, results):
+            if r["count"] and r["first_prev"] != prev:
+                return VerifyResult(False, chunk_start, seq, prev, chunk_start, "broken prev_hash link")
+            if r["bad_offset"] is not None:
+                head = r["head"] or prev
+                return VerifyResult(False, r["bad_offset"], seq + r["count"], head, r["bad_offset"], r["reason"])
+            offset, seq = chunk_end, seq + r["count"]
+            prev = r["head"] or prev
+    return VerifyResult(True, offset, seq, prev)
+
+def _check_seal(seal: dict, deep: bool) -> dict:
+    """Check one sealed segment against its seal; runs in a worker process when verifying in parallel.
+
+    Deep checks verify every event in the segment; otherwise only the file
+    size is compared with the seal, as the segment was verified when sealed.
+    """
+    if os.path.getsize(seal["path"]) != seal["bytes"]:
+        return {"count": 0, "bad_offset": 0, "reason": "size differs from its seal"}
+    if not deep:
+        return {"count": seal["count"], "bad_offset": None, "reason": None}
+    out = _verify_chunk(seal["path"], 0, seal["bytes"])
+    if out["bad_offset"] is None:
+        if out["count"] and out["first_prev"] != seal["prev_hash"]:
+            out["bad_offset"], out["reason"] = 0, "broken prev_hash link"
+        elif out["count"] != seal["count"] or (out["head"] or seal["prev_hash"]) != seal["last_hash"]:
+            out["bad_offset"], out["reason"] = seal["bytes"], "events differ from its seal"
+    return out
+
+def _verify_seals(seals: list, deep: bool, workers: int) -> VerifyResult:
+    """Check that the seals form one chain from genesis, then check each segment against its seal."""
+    prev, seq = GENESIS_HASH, 0
+    for seal in seals:
+        if seal["prev_hash"] != prev or seal["first_seq"] != seq:
+            name = os.path.basename(seal["path"])
+            return VerifyResult(False, 0, seq, prev, 0, f"{name}: seal does not continue the chain")
+        prev, seq = seal["last_hash"], seq + seal["count"]
+    if deep and workers > 1 and len(seals) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_check_seal, seals, [deep] * len(seals)))
+    else:
+        results = (_check_seal(seal, deep) for seal in seals)
+    for seal, r in zip(seals, results):
+        if r["bad_offset"] is not None:
+            name = os.path.basename(seal["path"])
+            return VerifyResult(False, r["bad_offset"], seal["first_seq"] + r["count"], seal["prev_hash"],
+                                r["bad_offset"], f"{name}: {r['reason']}")
+    return VerifyResult(True, 0, seq, prev)
+
+def _checkpoint_mac(key: bytes, offset: int, seq: int, head: str) -> str:
+    return hmac.new(key, f"{offset}:{seq}:{head}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+def load_checkpoint(checkpoint_path, hmac_key: Optional[bytes] = None) -> Optional[dict]:
+    """Return the saved checkpoint, or None if missing, unreadable or failing its HMAC."""
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            cp = json.load(f)
+        offset, seq, head = int(cp["offset"]), int(cp["seq"]), cp["hash"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if hmac_key is not None:
+        mac = cp.get("mac")
+        if not isinstance(mac, str) or not hmac.compare_digest(mac, _checkpoint_mac(hmac_key, offset, seq, head)):
+            return None
+    return {"offset": offset, "seq": seq, "hash": head}
+
+def save_checkpoint(checkpoint_path, result: VerifyResult, hmac_key: Optional[bytes] = None):
+    """Atomically persist the verified prefix described by `result`."""
+    cp = {"offset": result.offset, "seq": result.seq, "hash": result.head}
+    if hmac_key is not None:
+        cp["mac"] = _checkpoint_mac(hmac_key, result.offset, result.seq, result.head)
+    tmp = f"{checkpoint_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cp, f)
+    os.replace(tmp, checkpoint_path)
+
+def _reencode_line(line: bytes, line_version: int) -> bytes:
+    event = json.loads(line)
+    event.pop("v", None)
+    # Only events with exactly the standard fields are stored as v2, which keeps
+    # the top-level prev_hash the last one in the line.
+    if line_version == 2 and set(event) == _EVENT_KEYS:
+        return _v2_line(json.dumps({k: v for k, v in event.items() if k != "hash"}, sort_keys=True), event["hash"])
+    return (json.dumps(event) + "\n").encode("utf-8")
+
+def migrate_ledger(path=None, line_version: int = LINE_VERSION) -> int:
+    """Rewrite the ledger with every event in `line_version` format; return how many lines changed.
+
+    Event hashes are the same in both formats, so the chain and anything that
+    refers to event hashes stay valid. Byte offsets change: the sidecar index
+    is rebuilt and incremental verification falls back to a full pass once.
+    The chain is verified while copying and a ledger that does not verify is
+    left untouched. Writers wait on the ledger lock until the file is replaced.
+    """
+    if line_version not in LINE_VERSIONS:
+        raise ValueError(f"Unknown line version: {line_version}")
+    path = _ledger_key(path)
+    tmp = f"{path}.migrate"
+    while True:
+        fd = os.open(path, os.O_RDONLY)
+        if fcntl is None:
+            break
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+    try:
+        changed, prev, offset = 0, GENESIS_HASH, 0
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            for line in src:
+                try:
+                    ok, event_hash, event_prev = _line_link(line, strict=True)
+                    if not ok or event_prev != prev:
+                        raise ValueError("hash mismatch" if not ok else "broken prev_hash link")
+                    out = _reencode_line(line, line_version)
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"Ledger does not verify at byte offset {offset} ({e}); not migrating") from e
+                changed += out != line
+                dst.write(out)
+                prev = event_hash
+                offset += len(line)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if changed:
+            os.replace(tmp, path)
+            index = LedgerIndex(path)
+            if os.path.exists(index.index_path):
+                index.rebuild()
+                index.close()
+        return changed
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        os.close(fd)
+
+@metrics.timed("verify_chain")
+def verify_chain(incremental: bool = False, checkpoint_path=None, hmac_key: Optional[bytes] = None,
+                 update_checkpoint: Optional[bool] = None, path=None, workers: int = 1) -> VerifyResult:
+    """Verify every hash and prev_hash link in the ledger.
+
+    With `incremental=True` verification resumes from the checkpoint saved by
+    the last successful run (`<ledger>.checkpoint` unless `checkpoint_path` is
+    given), after re-hashing the checkpointed head event in place.
+    If the checkpoint is missing, fails its HMAC or no longer matches the
+    ledger, the whole chain is verified instead. Successful incremental runs
+    update the checkpoint; full runs do so only with `update_checkpoint=True`.
+
+    With `workers > 1` the unverified part of the file is split at newline
+    boundaries and the chunks are verified in a process pool, then stitched
+    together by checking each chunk's first prev_hash against the previous
+    chunk's last hash.
+
+    A segment ledger (SEGMENT_SUFFIX) is always verified in full by one process.
+
+    Sealed segments of a rotated ledger are checked first: the seals must
+    chain together, and each segment is verified event by event (one segment
+    per worker when `workers > 1`). Incremental runs skip the events of sealed
+    segments, which were verified when sealed, and only check their sizes.
+    Offsets in the result then refer to the failing segment, named in `reason`,
+    or to the active file.
+    """
+    path = os.fspath(path if path is not None else LEDGER_PATH)
+    if path.endswith(SEGMENT_SUFFIX):
+        return _segment_module().verify_segment(path)
+    if checkpoint_path is None:
+        checkpoint_path = f"{path}.checkpoint"
+    if update_checkpoint is None:
+        update_checkpoint = incremental
+    seals = list_seals(path)
+    sealed = _verify_seals(seals, not incremental, workers)
+    if not sealed:
+        return sealed
+    if not os.path.exists(path):
+        return sealed
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        start = (0, sealed.seq, sealed.head)
+        cp = load_checkpoint(checkpoint_path, hmac_key) if incremental else None
+        if cp is not None:
+            if 0 < cp["offset"] <= size:
+                _, line = _tail_line(f, cp["offset"])
+                if _line_hash(line) == cp["hash"] and _line_verifies(line):
+                    start = (cp["offset"], cp["seq"], cp["hash"])
+        if workers > 1 and size - start[0] >= _PARALLEL_MIN_BYTES:
+            result = _verify_parallel(path, *start, size, workers)
+        else:
+            result = _verify_from(f, *start)
+    if result and update_checkpoint:
+        save_checkpoint(checkpoint_path, result, hmac_key)
+    return result
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CERL-Preemptive ledger integrity check")
+    parser.add_argument("--ledger", default=LEDGER_PATH)
+    parser.add_argument("--incremental", action="store_true", help="resume from the last verified checkpoint")
+    parser.add_argument("--full", action="store_true", help="re-verify from genesis and refresh the checkpoint")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: <ledger>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=1, help="verify in parallel with N processes")
+    parser.add_argument("--migrate", type=int, choices=LINE_VERSIONS, default=None, metavar="VERSION",
+                        help="rewrite every event in line format VERSION before verifying")
+    parser.add_argument("--rotate", action="store_true", help="seal the active file into a new segment first")
+    parser.add_argument("--merkle", action="store_true", help="rebuild the Merkle tree and print its root")
+    args = parser.parse_args()
+    key = os.environ.get("CERL_CHECKPOINT_KEY")
+
+    if args.migrate is not None:
+        print(f"Migrated {migrate_ledger(args.ledger, args.migrate)} events to line format v{args.migrate}.")
+    if args.rotate:
+        seal = LedgerWriter(args.ledger).rotate()
+        print(f"Sealed {seal['count']} events into {seal['path']}." if seal else "Nothing to seal.")
+    if args.merkle:
+        merkle = MerkleAccumulator(args.ledger)
+        merkle.rebuild()
+        print(f"Merkle root over {merkle.size()} events: {merkle.root()}")
+
     print("CERL-Preemptive Ledger initialized.")
-    print("Integrity OK?", verify_chain())
\ No newline at end of file
+    result = verify_chain(
+        incremental=args.incremental and not args.full,
+        checkpoint_path=args.checkpoint,
+        hmac_key=key.encode("utf-8") if key else None,
+        update_checkpoint=args.incremental or args.full,
+        path=args.ledger,
+        workers=args.workers,
+    )
+    print("Integrity OK?", bool(result))
+    if not result:
+        print(f"First bad event at byte offset {result.bad_offset} (seq {result.seq}): {result.reason}")
@@ -1,37 +1,307 @@
-import uuid, time, json
+import hashlib, heapq, uuid, time, json, os, threading, weakref
 from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; compaction is then only thread-safe
+    fcntl = None
+
+# Handle both relative and absolute imports
+try:
+    from . import metrics
+except ImportError:
+    import metrics
 
 TOKENS = Path(__file__).resolve().parents[0] / "tokens.jsonl"
 
+
+class TokenStore:
+    """Hash index from token ID to record for one tokens file.
+
+    The index is built once, from a snapshot sidecar if one matches the file
+    and otherwise by streaming the file, and then kept current by reading only
+    the bytes appended since the last lookup. Lookups are O(1).
+
+    A min-heap keyed on `expiry` lets lookups evict expired tokens as they
+    lapse, and `compact` rewrites the file without them, so both memory and
+    file size track live tokens. An evicted record is kept aside until the
+    next compaction so `get(..., include_expired=True)` can still tell an
+    expired token from an unknown one.
+
+    `revoke` appends a `{"token": ..., "revoked": <time>}` record. Whenever a
+    revocation is indexed, whether this process wrote it or another one did,
+    the listeners registered with `add_revocation_listener` are called.
+    """
+
+    def __init__(self, path, snapshot_path=None):
+        self.path = os.fspath(path)
+        self.snapshot_path = os.fspath(snapshot_path) if snapshot_path is not None else f"{self.path}.snapshot"
+        self._lock = threading.Lock()
+        self._records = {}
+        self._expired = {}
+        self._expiries = []
+        self._evicted = 0
+        self._offset = 0
+        self._ino = None
+        self._compactor = None
+        with self._lock:
+            if not self._load_snapshot():
+                self._reset()
+            self._catch_up()
+
+    def _reset(self):
+        self._records = {}
+        self._expired = {}
+        self._expiries = []
+        self._evicted = 0
+        self._offset = 0
+        self._ino = None
+
+    def _index(self, rec: dict):
+        if rec.get("revoked"):
+            if self._records.pop(rec["token"], None) is not None:
+                self._evicted += 1
+            self._expired.pop(rec["token"], None)
+            self._evicted += 1  # the revocation record itself
+            _notify_revoked(rec["token"])
+        elif rec["token"] not in self._records:
+            self._records[rec["token"]] = rec
+            heapq.heappush(self._expiries, (rec["expiry"], rec["token"]))
+
+    def _evict(self, now: float):
+        while self._expiries and self._expiries[0][0] < now:
+            _, token_id = heapq.heappop(self._expiries)
+            rec = self._records.pop(token_id, None)
+            if rec is not None:
+                self._expired[token_id] = rec
+                self._evicted += 1
+
+    def _load_snapshot(self) -> bool:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            st = os.stat(self.path)
+        except (OSError, ValueError):
+            return False
+        if snap.get("ino") != st.st_ino or snap.get("offset", -1) > st.st_size:
+            return False
+        if snap.get("check") != self._tail_check(snap["offset"]):
+            return False
+        self._records = snap["records"]
+        self._expired = snap.get("expired", {})
+        self._expiries = [(rec["expiry"], token_id) for token_id, rec in self._records.items()]
+        heapq.heapify(self._expiries)
+        self._offset = snap["offset"]
+        self._ino = st.st_ino
+        return True
+
+    def _tail_check(self, offset: int) -> str:
+        """Digest of the bytes just before `offset`, to tell a stale snapshot from a current one."""
+        start = max(0, offset - 256)
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+    def _catch_up(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        if st.st_ino == self._ino and st.st_size == self._offset:
+            return
+        if st.st_ino != self._ino or st.st_size < self._offset:
+            self._reset()
+            self._ino = st.st_ino
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    self._index(json.loads(line))
+                self._offset += len(line)
+
+    def _open_locked(self) -> int:
+        """Open the tokens file for appending, holding an exclusive lock on the current inode."""
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if fcntl is None:
+                return fd
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def get(self, token_id: str, include_expired: bool = False) -> Optional[dict]:
+        """Return the record for `token_id`, or None if it was never issued, was revoked or has expired.
+
+        With `include_expired`, a token that expired since the last compaction
+        is returned too; callers compare its `expiry` themselves.
+        """
+        with self._lock:
+            self._catch_up()
+            self._evict(time.time())
+            rec = self._records.get(token_id)
+            if rec is None and include_expired:
+                rec = self._expired.get(token_id)
+            return rec
+
+    def append(self, record: dict):
+        """Append `record` to the tokens file and index it."""
+        data = (json.dumps(record) + "\n").encode("utf-8")
+        with self._lock:
+            fd = self._open_locked()
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            self._catch_up()
+
+    def revoke(self, token_id: str) -> bool:
+        """Revoke `token_id`; return True if it was live."""
+        data = (json.dumps({"token": token_id, "revoked": time.time()}) + "\n").encode("utf-8")
+        with self._lock:
+            self._catch_up()
+            live = token_id in self._records
+            fd = self._open_locked()
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            self._catch_up()
+            return live
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Drop expired tokens from memory; return how many were evicted."""
+        with self._lock:
+            self._catch_up()
+            before = len(self._records)
+            self._evict(time.time() if now is None else now)
+            return before - len(self._records)
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Atomically rewrite the tokens file with only live tokens; return records dropped."""
+        with self._lock:
+            fd = self._open_locked()
+            try:
+                self._catch_up()
+                self._evict(time.time() if now is None else now)
+                tmp = f"{self.path}.compact"
+                with open(tmp, "wb") as f:
+                    for rec in self._records.values():
+                        f.write((json.dumps(rec) + "\n").encode("utf-8"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    st = os.fstat(f.fileno())
+                os.replace(tmp, self.path)
+                dropped, self._evicted = self._evicted, 0
+                self._expired = {}
+                self._ino, self._offset = st.st_ino, st.st_size
+                return dropped
+            finally:
+                os.close(fd)
+
+    def start_compactor(self, interval: float = 3600.0) -> threading.Event:
+        """Compact in a background thread every `interval` seconds; set the returned event to stop."""
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.evict_expired()
+                if self._evicted:
+                    self.compact()
+
+        self._compactor = threading.Thread(target=run, name="token-compactor", daemon=True)
+        self._compactor.start()
+        return stop
+
+    def save_snapshot(self):
+        """Persist the index so the next cold start only streams newer records."""
+        with self._lock:
+            self._catch_up()
+            snap = {
+                "ino": self._ino,
+                "offset": self._offset,
+                "check": self._tail_check(self._offset),
+                "records": self._records,
+                "expired": self._expired
+            }
+            tmp = f"{self.snapshot_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snap, f)
+            os.replace(tmp, self.snapshot_path)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+_REVOCATION_LISTENERS = []
+_LISTENERS_LOCK = threading.Lock()
+
+def add_revocation_listener(callback):
+    """Call `callback(token_id)` whenever a revocation is indexed; bound methods are held weakly."""
+    ref = weakref.WeakMethod(callback) if hasattr(callback, "__func__") else (lambda: callback)
+    with _LISTENERS_LOCK:
+        _REVOCATION_LISTENERS.append(ref)
+
+def _notify_revoked(token_id: str):
+    with _LISTENERS_LOCK:
+        callbacks = [ref() for ref in _REVOCATION_LISTENERS]
+        _REVOCATION_LISTENERS[:] = [ref for ref, cb in zip(_REVOCATION_LISTENERS, callbacks) if cb is not None]
+    for callback in callbacks:
+        if callback is not None:
+            callback(token_id)
+
+def get_store(path=None) -> TokenStore:
+    """Return the shared store for `path` (defaults to the current TOKENS file)."""
+    key = os.path.abspath(os.fspath(path if path is not None else TOKENS))
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = TokenStore(key)
+        return store
+
+def get_token(token_id: str, include_expired: bool = False) -> Optional[dict]:
+    """Return the issued record for `token_id`, or None."""
+    return get_store().get(token_id, include_expired)
+
 def issue_token(actor: str, scope: str, expiry_hours: int = 24):
     """Create a signed consent token with a short lifetime."""
     token_id = str(uuid.uuid4())
     expiry = time.time() + expiry_hours * 3600
     record = {"token": token_id, "actor": actor, "scope": scope, "expiry": expiry}
-    with open(TOKENS, "a", encoding="utf-8") as f:
-        json.dump(record, f)
-        f.write("\n")
+    get_store().append(record)
     print(f"[TOKEN] Issued token {token_id[:8]} for {actor} ({scope})")
     return token_id
 
+def revoke_token(token_id: str) -> bool:
+    """Revoke a consent token before its expiry; return True if it was live."""
+    live = get_store().revoke(token_id)
+    print(f"[TOKEN] Revoked token {token_id[:8]}" if live else "[TOKEN] Token not found")
+    return live
+
+@metrics.timed("validate_token")
 def validate_token(token_id: str) -> bool:
     """Return True if the token exists and is still valid."""
     now = time.time()
-    try:
-        with open(TOKENS, "r", encoding="utf-8") as f:
-            for line in f:
-                rec = json.loads(line)
-                if rec["token"] == token_id:
-                    if now <= rec["expiry"]:
-                        print(f"[TOKEN] Valid token for {rec['actor']}")
-                        return True
-                    print(f"[TOKEN] Expired token for {rec['actor']}")
-                    return False
-    except FileNotFoundError:
-        pass
+    rec = get_token(token_id, include_expired=True)
+    if rec is not None:
+        if now <= rec["expiry"]:
+            print(f"[TOKEN] Valid token for {rec['actor']}")
+            return True
+        print(f"[TOKEN] Expired token for {rec['actor']}")
+        return False
     print("[TOKEN] Token not found")
     return False
 
 if __name__ == "__main__":
     t = issue_token("commons_system", "ledger_write", 1)
-    validate_token(t)
\ No newline at end of file
+    validate_token(t)
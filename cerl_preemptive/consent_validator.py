@@ -3,14 +3,25 @@ CERL-Preemptive Consent Validator
 Validates data access requests against consent requirements.
 """
 
+import threading
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
 
 # Handle both relative and absolute imports
 try:
-    from .consent_ledger import append_event
+    from . import metrics
+    from .async_ledger import AsyncLedgerWriter
+    from .consent_ledger import append_event, append_events
+    from .decision_cache import DecisionCache
+    from .policy_engine import PolicyEngine, get_engine
 except ImportError:
-    from consent_ledger import append_event
+    import metrics
+    from async_ledger import AsyncLedgerWriter
+    from consent_ledger import append_event, append_events
+    from decision_cache import DecisionCache
+    from policy_engine import PolicyEngine, get_engine
+
+VIOLATIONS = metrics.counter("cerl_consent_violations_total", "Consent violations detected by all validators")
 
 
 class ConsentViolationError(Exception):
@@ -18,15 +29,48 @@ class ConsentViolationError(Exception):
     pass
 
 
+class ValidationResult:
+    """Outcome of one request in `validate_many`; truthy when the request is allowed.
+
+    `reason` is the violation message for a denied request and
+    `event_hash` the hash of the ledger event recorded for it.
+    """
+
+    def __init__(self, allowed: bool, reason: Optional[str] = None, event_hash: Optional[str] = None):
+        self.allowed = allowed
+        self.reason = reason
+        self.event_hash = event_hash
+
+    def __bool__(self):
+        return self.allowed
+
+    def __repr__(self):
+        if self.allowed:
+            return f"ValidationResult(allowed, event_hash={self.event_hash!r})"
+        return f"ValidationResult(denied, reason={self.reason!r})"
+
+
 class ConsentValidator:
     """
     Validates requests for data access against consent requirements.
     Ensures that private data is only accessed with proper consent.
     """
 
-    def __init__(self):
-        self.violation_count = 0
+    def __init__(self, policy: Optional[PolicyEngine] = None, cache: Optional[DecisionCache] = None):
+        """
+        Args:
+            policy: Rules deciding which targets are sensitive (the shared
+                engine from `policy_engine.get_engine()` by default)
+            cache: Optional decision cache; repeated requests are then answered
+                from it and logged as compact "consent_decision_cached" events
+                that reference the event of the original decision
+        """
+        self._violations = 0
+        self._violations_lock = threading.Lock()
+        self.policy = policy if policy is not None else get_engine()
+        self.cache = cache
 
+    @metrics.timed("validate_request")
     def validate_request(self, request: Dict[str, Any]) -> bool:
         """
         Validate a data access request.
@@ -40,6 +84,8 @@ class ConsentValidator:
                 - urgency: Urgency level
                 - potential_harm: Potential harm description
                 - actor: (optional) The actor making the request
+                - tenant: (optional) Tenant whose policy rules apply
+                - consent_token: (optional) ID of the consent token backing the request
 
         Returns:
             True if the request is valid and should be allowed
@@ -48,6 +94,63 @@ class ConsentValidator:
         Raises:
             ConsentViolationError: If consent is not granted for private data access
         """
+        allowed, record, error_msg, key = self._decide(request)
+        if not allowed:
+            # This is a consent violation - log it
+            self._count_violation()
+            self._remember(key, allowed, error_msg, append_event(*record))
+            raise ConsentViolationError(error_msg)
+
+        # Request is valid - log successful validation
+        self._remember(key, allowed, error_msg, append_event(*record))
+        return True
+
+    @metrics.timed("validate_many")
+    def validate_many(self, requests: Iterable[Dict[str, Any]]) -> List[ValidationResult]:
+        """
+        Validate a batch of data access requests.
+
+        Every request is evaluated, violations included, and the resulting
+        ledger events are written as one chained batch.
+
+        Args:
+            requests: Request dictionaries, as for `validate_request`
+
+        Returns:
+            One ValidationResult per request, in order
+        """
+        decided = [self._decide(request) for request in requests]
+        hashes = append_events(record for _, record, _, _ in decided)
+        results = []
+        for (allowed, _, error_msg, key), event_hash in zip(decided, hashes):
+            if not allowed:
+                self._count_violation()
+            self._remember(key, allowed, error_msg, event_hash)
+            results.append(ValidationResult(allowed, error_msg, event_hash))
+        return results
+
+    def _decide(self, request: Dict[str, Any]):
+        """Like `_evaluate`, but answer from the decision cache when possible.
+
+        Returns (allowed, ledger record, violation message, cache key); the
+        key is None unless the decision should be remembered once written.
+        """
+        if self.cache is None:
+            return self._evaluate(request) + (None,)
+        key = self.cache.key(request, self.policy.generation)
+        entry = self.cache.get(key)
+        if entry is None:
+            return self._evaluate(request) + (key,)
+        payload = {"ref": entry.event_hash, "allowed": entry.allowed}
+        record = (request.get("actor", "unknown"), "consent_decision_cached", payload, entry.token)
+        return entry.allowed, record, entry.reason, None
+
+    def _remember(self, key, allowed: bool, error_msg: Optional[str], event_hash: Optional[str]):
+        if key is not None and event_hash is not None:
+            self.cache.put(key, allowed, error_msg, event_hash)
+
+    def _evaluate(self, request: Dict[str, Any]):
+        """Return (allowed, ledger record, violation message or None) for one request."""
         action = request.get("action", "")
         target = request.get("target", "")
         purpose = request.get("purpose", "")
@@ -55,6 +158,7 @@ class ConsentValidator:
         potential_harm = request.get("potential_harm", "")
         actor = request.get("actor", "unknown")
         urgency = request.get("urgency", "none")
+        consent_token = request.get("consent_token")
 
         # Log the validation attempt
         validation_payload = {
@@ -67,45 +171,32 @@ class ConsentValidator:
         }
 
         # Check if this is a request for private data
-        is_private_data = "private" in target.lower() or "personal" in target.lower()
+        is_private_data = self.policy.match(target, request.get("tenant")) is not None
 
         # Check consent status
         consent_granted = consent_status == "granted"
 
         # Validate the request
         if is_private_data and not consent_granted:
-            # This is a consent violation - log it
-            self.violation_count += 1
-            append_event(
-                actor=actor,
-                action="consent_violation_detected",
-                payload={
-                    **validation_payload,
-                    "violation_type": "access_without_consent",
-                    "blocked": True,
-                    "timestamp": time.time()
-                }
-            )
-
+            payload = {
+                **validation_payload,
+                "violation_type": "access_without_consent",
+                "blocked": True,
+                "timestamp": time.time()
+            }
             error_msg = (
                 f"Consent violation: Attempt to {action} on {target} "
                 f"for {purpose} without consent. "
                 f"Potential harm: {potential_harm}"
             )
-            raise ConsentViolationError(error_msg)
-
-        # Request is valid - log successful validation
-        append_event(
-            actor=actor,
-            action="consent_validation_passed",
-            payload={
-                **validation_payload,
-                "validated": True,
-                "timestamp": time.time()
-            }
-        )
+            return False, (actor, "consent_violation_detected", payload, consent_token), error_msg
 
-        return True
+        payload = {
+            **validation_payload,
+            "validated": True,
+            "timestamp": time.time()
+        }
+        return True, (actor, "consent_validation_passed", payload, consent_token), None
 
     def check_consent_status(self, consent_status: str) -> bool:
         """
@@ -119,10 +210,104 @@ class ConsentValidator:
         """
         return consent_status == "granted"
 
+    @property
+    def violation_count(self) -> int:
+        """Number of consent violations this validator has detected."""
+        return self._violations
+
+    @violation_count.setter
+    def violation_count(self, value: int):
+        with self._violations_lock:
+            self._violations = value
+
+    def _count_violation(self):
+        # Validators are shared between request threads; `+=` alone would lose counts.
+        with self._violations_lock:
+            self._violations += 1
+        VIOLATIONS.inc()
+
     def get_violation_count(self) -> int:
         """Get the total number of consent violations detected."""
         return self.violation_count
 
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Get the decision cache's hit/miss counters (empty without a cache)."""
+        return self.cache.stats() if self.cache is not None else {}
+
+
+class AsyncConsentValidator(ConsentValidator):
+    """
+    Asyncio counterpart of ConsentValidator.
+    Decisions are made on the event loop and ledger events are queued to an
+    AsyncLedgerWriter, whose background task coalesces them into batched
+    writes off the loop.
+    """
+
+    def __init__(self, writer: Optional[AsyncLedgerWriter] = None, wait_for_ledger: bool = True,
+                 policy: Optional[PolicyEngine] = None, cache: Optional[DecisionCache] = None):
+        """
+        Args:
+            writer: Ledger writer to use (a new one on the current LEDGER_PATH by default)
+            wait_for_ledger: If True, each call returns only once its event is written,
+                as in the synchronous validator; if False, it returns as soon as the
+                event is queued and `flush()` waits for the writes
+            policy, cache: As for ConsentValidator
+        """
+        super().__init__(policy, cache)
+        self.writer = writer if writer is not None else AsyncLedgerWriter()
+        self.wait_for_ledger = wait_for_ledger
+
+    @metrics.timed("async_validate_request")
+    async def validate_request(self, request: Dict[str, Any]) -> bool:
+        """
+        Validate a data access request without blocking the event loop.
+
+        Same arguments, return value and ConsentViolationError as
+        `ConsentValidator.validate_request`.
+        """
+        allowed, record, error_msg, key = self._decide(request)
+        if not allowed:
+            self._count_violation()
+        future = self._submit(record, key, allowed, error_msg)
+        if self.wait_for_ledger:
+            await future
+        if not allowed:
+            raise ConsentViolationError(error_msg)
+        return True
+
+    @metrics.timed("async_validate_many")
+    async def validate_many(self, requests: Iterable[Dict[str, Any]]) -> List[ValidationResult]:
+        """
+        Validate a batch of requests; same results as `ConsentValidator.validate_many`.
+
+        `event_hash` is only filled in when `wait_for_ledger` is set.
+        """
+        decided = [self._decide(request) for request in requests]
+        futures = [self._submit(record, key, allowed, error_msg) for allowed, record, error_msg, key in decided]
+        results = []
+        for (allowed, _, error_msg, _), future in zip(decided, futures):
+            if not allowed:
+                self._count_violation()
+            event_hash = await future if self.wait_for_ledger else None
+            results.append(ValidationResult(allowed, error_msg, event_hash))
+        return results
+
+    def _submit(self, record, key, allowed: bool, error_msg: Optional[str]):
+        """Queue `record`; remember the decision once its event is written."""
+        future = self.writer.submit(*record)
+        if key is not None:
+            future.add_done_callback(
+                lambda f: self._remember(key, allowed, error_msg, f.result())
+                if not f.cancelled() and f.exception() is None else None)
+        return future
+
+    async def flush(self):
+        """Wait until every queued ledger event has been written."""
+        await self.writer.flush()
+
+    async def close(self):
+        await self.writer.close()
+
 
 def validate_data_access_request(
     action: str,
@@ -0,0 +1,153 @@
+"""
+CERL-Preemptive Decision Cache
+Remembers recent consent decisions so repeated requests skip re-evaluation.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Handle both relative and absolute imports
+try:
+    from .consent_token_manager import add_revocation_listener, get_token
+except ImportError:
+    from consent_token_manager import add_revocation_listener, get_token
+
+KEY_FIELDS = ("actor", "action", "target", "purpose", "consent_status", "tenant", "consent_token")
+
+
+class CachedDecision:
+    """A remembered decision and the ledger event that first recorded it."""
+
+    __slots__ = ("allowed", "reason", "event_hash", "expires", "token")
+
+    def __init__(self, allowed: bool, reason: Optional[str], event_hash: str, expires: float,
+                 token: Optional[str]):
+        self.allowed = allowed
+        self.reason = reason
+        self.event_hash = event_hash
+        self.expires = expires
+        self.token = token
+
+
+class DecisionCache:
+    """Bounded LRU cache of consent decisions.
+
+    Entries are keyed on the request fields in KEY_FIELDS plus the policy
+    generation, so a policy reload never serves a stale decision. An entry
+    backed by a consent token (`request["consent_token"]`) lives until that
+    token's `expiry` and is dropped as soon as the token is revoked; every hit
+    on such an entry checks the token store, so a revocation written by another
+    process, or a token compacted away, is seen too. Other entries live for
+    `ttl` seconds. The least recently used entry is evicted
+    once the cache holds `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._by_token = {}
+        self._lock = threading.Lock()
+        add_revocation_listener(self.invalidate_token)
+
+    @staticmethod
+    def key(request: Dict[str, Any], generation: int = 0) -> tuple:
+        """Return the cache key for `request` under policy `generation`."""
+        return (generation,) + tuple(request.get(field) for field in KEY_FIELDS)
+
+    def get(self, key: tuple, now: Optional[float] = None) -> Optional[CachedDecision]:
+        """Return the live decision for `key`, or None; counts a hit or a miss."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.token is None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        # Outside the lock: catching up may replay a revocation, whose listener takes it
+        live = get_token(entry.token) is not None
+        with self._lock:
+            if not live:
+                self._invalidate(entry.token)
+            if self._entries.get(key) is not entry:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, allowed: bool, reason: Optional[str], event_hash: str,
+            now: Optional[float] = None) -> bool:
+        """Remember a decision; return False if its consent token is unknown or expired."""
+        now = time.time() if now is None else now
+        token = key[KEY_FIELDS.index("consent_token") + 1]
+        if token is not None:
+            rec = get_token(token)
+            if rec is None or rec["expiry"] <= now:
+                return False
+            expires = rec["expiry"]
+        else:
+            expires = now + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CachedDecision(allowed, reason, event_hash, expires, token)
+            if token is not None:
+                self._by_token.setdefault(token, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        if entry.token is not None:
+            keys = self._by_token.get(entry.token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_token[entry.token]
+
+    def invalidate_token(self, token_id: str) -> int:
+        """Drop every decision backed by `token_id`; return how many were dropped."""
+        with self._lock:
+            return self._invalidate(token_id)
+
+    def _invalidate(self, token_id: str) -> int:
+        keys = self._by_token.pop(token_id, ())
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_token.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, miss, eviction and invalidation counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -1,28 +1,127 @@
-import time, json, hashlib
+import time, json, re
 from pathlib import Path
 
-LEDGER_PATH = Path(__file__).resolve().parents[0] / "ledger.json"
-
-def heartbeat(interval=60):
-    """Appends a cryptographic heartbeat every `interval` seconds to prove the ledger is alive."""
-    while True:
-        event = {
-            "id": hashlib.sha256(str(time.time()).encode()).hexdigest(),
-            "actor": "system",
-            "payload": "ledger_heartbeat",
-            "timestamp": time.time()
-        }
-        try:
-            with open(LEDGER_PATH, "r", encoding="utf-8") as f:
-                ledger = json.load(f)
-        except:
-            ledger = []
-        ledger.append(event)
-        with open(LEDGER_PATH, "w", encoding="utf-8") as f:
-            json.dump(ledger, f, indent=2)
+# Handle both relative and absolute imports
+try:
+    from . import consent_ledger
+except ImportError:
+    import consent_ledger
+
+LEGACY_PATH = Path(__file__).resolve().parents[0] / "ledger.json"
+MIGRATE_BATCH = 1000
+_READ_CHUNK = 1 << 16
+_WS = re.compile(r"\s*")
+
+def record_heartbeat(interval=None) -> str:
+    """Append one chained heartbeat event to the consent ledger and return its hash."""
+    payload = {"interval": interval} if interval is not None else {}
+    return consent_ledger.append_event("system", "ledger_heartbeat", payload)
+
+def heartbeat(interval=60, ticks=None):
+    """Appends a cryptographic heartbeat every `interval` seconds to prove the ledger is alive.
+
+    Each tick is a single append through `consent_ledger.append_event`, so its
+    cost does not grow with the ledger. Stops after `ticks` heartbeats if given.
+    """
+    beats = 0
+    while ticks is None or beats < ticks:
+        record_heartbeat(interval)
+        beats += 1
         print(f"[HEARTBEAT] Recorded at {time.ctime()}")
-        time.sleep(interval)
+        if ticks is None or beats < ticks:
+            time.sleep(interval)
+
+def iter_legacy_events(f, chunk_size=_READ_CHUNK):
+    """Yield the elements of a JSON array from text file `f` one at a time.
+
+    Only the current element is held in memory, so arbitrarily large legacy
+    `ledger.json` files can be read.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    state = "open"  # then "first", "value" or "sep", and finally "done"
+    while state != "done":
+        pos = _WS.match(buf, pos).end()
+        if pos == len(buf):
+            if eof:
+                if state == "open":
+                    return  # empty file
+                raise ValueError("truncated legacy ledger")
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        ch = buf[pos]
+        if state == "open":
+            if ch != "[":
+                raise ValueError("legacy ledger is not a JSON array")
+            pos, state = pos + 1, "first"
+        elif ch == "]" and state in ("first", "sep"):
+            pos, state = pos + 1, "done"
+        elif state == "sep":
+            if ch != ",":
+                raise ValueError(f"expected ',' in legacy ledger, got {ch!r}")
+            pos, state = pos + 1, "value"
+        else:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                if end == len(buf) and not eof:
+                    raise json.JSONDecodeError("value may continue in the next chunk", buf, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(max(chunk_size, len(buf) - pos))
+                buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+                continue
+            yield value
+            pos, state = end, "sep"
+
+def _legacy_record(event: dict):
+    """Map a legacy heartbeat entry onto an `(actor, action, payload, consent_token)` tuple."""
+    if event.get("action"):
+        action = event["action"]
+    elif event.get("payload") == "ledger_heartbeat":
+        action = "ledger_heartbeat"
+    else:
+        action = "legacy_event"
+    return event.get("actor", "system"), action, {"migrated": event}, event.get("consent_token")
+
+def migrate_legacy(legacy_path=None, ledger_path=None, batch_size=MIGRATE_BATCH) -> int:
+    """Stream a legacy `ledger.json` array into the chained ledger; return events migrated.
+
+    Entries keep their original fields under `payload["migrated"]` and are
+    written in batches through the ledger's writer.
+    """
+    legacy_path = LEGACY_PATH if legacy_path is None else legacy_path
+    writer = consent_ledger.get_writer(ledger_path)
+    migrated = 0
+    batch = []
+    with open(legacy_path, "r", encoding="utf-8") as f:
+        for event in iter_legacy_events(f):
+            batch.append(_legacy_record(event))
+            if len(batch) >= batch_size:
+                writer.append_batch(batch)
+                migrated += len(batch)
+                batch = []
+    if batch:
+        writer.append_batch(batch)
+        migrated += len(batch)
+    return migrated
 
 if __name__ == "__main__":
-    print("[HEARTBEAT] Commons Ethics Framework monitor active.")
-    heartbeat(300)  # 5-minute cycle
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CERL-Preemptive ledger heartbeat")
+    parser.add_argument("--interval", type=float, default=300, help="seconds between heartbeats")
+    parser.add_argument("--ledger", default=None, help="chained ledger (default: consent_ledger.LEDGER_PATH)")
+    parser.add_argument("--migrate", nargs="?", const=str(LEGACY_PATH), default=None, metavar="LEGACY_JSON",
+                        help="convert a legacy ledger.json array into the chained ledger and exit")
+    args = parser.parse_args()
+    if args.ledger:
+        consent_ledger.LEDGER_PATH = args.ledger
+
+    if args.migrate:
+        count = migrate_legacy(args.migrate, args.ledger)
+        print(f"[HEARTBEAT] Migrated {count} legacy events from {args.migrate}")
+    else:
+        print("[HEARTBEAT] Commons Ethics Framework monitor active.")
+        heartbeat(args.interval)  # 5-minute cycle by default
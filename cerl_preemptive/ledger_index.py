@@ -0,0 +1,477 @@
+"""
+CERL-Preemptive Ledger Index
+Sidecar index giving random access into ledger.jsonl by sequence number or hash.
+
+`<ledger>.idx` is a fixed-width array of (seq, byte offset) pairs, one per
+event, so event N lives at byte 16 * N of the index. `<ledger>.hidx` holds
+(raw 32-byte hash, seq) pairs in the same order and is loaded into a dict the
+first time a hash lookup is made.
+
+`<ledger>.sidx/` holds the secondary indexes used for audit queries: one
+posting list of sequence numbers per actor and per action, and a sparse time
+index with one (running maximum timestamp, seq) pair every TIME_STRIDE events.
+
+All files are appended by LedgerWriter as events are written and can be
+rebuilt from the ledger when missing or stale.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Optional
+
+ENTRY = struct.Struct("<QQ")
+HASH_ENTRY = struct.Struct("<32sQ")
+TIME_ENTRY = struct.Struct("<dQ")
+STATE = struct.Struct("<Qd")
+POSTING = "Q"
+TIME_STRIDE = 64
+MAX_OPEN_POSTINGS = 256
+
+
+def _raw_hash(h: str) -> bytes:
+    try:
+        return bytes.fromhex(h)[:32].ljust(32, b"\0")
+    except (TypeError, ValueError):
+        return b"\0" * 32
+
+
+def _posting_name(value) -> str:
+    return hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:40] + ".post"
+
+
+def _in_range(ts, since: Optional[float], until: Optional[float]) -> bool:
+    if not isinstance(ts, (int, float)):
+        return False
+    return (since is None or ts >= since) and (until is None or ts <= until)
+
+
+class LedgerIndex:
+    """Sequence-number and hash index for one ledger file.
+
+    Writers call `add` (after `sync` on first use); readers use `offset_of`,
+    `locate`, `seq_of_hash`, `find_hash` and `iter_matches`, which never
+    modify the index files. `find_hash` and `iter_matches` scan whatever part
+    of the ledger the index does not cover, so a missing or stale index costs
+    time but not results.
+    """
+
+    def __init__(self, ledger_path):
+        self.ledger_path = os.fspath(ledger_path)
+        self.index_path = f"{self.ledger_path}.idx"
+        self.hash_path = f"{self.ledger_path}.hidx"
+        self.secondary_dir = f"{self.ledger_path}.sidx"
+        self.time_path = os.path.join(self.secondary_dir, "time.idx")
+        self.state_path = os.path.join(self.secondary_dir, "state")
+        self._hashes = None
+        self._hashes_read = 0
+        self._hashes_ino = None
+        self._hashes_lock = threading.Lock()
+        self._fds = OrderedDict()
+        self._state_cache = None
+        self._dirs_ready = False
+
+    def _append_bytes(self, path: str, data: bytes):
+        """Append to one of the index files, keeping a bounded set of them open."""
+        fd = self._fds.get(path)
+        if fd is None:
+            if len(self._fds) >= MAX_OPEN_POSTINGS + 3:
+                os.close(self._fds.popitem(last=False)[1])
+            fd = self._fds[path] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        else:
+            self._fds.move_to_end(path)
+        os.write(fd, data)
+
+    def close(self):
+        """Close the files kept open by `add`."""
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        self._state_cache = None
+        self._dirs_ready = False
+
+    def count(self) -> int:
+        """Return the number of indexed events."""
+        try:
+            return os.path.getsize(self.index_path) // ENTRY.size
+        except OSError:
+            return 0
+
+    def _entry(self, seq: int):
+        with open(self.index_path, "rb") as f:
+            f.seek(seq * ENTRY.size)
+            data = f.read(ENTRY.size)
+        return ENTRY.unpack(data) if len(data) == ENTRY.size else None
+
+    def offset_of(self, seq: int) -> Optional[int]:
+        """Return the byte offset of event `seq`, or None if it is not indexed."""
+        if seq < 0:
+            return None
+        try:
+            entry = self._entry(seq)
+        except OSError:
+            return None
+        return entry[1] if entry is not None and entry[0] == seq else None
+
+    def locate(self, seq: int):
+        """Return `(offset, seq)` of the closest indexed event at or before `seq`.
+
+        Falls back to `(0, 0)` when the index is empty or does not fit the
+        ledger, so callers can always scan forward from the result.
+        """
+        seq = min(seq, self.count() - 1)
+        if seq <= 0:
+            return 0, 0
+        offset = self.offset_of(seq)
+        if offset is None or not self._at_line_start(offset):
+            return 0, 0
+        return offset, seq
+
+    def _at_line_start(self, offset: int) -> bool:
+        try:
+            with open(self.ledger_path, "rb") as f:
+                if offset > os.fstat(f.fileno()).st_size:
+                    return False
+                if offset == 0:
+                    return True
+                f.seek(offset - 1)
+                return f.read(1) == b"\n"
+        except OSError:
+            return False
+
+    def seq_of_hash(self, h: str) -> Optional[int]:
+        """Return the sequence number of the event with hash `h`, or None.
+
+        The hashes read so far are cached, keyed on the `.hidx` file's inode,
+        so a file moved away by rotation or truncated by a rebuild is re-read.
+        The cache is shared by the threads of the audit server, so it is read
+        and extended under a lock.
+        """
+        with self._hashes_lock:
+            if self._hashes is None:
+                self._hashes, self._hashes_read = {}, 0
+            try:
+                with open(self.hash_path, "rb") as f:
+                    st = os.fstat(f.fileno())
+                    size = st.st_size
+                    if st.st_ino != self._hashes_ino or size < self._hashes_read:
+                        self._hashes, self._hashes_read, self._hashes_ino = {}, 0, st.st_ino
+                    f.seek(self._hashes_read)
+                    data = f.read(size - self._hashes_read)
+            except OSError:
+                return None
+            usable = len(data) - len(data) % HASH_ENTRY.size
+            for raw, seq in HASH_ENTRY.iter_unpack(data[:usable]):
+                self._hashes[raw] = seq
+            self._hashes_read += usable
+            return self._hashes.get(_raw_hash(h))
+
+    def ledger_count(self) -> int:
+        """Return the number of complete events in the ledger, counting any the index does not cover."""
+        try:
+            f = open(self.ledger_path, "rb")
+        except FileNotFoundError:
+            return 0
+        with f:
+            n, end = self._covered(f)
+            f.seek(end)
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    return n
+                n += chunk.count(b"\n")
+
+    def find_hash(self, h: str) -> Optional[int]:
+        """Return the sequence number of the event with hash `h`, scanning events the index does not cover."""
+        try:
+            f = open(self.ledger_path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            n, end = self._covered(f)
+            seq = self.seq_of_hash(h) if n else None
+            if seq is not None and seq < n:
+                return seq
+            f.seek(end)
+            needle = h.encode("utf-8", "replace")
+            for seq, line in enumerate(f, n):
+                if not line.endswith(b"\n"):
+                    break
+                if needle in line:
+                    try:
+                        if json.loads(line).get("hash") == h:
+                            return seq
+                    except (ValueError, AttributeError):
+                        continue
+        return None
+
+    def add(self, entries):
+        """Append `(seq, offset, event)` entries for newly written events."""
+        if not entries:
+            return
+        count, max_ts = self._state()
+        idx, hidx, times, postings = [], [], [], {}
+        for seq, offset, event in entries:
+            idx.append(ENTRY.pack(seq, offset))
+            hidx.append(HASH_ENTRY.pack(_raw_hash(event.get("hash", "")), seq))
+            for kind in ("actor", "action"):
+                postings.setdefault((kind, _posting_name(event.get(kind))), array(POSTING)).append(seq)
+            ts = event.get("timestamp")
+            if isinstance(ts, (int, float)) and ts > max_ts:
+                max_ts = float(ts)
+            if seq % TIME_STRIDE == 0:
+                times.append(TIME_ENTRY.pack(max_ts, seq))
+        self._append_bytes(self.index_path, b"".join(idx))
+        self._append_bytes(self.hash_path, b"".join(hidx))
+        if not self._dirs_ready:
+            for kind in ("actor", "action"):
+                os.makedirs(os.path.join(self.secondary_dir, kind), exist_ok=True)
+            self._dirs_ready = True
+        for (kind, name), seqs in postings.items():
+            self._append_bytes(os.path.join(self.secondary_dir, kind, name), seqs.tobytes())
+        if times:
+            self._append_bytes(self.time_path, b"".join(times))
+        self._state_cache = (entries[-1][0] + 1, max_ts)
+        fd = self._fds.get(self.state_path)
+        if fd is None:
+            fd = self._fds[self.state_path] = os.open(self.state_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        os.pwrite(fd, STATE.pack(*self._state_cache), 0)
+
+    def _state(self):
+        """Return (events covered by the secondary indexes, running max timestamp)."""
+        if self._state_cache is not None:
+            return self._state_cache
+        try:
+            with open(self.state_path, "rb") as f:
+                data = f.read(STATE.size)
+        except OSError:
+            return 0, float("-inf")
+        return STATE.unpack(data) if len(data) == STATE.size else (0, float("-inf"))
+
+    def _scan(self, f, offset: int, seq: int):
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = {}
+            yield seq, offset, event if isinstance(event, dict) else {}
+            offset += len(line)
+            seq += 1
+
+    def _tail_ok(self, f, n: int):
+        """Return the offset just past indexed event `n - 1`, or None if it does not match the ledger."""
+        entry = self._entry(n - 1)
+        if entry is None or entry[0] != n - 1:
+            return None
+        offset = entry[1]
+        if offset > 0:
+            f.seek(offset - 1)
+            if f.read(1) != b"\n":
+                return None
+        f.seek(offset)
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            return None
+        with open(self.hash_path, "rb") as hf:
+            hf.seek((n - 1) * HASH_ENTRY.size)
+            data = hf.read(HASH_ENTRY.size)
+        if len(data) != HASH_ENTRY.size:
+            return None
+        try:
+            h = json.loads(line).get("hash", "")
+        except ValueError:
+            h = ""
+        if HASH_ENTRY.unpack(data)[0] != _raw_hash(h):
+            return None
+        return offset + len(line)
+
+    def sync(self):
+        """Index any events the ledger has beyond the index; rebuild if the index is stale."""
+        self.close()
+        try:
+            f = open(self.ledger_path, "rb")
+        except FileNotFoundError:
+            self._truncate()
+            return
+        with f:
+            n = self.count()
+            hashes = os.path.getsize(self.hash_path) // HASH_ENTRY.size if os.path.exists(self.hash_path) else 0
+            if n != hashes or self._state()[0] != n:
+                offset = None
+            elif n == 0:
+                offset = 0
+            else:
+                offset = self._tail_ok(f, n)
+            if offset is None:
+                self._truncate()
+                offset, n = 0, 0
+            batch = []
+            for entry in self._scan(f, offset, n):
+                batch.append(entry)
+                if len(batch) >= 4096:
+                    self.add(batch)
+                    batch = []
+            if batch:
+                self.add(batch)
+
+    def rebuild(self):
+        """Discard the index and rebuild it from the ledger."""
+        self._truncate()
+        self.sync()
+
+    def _truncate(self):
+        self.close()
+        for path in (self.index_path, self.hash_path):
+            if os.path.exists(path):
+                with open(path, "wb"):
+                    pass
+        shutil.rmtree(self.secondary_dir, ignore_errors=True)
+        self._hashes, self._hashes_read = None, 0
+
+    def _time_bisect(self, ts: float, strict: bool):
+        """Return (position of the first sparse entry whose running max is >= `ts`
+        (> `ts` if strict), number of sparse entries). Entry i covers seq i * TIME_STRIDE."""
+        try:
+            f = open(self.time_path, "rb")
+        except OSError:
+            return 0, 0
+        with f:
+            n = os.fstat(f.fileno()).st_size // TIME_ENTRY.size
+            lo, hi = 0, n
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(mid * TIME_ENTRY.size)
+                max_ts = TIME_ENTRY.unpack(f.read(TIME_ENTRY.size))[0]
+                if max_ts > ts or (not strict and max_ts == ts):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            return lo, n
+
+    def _postings(self, kind: str, value, lo: int, hi: int) -> array:
+        seqs = array(POSTING)
+        try:
+            with open(os.path.join(self.secondary_dir, kind, _posting_name(value)), "rb") as f:
+                seqs.frombytes(f.read())
+        except OSError:
+            return seqs
+        return seqs[bisect_left(seqs, lo):bisect_left(seqs, hi)]
+
+    def query(self, actor=None, action=None, since: Optional[float] = None, until: Optional[float] = None,
+              after: int = -1):
+        """Yield candidate sequence numbers for events matching every given filter, in order.
+
+        Actor and action filters are exact (posting lists). The time range is
+        narrowed with the sparse time index, which bounds `since` exactly and
+        assumes events were appended in timestamp order for `until`; callers
+        should still check timestamps on the events they read.
+        """
+        lo, hi = after + 1, self.count()
+        if since is not None:
+            pos, _ = self._time_bisect(since, strict=False)
+            if pos > 0:
+                lo = max(lo, (pos - 1) * TIME_STRIDE + 1)
+        if until is not None:
+            pos, n = self._time_bisect(until, strict=True)
+            if pos < n:
+                hi = min(hi, pos * TIME_STRIDE)
+        if lo >= hi:
+            return
+        lists = [
+            self._postings(kind, value, lo, hi)
+            for kind, value in (("actor", actor), ("action", action)) if value is not None
+        ]
+        if not lists:
+            yield from range(lo, hi)
+            return
+        lists.sort(key=len)
+        others = [set(seqs) for seqs in lists[1:]]
+        for seq in lists[0]:
+            if all(seq in other for other in others):
+                yield seq
+
+    def _covered(self, f):
+        """Return (events, byte offset) of the ledger prefix the index describes, checked against the ledger."""
+        n = min(self.count(), self._state()[0])
+        if n == 0:
+            return 0, 0
+        try:
+            offset = self._tail_ok(f, n)
+        except OSError:
+            offset = None
+        return (0, 0) if offset is None else (n, offset)
+
+    def iter_matches(self, actor=None, action=None, since: Optional[float] = None,
+                     until: Optional[float] = None, after: int = -1):
+        """Yield `(seq, raw line)` for ledger events matching every given filter.
+
+        Events the index covers are found through it; any after that (an index
+        that is missing, or behind the ledger) are scanned and filtered here.
+        """
+        try:
+            f = open(self.ledger_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            n, end = self._covered(f)
+            for seq in self.query(actor, action, since, until, after):
+                if seq >= n:
+                    break
+                offset = self.offset_of(seq)
+                if offset is None:
+                    return
+                f.seek(offset)
+                line = f.readline().rstrip(b"\r\n")
+                if (since is not None or until is not None) and \
+                        not _in_range(json.loads(line).get("timestamp"), since, until):
+                    continue
+                yield seq, line
+            f.seek(end)
+            seq = n - 1
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                seq += 1
+                if seq <= after:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(event, dict):
+                    continue
+                if (actor is not None and str(event.get("actor")) != actor) or \
+                        (action is not None and str(event.get("action")) != action):
+                    continue
+                if (since is not None or until is not None) and not _in_range(event.get("timestamp"), since, until):
+                    continue
+                yield seq, line.rstrip(b"\r\n")
+
+
+if __name__ == "__main__":
+    try:
+        from .consent_ledger import LEDGER_PATH
+    except ImportError:
+        from consent_ledger import LEDGER_PATH
+
+    parser = argparse.ArgumentParser(description="CERL-Preemptive ledger index maintenance")
+    parser.add_argument("--ledger", default=LEDGER_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild from scratch instead of catching up")
+    args = parser.parse_args()
+
+    index = LedgerIndex(args.ledger)
+    if args.rebuild:
+        index.rebuild()
+    else:
+        index.sync()
+    print(f"Indexed {index.count()} events of {args.ledger}")
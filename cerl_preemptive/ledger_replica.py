@@ -0,0 +1,156 @@
+"""
+CERL-Preemptive Ledger Replication
+Keeps a follower ledger in step with a leader's audit API by copying only the events it lacks.
+
+The follower asks the leader for `/ledger/tail?after=<its last seq>&hash=<its head>`
+and receives the stored lines of every later event, across sealed segments.
+Each batch is verified (every event's hash, and the chain from the
+follower's head through the batch) and appended unchanged with
+`LedgerWriter.append_raw`, so both ledgers hold byte-identical events and the
+same Merkle roots. Once caught up, requests carry `wait=<seconds>` and the leader holds
+them open until new events arrive. A leader whose event `after` has a
+different hash answers 409: the ledgers have diverged, and the follower stops.
+"""
+
+import argparse
+import threading
+import time
+from http.client import HTTPConnection, HTTPException
+from typing import Optional
+from urllib.parse import urlsplit
+
+# Handle both relative and absolute imports
+try:
+    from .consent_ledger import LedgerWriter
+except ImportError:
+    from consent_ledger import LedgerWriter
+
+BATCH_SIZE = 1000
+WAIT = 10.0
+RETRY_DELAY = 1.0
+
+
+class ReplicationError(Exception):
+    """Raised when the leader's events cannot be applied to the follower's ledger."""
+    pass
+
+
+class LedgerFollower:
+    """Replicates the ledger served by the audit API at `leader_url` into `path`.
+
+    The follower's ledger must only be written by its follower: an event
+    appended there directly makes it diverge from the leader. `applied`
+    counts the events copied so far and `last_applied` is when the latest
+    batch was written (time.time()).
+    """
+
+    def __init__(self, leader_url: str, path, batch_size: int = BATCH_SIZE, wait: float = WAIT,
+                 timeout: float = 30.0, **writer_options):
+        url = urlsplit(leader_url if "//" in leader_url else f"http://{leader_url}")
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.batch_size = batch_size
+        self.wait = wait
+        self.timeout = timeout
+        self.writer = LedgerWriter(path, **writer_options)
+        self.applied = 0
+        self.last_applied = None
+        self._conn = None
+
+    def _request(self, path: str, wait: float):
+        if self._conn is None:
+            self._conn = HTTPConnection(self.host, self.port, timeout=self.timeout + wait)
+        try:
+            self._conn.request("GET", path)
+            return self._conn.getresponse()
+        except (OSError, HTTPException):
+            self.close()
+            raise
+
+    def _apply(self, lines) -> int:
+        if not lines:
+            return 0
+        try:
+            self.writer.append_raw(lines)
+        except ValueError as e:
+            raise ReplicationError(f"Rejected events from {self.host}:{self.port}: {e}") from e
+        self.applied += len(lines)
+        self.last_applied = time.time()
+        return len(lines)
+
+    def sync_once(self, wait: float = 0.0, limit: Optional[int] = None) -> int:
+        """Fetch and apply the events after the follower's head; return how many were applied.
+
+        With `wait` > 0 the leader holds the request until there is at least
+        one new event or `wait` seconds have passed.
+        """
+        seq = self.writer.event_count()
+        query = f"after={seq - 1}&wait={wait}"
+        if seq:
+            query += f"&hash={self.writer.head()}"
+        if limit is not None:
+            query += f"&limit={limit}"
+        resp = self._request(f"/ledger/tail?{query}", wait)
+        if resp.status != 200:
+            body = resp.read().decode("utf-8", "replace")
+            if resp.status == 409:
+                raise ReplicationError(f"Follower diverged from {self.host}:{self.port} at event {seq - 1}")
+            raise ReplicationError(f"Leader answered {resp.status}: {body[:200]}")
+        applied, batch = 0, []
+        try:
+            while True:
+                line = resp.readline()
+                if not line:
+                    break
+                batch.append(line)
+                if len(batch) >= self.batch_size:
+                    applied += self._apply(batch)
+                    batch = []
+            applied += self._apply(batch)
+        except (OSError, HTTPException):
+            self.close()
+            applied += self._apply([line for line in batch if line.endswith(b"\n")])
+            raise
+        except ReplicationError:
+            self.close()
+            raise
+        if resp.will_close:
+            self.close()
+        return applied
+
+    def run(self, stop: Optional[threading.Event] = None):
+        """Follow the leader until `stop` is set, retrying after connection errors."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.sync_once(wait=self.wait)
+            except (OSError, HTTPException) as e:
+                print(f"[REPLICA] Leader {self.host}:{self.port} unreachable: {e}")
+                stop.wait(RETRY_DELAY)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replicate a CERL-Preemptive ledger from a leader's audit API")
+    parser.add_argument("--leader", required=True, help="leader audit API, e.g. http://host:8080")
+    parser.add_argument("--ledger", required=True, help="follower ledger to write")
+    parser.add_argument("--once", action="store_true", help="catch up once and exit")
+    parser.add_argument("--wait", type=float, default=WAIT, help="long-poll wait in seconds")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    follower = LedgerFollower(args.leader, args.ledger, args.batch_size, args.wait)
+    try:
+        if args.once:
+            print(f"[REPLICA] Applied {follower.sync_once()} events from {args.leader}")
+        else:
+            follower.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.close()
+        follower.writer.close()
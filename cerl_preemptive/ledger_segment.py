@@ -0,0 +1,451 @@
+"""
+CERL-Preemptive Ledger Segments
+Compact binary storage for the consent ledger (`*.cerlseg` files).
+
+A segment starts with a 12-byte header (magic, format version) followed by
+length-prefixed records: a little-endian u32 byte count and then the record,
+whose first byte is its kind.
+
+- KIND_STRING defines the next entry of the string table (UTF-8 text).
+  Actors and actions are stored once and referred to by table position.
+- KIND_EVENT is a chained event: a struct-packed header with the float
+  timestamp, actor and action string ids, the 16-byte id and the raw 32-byte
+  prev_hash and hash, then the consent token and the canonical JSON payload.
+- KIND_RAW holds an event as its JSONL line, for events that do not fit the
+  compact layout (extra fields, non-UUID ids, hashes that do not verify).
+
+Event hashes are the same as in JSONL: the canonical encoding hashed by
+`consent_ledger` is rebuilt from the record, so a ledger converts both ways
+without breaking its chain.
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import time
+import uuid
+from typing import Optional
+
+# Handle both relative and absolute imports
+try:
+    from . import consent_ledger
+    from .consent_ledger import GENESIS_HASH, LINE_VERSION, LedgerWriter, VerifyResult
+except ImportError:
+    import consent_ledger
+    from consent_ledger import GENESIS_HASH, LINE_VERSION, LedgerWriter, VerifyResult
+
+MAGIC = b"CERLSEG\0"
+SEGMENT_VERSION = 1
+HEADER = struct.Struct("<8sHH")
+LENGTH = struct.Struct("<I")
+# kind, timestamp, actor id, action id, id, prev_hash, hash, token length (-1: no token)
+EVENT = struct.Struct("<BdII16s32s32si")
+KIND_STRING, KIND_EVENT, KIND_RAW = 0, 1, 2
+_GENESIS = bytes(32)
+
+
+def _uuid_text(raw: bytes) -> str:
+    h = raw.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _canonical(ts: float, event_id: str, actor: str, action: str, token: Optional[str],
+               payload_json: str, prev: str) -> bytes:
+    """Return json.dumps(event_without_hash, sort_keys=True) as bytes, built field by field.
+
+    json.dumps writes a finite float as its repr, which is what is used here.
+    """
+    return (f'{{"action": {json.dumps(action)}, "actor": {json.dumps(actor)}, '
+            f'"consent_token": {json.dumps(token)}, "id": "{event_id}", "payload": {payload_json}, '
+            f'"prev_hash": "{prev}", "timestamp": {ts!r}}}').encode("utf-8")
+
+
+def _is_hex_hash(value) -> bool:
+    try:
+        return isinstance(value, str) and len(value) == 64 and bytes.fromhex(value).hex() == value
+    except ValueError:
+        return False
+
+
+def _record(kind: int, body: bytes) -> bytes:
+    return LENGTH.pack(len(body) + 1) + bytes((kind,)) + body
+
+
+class _StringTable:
+    """Interned actor and action strings, in order of their KIND_STRING records."""
+
+    def __init__(self):
+        self.ids = {}
+        self.encoded = []
+
+    def add(self, text: str):
+        self.ids[text] = len(self.encoded)
+        self.encoded.append((text, json.dumps(text).encode("utf-8")))
+
+    def intern(self, text: str, out: list) -> int:
+        """Return the id of `text`, appending a KIND_STRING record to `out` if it is new."""
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = len(self.encoded)
+            self.add(text)
+            out.append(_record(KIND_STRING, text.encode("utf-8")))
+        return sid
+
+
+def _pack_event(table: _StringTable, out: list, ts: float, event_id: bytes, actor: str, action: str,
+                token: Optional[str], payload_json: str, prev: bytes, event_hash: bytes):
+    actor_id = table.intern(actor, out)
+    action_id = table.intern(action, out)
+    token_bytes = b"" if token is None else token.encode("utf-8")
+    body = EVENT.pack(KIND_EVENT, ts, actor_id, action_id, event_id, prev, event_hash,
+                      -1 if token is None else len(token_bytes))
+    body += token_bytes + payload_json.encode("utf-8")
+    out.append(LENGTH.pack(len(body)) + body)
+
+
+def _pack_line(table: _StringTable, out: list, line: bytes):
+    """Append the records for one JSONL line, compact if the event round-trips exactly."""
+    line = line.rstrip(b"\r\n")
+    try:
+        event = json.loads(line)
+        event.pop("v", None)
+        ts, actor, action, token = event["timestamp"], event["actor"], event["action"], event["consent_token"]
+        event_id = uuid.UUID(event["id"])
+        if (set(event) == consent_ledger._EVENT_KEYS and type(ts) is float and math.isfinite(ts)
+                and isinstance(actor, str) and isinstance(action, str) and (token is None or isinstance(token, str))
+                and str(event_id) == event["id"] and _is_hex_hash(event["prev_hash"])
+                and _is_hex_hash(event["hash"])):
+            payload_json = json.dumps(event["payload"], sort_keys=True)
+            canonical = _canonical(ts, event["id"], actor, action, token, payload_json, event["prev_hash"])
+            if hashlib.sha256(canonical).hexdigest() == event["hash"]:
+                _pack_event(table, out, ts, event_id.bytes, actor, action, token, payload_json,
+                            bytes.fromhex(event["prev_hash"]), bytes.fromhex(event["hash"]))
+                return True
+    except (ValueError, KeyError, TypeError, AttributeError):
+        pass
+    out.append(_record(KIND_RAW, line))
+    return False
+
+
+class SegmentReader:
+    """Memory-mapped reader for one segment file.
+
+    Records are decoded straight from the mapping. A record cut short at the
+    end of the file (an append in progress or a crash) is not read; `end` is
+    the offset just past the last complete record after a full pass.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        if self.size:
+            if self.size < HEADER.size:
+                self.close()
+                raise ValueError(f"{self.path} is not a ledger segment")
+            magic, version, _ = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != SEGMENT_VERSION:
+                self.close()
+                raise ValueError(f"{self.path} is not a version {SEGMENT_VERSION} ledger segment")
+        self.end = HEADER.size if self.size else 0
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def records(self):
+        """Yield `(offset, end, kind, table)` for every complete event record."""
+        mm, size, unpack = self._mm, self.size, LENGTH.unpack_from
+        table = _StringTable()
+        pos = self.end = HEADER.size if size else 0
+        while pos + LENGTH.size <= size:
+            (n,) = unpack(mm, pos)
+            end = pos + LENGTH.size + n
+            if n == 0 or end > size:
+                break
+            kind = mm[pos + LENGTH.size]
+            if kind == KIND_STRING:
+                table.add(mm[pos + 5:end].decode("utf-8"))
+            else:
+                yield pos, end, kind, table
+            pos = self.end = end
+
+    def _decode(self, pos: int, end: int, kind: int, table: _StringTable) -> dict:
+        mm = self._mm
+        if kind == KIND_RAW:
+            return json.loads(mm[pos + 5:end])
+        _, ts, actor_id, action_id, event_id, prev, event_hash, token_len = EVENT.unpack_from(mm, pos + 4)
+        p = pos + 4 + EVENT.size
+        token = None
+        if token_len >= 0:
+            token = mm[p:p + token_len].decode("utf-8")
+            p += token_len
+        return {
+            "timestamp": ts,
+            "id": _uuid_text(event_id),
+            "actor": table.encoded[actor_id][0],
+            "action": table.encoded[action_id][0],
+            "payload": json.loads(mm[p:end]),
+            "consent_token": token,
+            "prev_hash": prev.hex(),
+            "hash": event_hash.hex(),
+        }
+
+    def scan(self, actor: Optional[str] = None, action: Optional[str] = None):
+        """Yield events in order, optionally only those with the given actor and action.
+
+        Compact records are filtered on their interned ids, so events that do
+        not match are skipped without decoding their payload.
+        """
+        for pos, end, kind, table in self.records():
+            if kind == KIND_EVENT and (actor is not None or action is not None):
+                actor_id, action_id = struct.unpack_from("<II", self._mm, pos + 13)
+                if ((actor is not None and table.ids.get(actor) != actor_id)
+                        or (action is not None and table.ids.get(action) != action_id)):
+                    continue
+                yield self._decode(pos, end, kind, table)
+                continue
+            event = self._decode(pos, end, kind, table)
+            if (actor is None or event.get("actor") == actor) and (action is None or event.get("action") == action):
+                yield event
+
+    def __iter__(self):
+        return self.scan()
+
+    def _canonical(self, pos: int, end: int, table: _StringTable):
+        """Return (hashed bytes, raw hash, raw prev_hash) rebuilt from a compact event record."""
+        mm = self._mm
+        _, ts, actor_id, action_id, event_id, prev, event_hash, token_len = EVENT.unpack_from(mm, pos + 4)
+        p = pos + 4 + EVENT.size
+        if token_len < 0:
+            token = b"null"
+        else:
+            token = json.dumps(mm[p:p + token_len].decode("utf-8")).encode("utf-8")
+            p += token_len
+        canonical = b"".join((
+            b'{"action": ', table.encoded[action_id][1], b', "actor": ', table.encoded[actor_id][1],
+            b', "consent_token": ', token, b', "id": "', _uuid_text(event_id).encode("ascii"),
+            b'", "payload": ', mm[p:end], b', "prev_hash": "', prev.hex().encode("ascii"),
+            b'", "timestamp": ', repr(ts).encode("ascii"), b"}",
+        ))
+        return canonical, event_hash, prev
+
+    def _link(self, pos: int, end: int, kind: int, table: _StringTable):
+        """Return (hash verifies, raw hash, raw prev_hash) for one event record."""
+        if kind == KIND_RAW:
+            ok, event_hash, prev = consent_ledger._line_link(self._mm[pos + 5:end])
+            return ok, bytes.fromhex(event_hash), bytes.fromhex(prev)
+        if kind != KIND_EVENT:
+            raise ValueError(f"unknown record kind {kind}")
+        canonical, event_hash, prev = self._canonical(pos, end, table)
+        return hashlib.sha256(canonical).digest() == event_hash, event_hash, prev
+
+    def verify(self) -> VerifyResult:
+        """Verify every hash and prev_hash link; offsets in the result are segment byte offsets."""
+        prev, seq = _GENESIS, 0
+        for pos, end, kind, table in self.records():
+            try:
+                ok, event_hash, event_prev = self._link(pos, end, kind, table)
+            except (ValueError, KeyError, TypeError, IndexError) as e:
+                return VerifyResult(False, pos, seq, prev.hex(), pos, f"malformed event: {e}")
+            if not ok:
+                return VerifyResult(False, pos, seq, prev.hex(), pos, "hash mismatch")
+            if event_prev != prev:
+                return VerifyResult(False, pos, seq, prev.hex(), pos, "broken prev_hash link")
+            prev, seq = event_hash, seq + 1
+        return VerifyResult(True, self.end, seq, prev.hex())
+
+
+class SegmentWriter(LedgerWriter):
+    """LedgerWriter that appends compact binary records to a segment file.
+
+    Locking, durability and head tracking work as in LedgerWriter. When the
+    segment grew or was replaced since this writer last saw it, only the new
+    records are read, to pick up the head and any new interned strings. A
+    record left incomplete by a crashed writer is truncated before the next
+    append. There is no sidecar index.
+    """
+
+    def __init__(self, path, durability: str = "none", lock: bool = True):
+        self._table = _StringTable()
+        self._end = 0
+        super().__init__(path, durability=durability, lock=lock, index=False, merkle=False)
+
+    def _recover(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._close_fd()
+            self._table = _StringTable()
+            self._head, self._offset, self._size, self._end, self._seq, self._ino = GENESIS_HASH, 0, 0, 0, 0, None
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if self._fd_ino is not None and st.st_ino != self._fd_ino:
+                self._close_fd()
+            if st.st_ino != self._ino or st.st_size < self._size or self._end < HEADER.size:
+                self._table = _StringTable()
+                self._head, self._offset, self._end, self._seq = GENESIS_HASH, 0, 0, 0
+            self._ino, self._size = st.st_ino, st.st_size
+            if st.st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if self._end == 0:
+                    magic, version, _ = HEADER.unpack_from(mm, 0) if st.st_size >= HEADER.size else (None, 0, 0)
+                    if magic != MAGIC or version != SEGMENT_VERSION:
+                        raise ValueError(f"{self.path} is not a version {SEGMENT_VERSION} ledger segment")
+                    self._end = HEADER.size
+                pos = self._end
+                while pos + LENGTH.size <= st.st_size:
+                    (n,) = LENGTH.unpack_from(mm, pos)
+                    end = pos + LENGTH.size + n
+                    if n == 0 or end > st.st_size:
+                        break
+                    kind = mm[pos + LENGTH.size]
+                    if kind == KIND_STRING:
+                        self._table.add(mm[pos + 5:end].decode("utf-8"))
+                    elif kind == KIND_EVENT:
+                        self._head = mm[pos + 69:pos + 101].hex()
+                        self._offset, self._seq = pos, self._seq + 1
+                    else:
+                        self._head = consent_ledger._line_hash(mm[pos + 5:end])
+                        self._offset, self._seq = pos, self._seq + 1
+                    pos = end
+                self._end = pos
+
+    def _append(self, items, want_seq: bool) -> list:
+        with self._lock:
+            fd = self._acquire()
+            try:
+                if self._end < self._size:
+                    print(f"[SEGMENT] Dropping {self._size - self._end} bytes of incomplete record from {self.path}")
+                    os.ftruncate(fd, self._end)
+                    self._size = self._end
+                table = _StringTable()
+                table.ids, table.encoded = dict(self._table.ids), list(self._table.encoded)
+                chunks = [HEADER.pack(MAGIC, SEGMENT_VERSION, 0)] if self._size == 0 else []
+                records, head, seq = [], self._head, self._seq
+                offset = self._size + len(chunks[0]) if chunks else self._size
+                for actor, action, payload, consent_token in items:
+                    start = len(chunks)
+                    if (isinstance(actor, str) and isinstance(action, str)
+                            and (consent_token is None or isinstance(consent_token, str))):
+                        ts, event_id = time.time(), uuid.uuid4()
+                        payload_json = json.dumps(payload, sort_keys=True)
+                        canonical = _canonical(ts, str(event_id), actor, action, consent_token, payload_json, head)
+                        digest = hashlib.sha256(canonical).digest()
+                        _pack_event(table, chunks, ts, event_id.bytes, actor, action, consent_token,
+                                    payload_json, bytes.fromhex(head), digest)
+                        head = digest.hex()
+                    else:
+                        event, line = consent_ledger._encode_event(actor, action, payload, consent_token, head, 1)
+                        chunks.append(_record(KIND_RAW, line.rstrip(b"\n")))
+                        head = event["hash"]
+                    offset += sum(len(c) for c in chunks[start:-1])
+                    records.append((seq, head))
+                    last = offset
+                    offset += len(chunks[-1])
+                    seq += 1
+                if not records:
+                    return records
+                self._write(fd, chunks)
+                self._table = table
+                self._ino = self._fd_ino
+                self._offset, self._size, self._end = last, offset, offset
+                self._head, self._seq = head, seq
+                return records
+            finally:
+                self._release(fd)
+
+
+def jsonl_to_segment(src, dst) -> int:
+    """Convert a JSONL ledger into a segment file; return how many events were stored compactly.
+
+    Every line is kept, so the segment verifies exactly as the JSONL ledger
+    does. The segment is written next to `dst` and moved into place at the end.
+    """
+    table, compact = _StringTable(), 0
+    tmp = f"{os.fspath(dst)}.tmp"
+    try:
+        with open(src, "rb") as f, open(tmp, "wb") as out:
+            out.write(HEADER.pack(MAGIC, SEGMENT_VERSION, 0))
+            chunks = []
+            for line in f:
+                compact += _pack_line(table, chunks, line)
+                if len(chunks) >= 1024:
+                    out.write(b"".join(chunks))
+                    chunks = []
+            out.write(b"".join(chunks))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return compact
+
+
+def segment_to_jsonl(src, dst, line_version: int = LINE_VERSION) -> int:
+    """Convert a segment file into a JSONL ledger in `line_version` format; return the event count."""
+    count = 0
+    tmp = f"{os.fspath(dst)}.tmp"
+    try:
+        with SegmentReader(src) as reader, open(tmp, "wb") as out:
+            mm = reader._mm
+            for pos, end, kind, table in reader.records():
+                if kind == KIND_RAW:
+                    out.write(mm[pos + 5:end] + b"\n")
+                elif line_version == 2:
+                    canonical, event_hash, _ = reader._canonical(pos, end, table)
+                    out.write(consent_ledger._v2_line(canonical.decode("utf-8"), event_hash.hex()))
+                else:
+                    out.write((json.dumps(reader._decode(pos, end, kind, table)) + "\n").encode("utf-8"))
+                count += 1
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+
+def verify_segment(path) -> VerifyResult:
+    """Verify the chain stored in a segment file (an empty or missing file verifies)."""
+    if not os.path.exists(path):
+        return VerifyResult(True, 0, 0, GENESIS_HASH)
+    with SegmentReader(path) as reader:
+        return reader.verify()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CERL-Preemptive ledger segment tools")
+    parser.add_argument("--to-segment", nargs=2, metavar=("JSONL", "SEGMENT"), help="convert a JSONL ledger")
+    parser.add_argument("--to-jsonl", nargs=2, metavar=("SEGMENT", "JSONL"), help="convert a segment back")
+    parser.add_argument("--verify", metavar="SEGMENT", help="verify the chain in a segment")
+    args = parser.parse_args()
+
+    if args.to_segment:
+        compact = jsonl_to_segment(*args.to_segment)
+        print(f"[SEGMENT] Wrote {args.to_segment[1]} ({compact} compact events, "
+              f"{os.path.getsize(args.to_segment[1])} bytes from {os.path.getsize(args.to_segment[0])})")
+    if args.to_jsonl:
+        print(f"[SEGMENT] Wrote {segment_to_jsonl(*args.to_jsonl)} events to {args.to_jsonl[1]}")
+    if args.verify:
+        result = verify_segment(args.verify)
+        print("Integrity OK?", bool(result))
+        if not result:
+            print(f"First bad event at byte offset {result.bad_offset} (seq {result.seq}): {result.reason}")
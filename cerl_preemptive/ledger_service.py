@@ -0,0 +1,169 @@
+"""
+CERL-Preemptive Ledger Service
+Single-writer daemon that owns ledger.jsonl and serves appends over a Unix socket.
+
+Each request is one JSON line with `actor`, `action`, `payload` and an optional
+`consent_token`; each response is one JSON line with the assigned `seq` and
+`hash` (or `error`), in request order. Clients may pipeline many requests before
+reading responses. All connections feed one GroupCommitWriter, so the chain
+stays linear no matter how many processes are appending.
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+# Handle both relative and absolute imports
+try:
+    from . import consent_ledger
+except ImportError:
+    import consent_ledger
+
+SOCKET_PATH = "ledger.sock"
+
+
+class LedgerServiceError(Exception):
+    """Raised when the ledger service rejects or fails an append."""
+    pass
+
+
+class _AppendHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        pending = queue.Queue()
+        sender = threading.Thread(target=self._send, args=(pending,), daemon=True)
+        sender.start()
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    req = json.loads(line)
+                    future = self.server.committer.submit_record(
+                        req["actor"], req["action"], req.get("payload", {}), req.get("consent_token")
+                    )
+                except Exception as e:
+                    future = Future()
+                    future.set_exception(e)
+                pending.put(future)
+        finally:
+            pending.put(None)
+            sender.join()
+
+    def _send(self, pending):
+        done = False
+        while not done:
+            futures = [pending.get()]
+            while True:
+                try:
+                    futures.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            out = []
+            for future in futures:
+                if future is None:
+                    done = True
+                    break
+                try:
+                    seq, h = future.result()
+                    out.append(json.dumps({"seq": seq, "hash": h}))
+                except Exception as e:
+                    out.append(json.dumps({"error": str(e)}))
+            if out:
+                try:
+                    self.wfile.write(("\n".join(out) + "\n").encode("utf-8"))
+                except OSError:
+                    return
+
+
+class LedgerService(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket server that serializes all appends to one ledger file."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path=SOCKET_PATH, ledger_path=None, durability: str = "batch"):
+        self.socket_path = os.fspath(socket_path)
+        writer = consent_ledger.LedgerWriter(
+            ledger_path if ledger_path is not None else consent_ledger.LEDGER_PATH, durability=durability
+        )
+        self.committer = consent_ledger.GroupCommitWriter(writer)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        super().__init__(self.socket_path, _AppendHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.committer.close()
+        self.committer.writer.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class LedgerClient:
+    """Connection to a LedgerService; usable with `consent_ledger.set_remote_writer`."""
+
+    def __init__(self, socket_path=SOCKET_PATH, timeout: Optional[float] = None):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(os.fspath(socket_path))
+        self._rfile = self._sock.makefile("rb")
+        self._lock = threading.Lock()
+
+    def append_records(self, items) -> list:
+        """Pipeline `(actor, action, payload, consent_token)` tuples; return `(seq, hash)` for each."""
+        data = b"".join(
+            json.dumps({"actor": a, "action": act, "payload": p, "consent_token": t}).encode("utf-8") + b"\n"
+            for a, act, p, t in items
+        )
+        with self._lock:
+            self._sock.sendall(data)
+            responses = [self._rfile.readline() for _ in range(len(items))]
+        records = []
+        for line in responses:
+            if not line:
+                raise LedgerServiceError("Ledger service closed the connection")
+            resp = json.loads(line)
+            if "error" in resp:
+                raise LedgerServiceError(resp["error"])
+            records.append((resp["seq"], resp["hash"]))
+        return records
+
+    def append_record(self, actor: str, action: str, payload: dict, consent_token: Optional[str] = None):
+        """Append one event and return its `(seq, hash)`."""
+        return self.append_records([(actor, action, payload, consent_token)])[0]
+
+    def append(self, actor: str, action: str, payload: dict, consent_token: Optional[str] = None) -> str:
+        """Append one event and return its hash, like `consent_ledger.append_event`."""
+        return self.append_record(actor, action, payload, consent_token)[1]
+
+    def close(self):
+        self._rfile.close()
+        self._sock.close()
+
+
+def connect(socket_path=SOCKET_PATH, path=None) -> LedgerClient:
+    """Connect to a running service and route this process's `append_event` calls to it."""
+    client = LedgerClient(socket_path)
+    consent_ledger.set_remote_writer(client, path)
+    return client
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CERL-Preemptive ledger writer service")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--ledger", default=consent_ledger.LEDGER_PATH)
+    parser.add_argument("--durability", default="batch", choices=consent_ledger.DURABILITY_POLICIES)
+    args = parser.parse_args()
+
+    with LedgerService(args.socket, args.ledger, args.durability) as server:
+        print(f"Ledger service writing {args.ledger} via {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
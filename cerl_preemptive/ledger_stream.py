@@ -0,0 +1,174 @@
+"""
+CERL-Preemptive Ledger Stream
+Follows a ledger once per process and fans its new events out to any number of subscribers.
+
+A LedgerBroadcaster's thread reads each newly appended line of the ledger
+once, keeps the most recent ones in a ring buffer and wakes every waiting
+subscriber. Writers in the same process wake it as soon as they append (see
+`consent_ledger.add_append_listener`); appends by other processes are noticed
+by polling the file's size every `poll_interval` seconds. Subscribers that fall
+further behind than the buffer read the missing events from the ledger itself.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from itertools import islice
+from typing import Optional
+
+# Handle both relative and absolute imports
+try:
+    from .consent_ledger import _ledger_key, _sealed_tail, add_append_listener, get_index
+except ImportError:
+    from consent_ledger import _ledger_key, _sealed_tail, add_append_listener, get_index
+
+BUFFER_EVENTS = 4096
+POLL_INTERVAL = 0.05
+
+
+class LedgerBroadcaster:
+    """Tails one JSONL ledger and buffers its newest events for subscribers.
+
+    Buffered entries are `(seq, line, actor, action)`, with the line as
+    stored (without its newline) and each line parsed once however many
+    subscribers there are. `wait_for` is the subscriber side.
+    """
+
+    def __init__(self, path, buffer_events: int = BUFFER_EVENTS, poll_interval: float = POLL_INTERVAL):
+        self.path = _ledger_key(path)
+        self.poll_interval = poll_interval
+        self._events = deque(maxlen=buffer_events)
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._closed = False
+        self._f = None
+        self._ino = None
+        self._offset = 0
+        self._partial = b""
+        self.next_seq = self._start()
+        add_append_listener(self._on_append)
+        self._thread = threading.Thread(target=self._run, name="ledger-broadcast", daemon=True)
+        self._thread.start()
+
+    def _start(self) -> int:
+        """Open the active file at its end and return the sequence number of the next event."""
+        base = _sealed_tail(self.path)[1]
+        try:
+            self._f = open(self.path, "rb")
+        except FileNotFoundError:
+            return base
+        self._ino = os.fstat(self._f.fileno()).st_ino
+        offset, seq = get_index(self.path).locate(1 << 62)
+        self._f.seek(offset)
+        data = self._f.read()
+        end = data.rfind(b"\n") + 1
+        self._offset = offset + end
+        return base + seq + data.count(b"\n", 0, end)
+
+    def _on_append(self, path: str, records: list):
+        if _ledger_key(path) == self.path:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self._poll()
+            except (OSError, ValueError) as e:
+                print(f"[STREAM] Cannot read {self.path}: {e}")
+
+    def _read_new(self) -> list:
+        if self._f is None:
+            return []
+        self._f.seek(self._offset)
+        data = self._partial + self._f.read()
+        self._offset = self._f.tell()
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        return data[:end].splitlines()
+
+    def _poll(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        if st is not None and st.st_ino == self._ino and st.st_size == self._offset:
+            return
+        lines = self._read_new()
+        if st is None or st.st_ino != self._ino:
+            # Rotated or replaced: the old file was drained above; continue in the new one.
+            if self._f is not None:
+                self._f.close()
+            self._f, self._ino, self._offset, self._partial = None, None, 0, b""
+            if st is not None:
+                self._f = open(self.path, "rb")
+                self._ino = os.fstat(self._f.fileno()).st_ino
+                skip = self.next_seq + len(lines) - _sealed_tail(self.path)[1]
+                if skip > 0:
+                    self._offset = len(b"".join(islice(self._f, skip)))
+                lines += self._read_new()
+        if lines:
+            self._publish(lines)
+
+    def _publish(self, lines: list):
+        entries = []
+        seq = self.next_seq
+        for line in lines:
+            try:
+                event = json.loads(line)
+                actor, action = event.get("actor"), event.get("action")
+            except (ValueError, AttributeError):
+                actor = action = None
+            entries.append((seq, line, actor, action))
+            seq += 1
+        with self._cond:
+            self._events.extend(entries)
+            self.next_seq = seq
+            self._cond.notify_all()
+
+    def wait_for(self, after: int, timeout: Optional[float] = None) -> list:
+        """Return the buffered entries after sequence number `after`, waiting up to `timeout` for one.
+
+        Returns an empty list on timeout. Raises LookupError if events after
+        `after` have already left the buffer, or were appended before the
+        broadcaster started; read those from the ledger instead.
+        """
+        with self._cond:
+            if self.next_seq <= after + 1:
+                self._cond.wait_for(lambda: self.next_seq > after + 1 or self._closed, timeout)
+            oldest = self._events[0][0] if self._events else self.next_seq
+            if after + 1 < oldest:
+                raise LookupError(f"events after {after} are no longer buffered")
+            return list(islice(self._events, max(after + 1 - oldest, 0), None))
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+_BROADCASTERS = {}
+_BROADCASTERS_LOCK = threading.Lock()
+
+def get_broadcaster(path) -> LedgerBroadcaster:
+    """Return the shared broadcaster for the ledger at `path`, starting it on first use."""
+    key = _ledger_key(path)
+    with _BROADCASTERS_LOCK:
+        broadcaster = _BROADCASTERS.get(key)
+        if broadcaster is None:
+            broadcaster = _BROADCASTERS[key] = LedgerBroadcaster(key)
+        return broadcaster
+
+def close_broadcaster(path):
+    """Stop and forget the shared broadcaster for `path`, if one is running."""
+    with _BROADCASTERS_LOCK:
+        broadcaster = _BROADCASTERS.pop(_ledger_key(path), None)
+    if broadcaster is not None:
+        broadcaster.close()
@@ -0,0 +1,379 @@
+"""
+CERL-Preemptive Merkle Accumulator
+Append-only Merkle tree over ledger event hashes, giving O(log n) inclusion
+and consistency proofs.
+
+Leaves are the events' hashes in chain order, hashed as in RFC 6962:
+leaf = SHA-256(0x00 || raw event hash) and node = SHA-256(0x01 || left || right).
+`<ledger>.merkle/` holds one file per tree level with the 32-byte hash of
+every complete subtree, so subtree k of height h is at byte 32 * k of level
+h. Any tree size's root, and any proof, combines O(log n) of these nodes.
+`ids` holds a 16-byte key per leaf so proofs can be looked up by event id.
+
+The verify_* functions need only this module and can be used by auditors.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+NODE_SIZE = 32
+ID_SIZE = 16
+_EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+
+def leaf_hash(event_hash: str) -> bytes:
+    """Return the Merkle leaf for an event hash (hex)."""
+    return hashlib.sha256(b"\x00" + bytes.fromhex(event_hash)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _split(n: int) -> int:
+    """Return the largest power of two smaller than `n` (n > 1)."""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def _id_key(event_id) -> bytes:
+    return hashlib.sha256(str(event_id).encode("utf-8")).digest()[:ID_SIZE]
+
+
+class MerkleAccumulator:
+    """Merkle tree files for one ledger.
+
+    LedgerWriter calls `add` for every batch it writes (after `sync` on
+    first use); readers use `size`, `root`, `inclusion_proof`,
+    `consistency_proof` and `seq_of_id`, which never modify the files. A
+    node a writer has not stored yet is computed from its children, so
+    readers never see a half-written level.
+    """
+
+    def __init__(self, ledger_path):
+        self.ledger_path = os.fspath(ledger_path)
+        self.directory = f"{self.ledger_path}.merkle"
+        self.ids_path = os.path.join(self.directory, "ids")
+        self._fds = {}
+        self._paths = []
+        self._last = {}
+        self._dir_ready = False
+        self._ids = None
+        self._ids_read = 0
+        self._ids_lock = threading.Lock()
+
+    def _level_path(self, level: int) -> str:
+        while len(self._paths) <= level:
+            self._paths.append(os.path.join(self.directory, f"level-{len(self._paths):02d}"))
+        return self._paths[level]
+
+    def _fd(self, path: str, write: bool = False) -> Optional[int]:
+        fd, writable = self._fds.get(path, (None, False))
+        if fd is not None and (writable or not write):
+            return fd
+        try:
+            new = os.open(path, os.O_RDWR | os.O_CREAT, 0o644) if write else os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            if write:
+                raise
+            return None
+        if fd is not None:
+            os.close(fd)
+        self._fds[path] = (new, write)
+        return new
+
+    def close(self):
+        """Close the level files kept open between calls and forget what was cached about them."""
+        for fd, _ in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        self._last.clear()
+        self._dir_ready = False
+
+    def _count(self, level: int) -> int:
+        fd = self._fd(self._level_path(level))
+        return 0 if fd is None else os.fstat(fd).st_size // NODE_SIZE
+
+    def size(self) -> int:
+        """Return the number of leaves (events) in the tree."""
+        return self._count(0)
+
+    def _read(self, level: int, index: int) -> Optional[bytes]:
+        fd = self._fd(self._level_path(level))
+        if fd is None:
+            return None
+        data = os.pread(fd, NODE_SIZE, index * NODE_SIZE)
+        return data if len(data) == NODE_SIZE else None
+
+    def _subtree(self, level: int, index: int) -> bytes:
+        """Return complete subtree `index` of height `level`, computing it if it is not stored yet."""
+        value = self._read(level, index)
+        if value is None:
+            if level == 0:
+                raise LookupError(f"leaf {index} is not in the tree")
+            value = _node(self._subtree(level - 1, 2 * index), self._subtree(level - 1, 2 * index + 1))
+        return value
+
+    def _hash(self, lo: int, hi: int) -> bytes:
+        """Return the Merkle tree hash of leaves [lo, hi)."""
+        n = hi - lo
+        if n & (n - 1) == 0 and lo % n == 0:
+            return self._subtree(n.bit_length() - 1, lo // n)
+        k = _split(n)
+        return _node(self._hash(lo, lo + k), self._hash(lo + k, hi))
+
+    def _check_size(self, size: Optional[int]) -> int:
+        current = self.size()
+        if size is None:
+            return current
+        if not 0 <= size <= current:
+            raise ValueError(f"tree size {size} is outside 0..{current}")
+        return size
+
+    def root(self, size: Optional[int] = None) -> str:
+        """Return the root hash (hex) of the tree over the first `size` events (default: all)."""
+        size = self._check_size(size)
+        return (self._hash(0, size) if size else _EMPTY_ROOT).hex()
+
+    def _path(self, m: int, lo: int, hi: int) -> list:
+        if hi - lo == 1:
+            return []
+        k = _split(hi - lo)
+        if m - lo < k:
+            return self._path(m, lo, lo + k) + [self._hash(lo + k, hi)]
+        return self._path(m, lo + k, hi) + [self._hash(lo, lo + k)]
+
+    def inclusion_proof(self, index: int, size: Optional[int] = None) -> list:
+        """Return the audit path (hex hashes) proving leaf `index` is in the tree of `size` leaves."""
+        size = self._check_size(size)
+        if not 0 <= index < size:
+            raise ValueError(f"leaf {index} is outside a tree of size {size}")
+        return [h.hex() for h in self._path(index, 0, size)]
+
+    def _subproof(self, m: int, lo: int, hi: int, complete: bool) -> list:
+        n = hi - lo
+        if m == n:
+            return [] if complete else [self._hash(lo, hi)]
+        k = _split(n)
+        if m <= k:
+            return self._subproof(m, lo, lo + k, complete) + [self._hash(lo + k, hi)]
+        return self._subproof(m - k, lo + k, hi, False) + [self._hash(lo, lo + k)]
+
+    def consistency_proof(self, old_size: int, size: Optional[int] = None) -> list:
+        """Return the proof (hex hashes) that the tree of `old_size` leaves is a prefix of the tree of `size`."""
+        size = self._check_size(size)
+        if not 0 <= old_size <= size:
+            raise ValueError(f"old size {old_size} is outside 0..{size}")
+        if old_size == 0 or old_size == size:
+            return []
+        return [h.hex() for h in self._subproof(old_size, 0, size, True)]
+
+    def seq_of_id(self, event_id) -> Optional[int]:
+        """Return the sequence number of the event with id `event_id`, or None."""
+        with self._ids_lock:
+            if self._ids is None:
+                self._ids, self._ids_read = {}, 0
+            fd = self._fd(self.ids_path)
+            if fd is None:
+                return None
+            size = os.fstat(fd).st_size
+            if size < self._ids_read:
+                self._ids, self._ids_read = {}, 0
+            data = os.pread(fd, size - self._ids_read, self._ids_read)
+            usable = len(data) - len(data) % ID_SIZE
+            first = self._ids_read // ID_SIZE
+            for i in range(usable // ID_SIZE):
+                self._ids[data[i * ID_SIZE:(i + 1) * ID_SIZE]] = first + i
+            self._ids_read += usable
+            return self._ids.get(_id_key(event_id))
+
+    def add(self, entries):
+        """Append `(event hash, event id)` pairs for the events following the current tree."""
+        if not entries:
+            return
+        if not self._dir_ready:
+            os.makedirs(self.directory, exist_ok=True)
+            self._dir_ready = True
+        n = self.size()
+        nodes = [leaf_hash(h) for h, _ in entries]
+        os.pwrite(self._fd(self.ids_path, write=True), b"".join(_id_key(i) for _, i in entries), n * ID_SIZE)
+        level, count = 0, n
+        while nodes:
+            os.pwrite(self._fd(self._level_path(level), write=True), b"".join(nodes), count * NODE_SIZE)
+            last = self._last.get(level)
+            self._last[level] = (count + len(nodes) - 1, nodes[-1])
+            if count % 2:
+                # The left sibling is usually the node this accumulator wrote last at this level.
+                nodes.insert(0, last[1] if last is not None and last[0] == count - 1
+                             else self._subtree(level, count - 1))
+                count -= 1
+            nodes = [_node(nodes[i], nodes[i + 1]) for i in range(0, len(nodes) - 1, 2)]
+            level, count = level + 1, count // 2
+
+    def _repair(self, n: int):
+        """Make every level hold exactly the complete subtrees of `n` leaves."""
+        level = 1
+        while True:
+            want = n >> level
+            path = self._level_path(level)
+            have = self._count(level)
+            if have > want or not want:
+                if os.path.exists(path):
+                    os.truncate(path, want * NODE_SIZE)
+                if not want:
+                    break
+            elif have < want:
+                missing = [_node(self._subtree(level - 1, 2 * i), self._subtree(level - 1, 2 * i + 1))
+                           for i in range(have, want)]
+                os.pwrite(self._fd(path, write=True), b"".join(missing), have * NODE_SIZE)
+            level += 1
+        for extra in range(level + 1, 64):
+            path = self._level_path(extra)
+            if not os.path.exists(path):
+                break
+            os.truncate(path, 0)
+
+    def _truncate(self, n: int):
+        self._last.clear()
+        os.truncate(self._level_path(0), n * NODE_SIZE)
+        if os.path.exists(self.ids_path):
+            os.truncate(self.ids_path, n * ID_SIZE)
+        self._ids, self._ids_read = None, 0
+
+    def sync(self):
+        """Bring the tree up to date with the ledger, repairing or rebuilding it if it does not match."""
+        try:
+            from . import consent_ledger
+        except ImportError:
+            import consent_ledger
+        os.makedirs(self.directory, exist_ok=True)
+        self._fd(self._level_path(0), write=True)
+        n = self.size()
+        ids = self._fd(self.ids_path, write=True)
+        if os.fstat(ids).st_size // ID_SIZE < n:
+            n = os.fstat(ids).st_size // ID_SIZE
+        if n:
+            last = next(consent_ledger._iter_lines(self.ledger_path, n - 1), None)
+            try:
+                ok = last is not None and leaf_hash(json.loads(last[1])["hash"]) == self._read(0, n - 1)
+            except (ValueError, KeyError, TypeError):
+                ok = False
+            if not ok:
+                n = 0
+        self._truncate(n)
+        self._repair(n)
+        batch = []
+        for _, line in consent_ledger._iter_lines(self.ledger_path, n):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                event = json.loads(line)
+                batch.append((event["hash"], event.get("id")))
+            except (ValueError, KeyError, TypeError):
+                print(f"[MERKLE] Stopping at malformed event {n + len(batch)} of {self.ledger_path}")
+                break
+            if len(batch) >= 4096:
+                self.add(batch)
+                n += len(batch)
+                batch = []
+        self.add(batch)
+
+    def rebuild(self):
+        """Discard the tree and rebuild it from the ledger."""
+        if os.path.exists(self._level_path(0)):
+            self._truncate(0)
+        self.sync()
+
+
+def verify_inclusion(event_hash: str, index: int, size: int, proof: list, root: str) -> bool:
+    """Check an audit path from `inclusion_proof` against a trusted root (RFC 9162 2.1.3.2)."""
+    if not 0 <= index < size:
+        return False
+    fn, sn = index, size - 1
+    r = leaf_hash(event_hash)
+    for p in proof:
+        p = bytes.fromhex(p)
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = _node(p, r)
+            while not fn & 1 and fn:
+                fn, sn = fn >> 1, sn >> 1
+        else:
+            r = _node(r, p)
+        fn, sn = fn >> 1, sn >> 1
+    return sn == 0 and r.hex() == root
+
+
+def verify_consistency(old_size: int, size: int, old_root: str, root: str, proof: list) -> bool:
+    """Check that the tree of `old_size` leaves is a prefix of the tree of `size` (RFC 9162 2.1.4.2)."""
+    if old_size == size:
+        return old_root == root and not proof
+    if old_size == 0:
+        return not proof
+    if old_size > size or not proof:
+        return False
+    proof = [bytes.fromhex(p) for p in proof]
+    if old_size & (old_size - 1) == 0:
+        proof.insert(0, bytes.fromhex(old_root))
+    fn, sn = old_size - 1, size - 1
+    while fn & 1:
+        fn, sn = fn >> 1, sn >> 1
+    fr = sr = proof[0]
+    for c in proof[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            fr, sr = _node(c, fr), _node(c, sr)
+            while not fn & 1 and fn:
+                fn, sn = fn >> 1, sn >> 1
+        else:
+            sr = _node(sr, c)
+        fn, sn = fn >> 1, sn >> 1
+    return sn == 0 and fr.hex() == old_root and sr.hex() == root
+
+
+def verify_event_proof(proof: dict, root: Optional[str] = None, expected: Optional[str] = None) -> bool:
+    """Check a `/proof/<event>` response: the event hashes to its `hash`, which is in the tree.
+
+    `root` is a root the auditor already trusts for `proof["tree_size"]`;
+    without it the root in the response is used. `expected` is the event
+    hash or id that was asked for; pass it, or a proof for some other event
+    in the tree also verifies.
+    """
+    event = proof["event"]
+    if expected is not None and expected not in (event.get("hash"), event.get("id")):
+        return False
+    body = {k: v for k, v in event.items() if k != "hash" and k != "v"}
+    if hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest() != event["hash"]:
+        return False
+    return verify_inclusion(event["hash"], proof["seq"], proof["tree_size"], proof["audit_path"],
+                            root if root is not None else proof["root"])
+
+
+if __name__ == "__main__":
+    from urllib.request import urlopen
+
+    parser = argparse.ArgumentParser(description="Check CERL-Preemptive ledger proofs from an audit API")
+    parser.add_argument("--url", default="http://localhost:8080", help="audit API base URL")
+    parser.add_argument("--event", help="event id or hash to prove")
+    parser.add_argument("--size", type=int, help="tree size of a root you already trust")
+    parser.add_argument("--root", help="root hash you already trust for --size")
+    args = parser.parse_args()
+
+    def fetch(path):
+        with urlopen(args.url.rstrip("/") + path) as resp:
+            return json.load(resp)
+
+    if args.size is not None and args.root:
+        current = fetch(f"/root?from={args.size}")
+        ok = verify_consistency(args.size, current["size"], args.root, current["root"], current["consistency"])
+        print(f"[MERKLE] Tree of {current['size']} events extends your root of {args.size}: {ok}")
+    if args.event:
+        query = f"?size={args.size}" if args.size is not None else ""
+        proof = fetch(f"/proof/{args.event}{query}")
+        ok = verify_event_proof(proof, args.root if args.size is not None else None, expected=args.event)
+        print(f"[MERKLE] Event {proof['seq']} is in the tree of {proof['tree_size']} events: {ok}")
@@ -0,0 +1,256 @@
+"""
+CERL-Preemptive Metrics
+Low-overhead counters and latency histograms for the hot paths, exported in Prometheus text format.
+
+Every thread updates its own shard of each metric, so recording a value
+takes no lock; `render` adds the shards up. Shards of finished threads are
+folded into a shared one. Histograms use the fixed BUCKETS (seconds).
+
+Recording is on unless $CERL_METRICS is "0", "off" or "false", in which
+case `timed` leaves functions undecorated and they cost nothing, even if
+recording is switched on later. `set_enabled(False)` turns recording off at
+runtime, after which every recording call and `timed` wrapper returns after
+one flag check.
+"""
+
+import functools
+import inspect
+import itertools
+import os
+import threading
+import weakref
+from bisect import bisect_left
+from time import perf_counter
+from typing import Dict
+
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+           0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = _instrument = os.environ.get("CERL_METRICS", "1").lower() not in ("0", "off", "false")
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(on: bool):
+    """Turn recording on or off for the whole process."""
+    global _enabled
+    _enabled = bool(on)
+
+
+class _Shard:
+    """One thread's cells: metric -> list of values."""
+
+    __slots__ = ("cells", "__weakref__")
+
+    def __init__(self):
+        self.cells = {}
+
+
+_local = threading.local()
+_live = {}  # shard number -> cells of a running thread
+_numbers = itertools.count()
+_retired = {}
+_lock = threading.RLock()  # re-entrant: a shard may be retired by GC while render holds it
+_families = {}
+
+
+def _cells() -> dict:
+    """Return this thread's cells, registering them on the thread's first use."""
+    try:
+        return _local.cells
+    except AttributeError:
+        shard = _local.shard = _Shard()
+        number = next(_numbers)
+        with _lock:
+            _live[number] = shard.cells
+        weakref.finalize(shard, _retire, number)
+        _local.cells = shard.cells
+        return shard.cells
+
+
+def _add(total: list, values: list):
+    for i, v in enumerate(values):
+        total[i] += v
+
+
+def _retire(number: int):
+    """Fold a finished thread's cells into the shared totals, in one step for `_totals`."""
+    with _lock:
+        for metric, values in _live.pop(number).items():
+            total = _retired.get(metric)
+            if total is None:
+                _retired[metric] = list(values)
+            else:
+                _add(total, values)
+
+
+def _totals() -> dict:
+    with _lock:
+        sources = list(_live.values()) + [_retired]
+        totals = {}
+        for cells in sources:
+            for metric, values in list(cells.items()):
+                total = totals.get(metric)
+                if total is None:
+                    totals[metric] = list(values)
+                else:
+                    _add(total, list(values))
+        return totals
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help: str, labels: Dict[str, str]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def _label_text(self, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in self.labels.items()]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. of detected violations."""
+
+    kind = "counter"
+
+    def inc(self, n: int = 1):
+        if not _enabled:
+            return
+        try:
+            _local.cells[self][0] += n
+        except (AttributeError, KeyError):
+            _cells()[self] = [n]
+
+    def value(self):
+        return _totals().get(self, [0])[0]
+
+    def _render(self, values) -> list:
+        return [f"{self.name}{self._label_text()} {values[0]}"]
+
+
+class Histogram(_Metric):
+    """Latency distribution over the fixed BUCKETS, plus the sum and count of observations."""
+
+    kind = "histogram"
+
+    def observe(self, seconds: float):
+        if not _enabled:
+            return
+        try:
+            values = _local.cells[self]
+        except (AttributeError, KeyError):
+            values = _cells()[self] = [0] * (len(BUCKETS) + 1) + [0.0]
+        values[bisect_left(BUCKETS, seconds)] += 1
+        values[-1] += seconds
+
+    def count(self) -> int:
+        return sum(_totals().get(self, [0])[:-1])
+
+    def _render(self, values) -> list:
+        lines, running = [], 0
+        for bound, n in zip(BUCKETS + ("+Inf",), values):
+            running += n
+            le = 'le="%s"' % bound
+            lines.append(f"{self.name}_bucket{self._label_text(le)} {running}")
+        lines.append(f"{self.name}_sum{self._label_text()} {values[-1]!r}")
+        lines.append(f"{self.name}_count{self._label_text()} {running}")
+        return lines
+
+
+def _register(cls, name: str, help: str, labels: dict):
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        family = _families.setdefault(name, (cls, help, {}))
+        if family[0] is not cls:
+            raise ValueError(f"metric {name} is already registered as a {family[0].kind}")
+        metric = family[2].get(key)
+        if metric is None:
+            metric = family[2][key] = cls(name, help, labels)
+        return metric
+
+
+def counter(name: str, help: str, **labels) -> Counter:
+    """Return the counter `name` with these labels, creating it on first use."""
+    return _register(Counter, name, help, labels)
+
+
+def histogram(name: str, help: str, **labels) -> Histogram:
+    """Return the latency histogram `name` with these labels, creating it on first use."""
+    return _register(Histogram, name, help, labels)
+
+
+def operation(name: str) -> Histogram:
+    """Return the `cerl_operation_seconds` histogram for operation `name`."""
+    return histogram("cerl_operation_seconds", "Latency of instrumented operations in seconds", operation=name)
+
+
+def timed(name: str):
+    """Decorator recording each call's latency, exceptions included, under `operation(name)`.
+
+    Coroutine functions are timed until they complete. Returns functions
+    unchanged when $CERL_METRICS switched metrics off at import.
+    """
+    hist = operation(name)
+
+    def decorate(fn):
+        if not _instrument:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                start = perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    hist.observe(perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def render() -> str:
+    """Return every metric in Prometheus text exposition format (version 0.0.4)."""
+    totals = _totals()
+    with _lock:
+        families = [(name, cls, help, list(metrics.values())) for name, (cls, help, metrics) in _families.items()]
+    lines = ["# HELP cerl_metrics_enabled Whether metrics are being recorded",
+             "# TYPE cerl_metrics_enabled gauge",
+             f"cerl_metrics_enabled {int(_enabled)}"]
+    for name, cls, help, metrics in families:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {cls.kind}")
+        for metric in metrics:
+            values = totals.get(metric)
+            if values is None:
+                values = [0] if cls is Counter else [0] * (len(BUCKETS) + 1) + [0.0]
+            lines.extend(metric._render(values))
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Zero every metric (for tests and benchmarks)."""
+    with _lock:
+        for cells in _live.values():
+            for values in cells.values():
+                for i in range(len(values)):
+                    values[i] = 0
+        _retired.clear()
@@ -0,0 +1,243 @@
+"""
+CERL-Preemptive Policy Engine
+Decides which request targets count as sensitive, from per-tenant rule sets.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Any, Iterable, Optional
+
+DEFAULT_TENANT = "default"
+DEFAULT_RULES = {DEFAULT_TENANT: {"substrings": ["private", "personal"]}}
+RULE_KINDS = ("substrings", "patterns", "exact")
+SMALL_RULE_SET = 8  # below this, plain `in` tests beat walking the automaton
+
+
+class PolicyError(Exception):
+    """Raised when a rule set cannot be loaded or compiled."""
+    pass
+
+
+class _Automaton:
+    """Aho-Corasick automaton over lowercase substrings.
+
+    `search` walks the text once, so its cost depends on the length of the
+    text and not on how many substrings were compiled in.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        goto = [{}]
+        out = [None]
+        for word in words:
+            if not word:
+                continue
+            node = 0
+            for ch in word:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append(None)
+                node = nxt
+            if out[node] is None:
+                out[node] = word
+        fail = [0] * len(goto)
+        pending = deque(goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, nxt in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if out[nxt] is None:
+                    out[nxt] = out[fail[nxt]]
+                pending.append(nxt)
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def search(self, text: str) -> Optional[str]:
+        """Return a compiled substring that occurs in `text`, or None."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node] is not None:
+                return out[node]
+        return None
+
+
+class CompiledRuleSet:
+    """One tenant's rules, compiled for matching.
+
+    `substrings` go into one Aho-Corasick automaton, `patterns` (regular
+    expressions) into one combined case-insensitive regex, and `exact`
+    targets into a hash set. Matching is case-insensitive throughout.
+    A handful of substrings is checked with `in` directly, which is cheaper
+    than the automaton until the rule count grows.
+    """
+
+    def __init__(self, substrings=(), patterns=(), exact=()):
+        self.substrings = sorted({s.lower() for s in substrings})
+        self.patterns = list(dict.fromkeys(patterns))
+        self.exact = frozenset(e.lower() for e in exact)
+        self._automaton = _Automaton(self.substrings) if len(self.substrings) > SMALL_RULE_SET else None
+        try:
+            self._regex = re.compile("|".join(f"(?:{p})" for p in self.patterns), re.IGNORECASE) \
+                if self.patterns else None
+        except re.error as e:
+            raise PolicyError(f"Invalid pattern in rule set: {e}") from e
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], base: Optional["CompiledRuleSet"] = None) -> "CompiledRuleSet":
+        """Compile a `{"substrings": [...], "patterns": [...], "exact": [...]}` mapping.
+
+        Rules from `base` are included unless the mapping sets `"inherit": false`.
+        """
+        if not isinstance(config, dict):
+            raise PolicyError("A rule set must be a JSON object")
+        unknown = set(config) - set(RULE_KINDS) - {"inherit"}
+        if unknown:
+            raise PolicyError(f"Unknown rule kinds: {', '.join(sorted(unknown))}")
+        rules = {kind: list(config.get(kind, ())) for kind in RULE_KINDS}
+        for kind, values in rules.items():
+            if not all(isinstance(v, str) for v in values):
+                raise PolicyError(f"{kind} must be a list of strings")
+        if base is not None and config.get("inherit", True):
+            rules["substrings"] += base.substrings
+            rules["patterns"] += base.patterns
+            rules["exact"] += base.exact
+        return cls(**rules)
+
+    def match(self, target: str) -> Optional[str]:
+        """Return the rule that makes `target` sensitive, or None."""
+        lowered = target.lower()
+        if lowered in self.exact:
+            return f"exact:{lowered}"
+        if self._automaton is not None:
+            found = self._automaton.search(lowered)
+            if found is not None:
+                return f"substring:{found}"
+        else:
+            for word in self.substrings:
+                if word in lowered:
+                    return f"substring:{word}"
+        if self._regex is not None:
+            found = self._regex.search(target)
+            if found is not None:
+                return f"pattern:{found.group(0)}"
+        return None
+
+
+class PolicyEngine:
+    """Holds the compiled rule sets for every tenant and swaps them atomically.
+
+    A load compiles the whole configuration first and then replaces the
+    tenant table with a single assignment and bumps `generation`. Concurrent `match` calls see
+    either the old rules or the new ones, never a mix. A configuration that
+    fails to compile leaves the current rules in place.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, path=None):
+        self.path = os.fspath(path) if path is not None else None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._tenants = {}
+        self.generation = 0
+        if self.path is not None:
+            self.load_file()
+        else:
+            self.load(DEFAULT_RULES if config is None else config)
+
+    def load(self, config: Dict[str, Any]):
+        """Compile `config` (`{"default": {...}, "tenants": {name: {...}}}`) and swap it in."""
+        if not isinstance(config, dict):
+            raise PolicyError("Policy configuration must be a JSON object")
+        default = CompiledRuleSet.from_config(config.get(DEFAULT_TENANT, {}))
+        tenants = {DEFAULT_TENANT: default}
+        for name, rules in config.get("tenants", {}).items():
+            tenants[name] = CompiledRuleSet.from_config(rules, base=default)
+        self._tenants = tenants
+        self.generation += 1
+
+    def load_file(self, path=None):
+        """Load rules from a JSON file (defaults to the engine's `path`)."""
+        path = self.path if path is None else os.fspath(path)
+        with self._lock:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                with open(path, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                raise PolicyError(f"Cannot read policy file {path}: {e}") from e
+            self.load(config)
+            self.path, self._mtime = path, mtime
+
+    def reload_if_changed(self) -> bool:
+        """Reload the policy file if it was modified since the last load; return True if reloaded."""
+        if self.path is None:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime  # a broken file is reported once, not on every poll
+        self.load_file()
+        return True
+
+    def start_watcher(self, interval: float = 5.0) -> threading.Event:
+        """Poll the policy file every `interval` seconds and hot-reload it; set the returned event to stop."""
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    if self.reload_if_changed():
+                        print(f"[POLICY] Reloaded rules from {self.path}")
+                except PolicyError as e:
+                    print(f"[POLICY] Keeping current rules: {e}")
+
+        self._watcher = threading.Thread(target=run, name="policy-watcher", daemon=True)
+        self._watcher.start()
+        return stop
+
+    def rules_for(self, tenant: Optional[str] = None) -> CompiledRuleSet:
+        """Return the compiled rules for `tenant`, falling back to the default rules."""
+        tenants = self._tenants
+        return tenants.get(tenant) or tenants[DEFAULT_TENANT]
+
+    def match(self, target: str, tenant: Optional[str] = None) -> Optional[str]:
+        """Return the rule that makes `target` sensitive for `tenant`, or None."""
+        return self.rules_for(tenant).match(target)
+
+    def is_sensitive(self, target: str, tenant: Optional[str] = None) -> bool:
+        return self.match(target, tenant) is not None
+
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+def get_engine() -> PolicyEngine:
+    """Return the shared engine, loaded from $CERL_POLICY_FILE if set and the default rules otherwise."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            path = os.environ.get("CERL_POLICY_FILE")
+            _ENGINE = PolicyEngine(path=path) if path else PolicyEngine()
+        return _ENGINE
+
+def set_engine(engine: Optional[PolicyEngine]):
+    """Replace the shared engine (None resets it to the default)."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        _ENGINE = engine
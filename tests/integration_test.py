@@ -7,6 +7,7 @@ and verifies the problem statement scenario is handled correctly.
 
 import sys
 import os
+import shutil
 import tempfile
 import json
 
@@ -160,6 +161,22 @@ def test_public_data_access():
         return False
 
 
+_module_state = {}
+
+
+def setup_module(module):
+    """Point the ledger at a temporary file when run under pytest, as main() does"""
+    _module_state["dir"] = tempfile.mkdtemp()
+    _module_state["ledger"] = consent_ledger.LEDGER_PATH
+    consent_ledger.LEDGER_PATH = os.path.join(_module_state["dir"], "integration_test_ledger.jsonl")
+
+
+def teardown_module(module):
+    """Restore the ledger path and remove the temporary ledger and its sidecars"""
+    consent_ledger.LEDGER_PATH = _module_state.pop("ledger")
+    shutil.rmtree(_module_state.pop("dir"), ignore_errors=True)
+
+
 def main():
     """Run all integration tests"""
     print_section("CERL-Preemptive Consent Validator - Integration Test")
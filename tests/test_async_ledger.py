@@ -0,0 +1,117 @@
+"""
+Unit tests for the CERL-Preemptive asyncio ledger writer and validator
+"""
+
+import unittest
+import sys
+import os
+import asyncio
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.async_ledger import AsyncLedgerWriter
+from cerl_preemptive.consent_validator import AsyncConsentValidator, ConsentViolationError
+
+
+class AsyncLedgerTestCase(unittest.IsolatedAsyncioTestCase):
+    """Points the ledger module at a temporary file for each test"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "test_ledger.jsonl")
+        self.original_ledger_path = consent_ledger.LEDGER_PATH
+        consent_ledger.LEDGER_PATH = self.path
+
+    def tearDown(self):
+        consent_ledger.LEDGER_PATH = self.original_ledger_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def read_events(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class TestAsyncLedgerWriter(AsyncLedgerTestCase):
+    """Test cases for AsyncLedgerWriter"""
+
+    async def test_concurrent_appends_are_coalesced(self):
+        """Test that concurrent coroutines share batched writes in submission order"""
+        calls = []
+        real = consent_ledger.append_events
+
+        def spy(items, path=None):
+            calls.append(len(items))
+            return real(items, path)
+
+        async with AsyncLedgerWriter() as writer:
+            with mock.patch.object(consent_ledger, "append_events", spy):
+                hashes = await asyncio.gather(*(writer.append("tester", "event", {"i": i}) for i in range(50)))
+        events = self.read_events()
+        self.assertEqual([e["payload"]["i"] for e in events], list(range(50)))
+        self.assertEqual([e["hash"] for e in events], list(hashes))
+        self.assertLess(len(calls), 50)
+        self.assertTrue(consent_ledger.verify_chain())
+
+    async def test_write_errors_reach_callers(self):
+        """Test that a failed batch raises in every waiting coroutine"""
+        async with AsyncLedgerWriter() as writer:
+            with mock.patch.object(consent_ledger, "append_events", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    await writer.append("tester", "event", {})
+            self.assertTrue(await writer.append("tester", "event", {}))
+
+    async def test_closed_writer_rejects_appends(self):
+        """Test that submitting after close is an error"""
+        writer = AsyncLedgerWriter()
+        await writer.append("tester", "event", {})
+        await writer.close()
+        with self.assertRaises(RuntimeError):
+            writer.submit("tester", "event", {})
+
+
+class TestAsyncConsentValidator(AsyncLedgerTestCase):
+    """Test cases for AsyncConsentValidator"""
+
+    async def asyncSetUp(self):
+        self.validator = AsyncConsentValidator()
+
+    async def asyncTearDown(self):
+        await self.validator.close()
+
+    async def test_same_semantics_as_sync(self):
+        """Test allow/deny decisions, exception type and ledger events"""
+        self.assertTrue(await self.validator.validate_request(
+            {"action": "read", "target": "private_data", "consent_status": "granted", "actor": "a"}))
+        with self.assertRaises(ConsentViolationError):
+            await self.validator.validate_request(
+                {"action": "read", "target": "personal_data", "consent_status": "not_granted", "actor": "b"})
+        self.assertEqual(self.validator.get_violation_count(), 1)
+        self.assertEqual([e["action"] for e in self.read_events()],
+                         ["consent_validation_passed", "consent_violation_detected"])
+
+    async def test_validate_many(self):
+        """Test that batch results carry the hashes of their events"""
+        results = await self.validator.validate_many([
+            {"target": "private_data", "consent_status": "not_granted"},
+            {"target": "public_stats"},
+        ])
+        self.assertEqual([bool(r) for r in results], [False, True])
+        self.assertEqual([r.event_hash for r in results], [e["hash"] for e in self.read_events()])
+
+    async def test_fire_and_forget(self):
+        """Test that decisions can return before the write and flush waits for it"""
+        validator = AsyncConsentValidator(wait_for_ledger=False)
+        await validator.validate_request({"target": "public_stats"})
+        await validator.flush()
+        self.assertEqual(len(self.read_events()), 1)
+        await validator.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
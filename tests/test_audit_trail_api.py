@@ -0,0 +1,507 @@
+"""
+Unit tests for the CERL-Preemptive audit trail API
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import socket
+import tempfile
+import threading
+from http.client import HTTPConnection
+from http.server import HTTPServer
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import audit_trail_api, ledger_stream, merkle, metrics
+from cerl_preemptive.consent_ledger import LedgerWriter, read_event, verify_chain
+
+
+class AuditApiTestCase(unittest.TestCase):
+    """Serves a temporary ledger with ten events on an ephemeral port"""
+
+    server_class = HTTPServer
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ledger_path = os.path.join(self.temp_dir, "ledger.jsonl")
+        writer = LedgerWriter(self.ledger_path)
+        self.hashes = [writer.append("tester", "event", {"i": i}) for i in range(10)]
+        writer.close()
+
+        self.original_ledger_path = audit_trail_api.LEDGER_PATH
+        audit_trail_api.LEDGER_PATH = self.ledger_path
+        self.server = self.server_class(("127.0.0.1", 0), audit_trail_api.AuditHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        audit_trail_api.LEDGER_PATH = self.original_ledger_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get(self, path, headers=None):
+        conn = HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        conn.request("GET", path, headers=headers or {})
+        resp = conn.getresponse()
+        body = resp.read()
+        conn.close()
+        return resp, body
+
+
+class TestLedgerEndpoint(AuditApiTestCase):
+    """Test cases for the /ledger endpoint"""
+
+    def test_full_ledger_json(self):
+        """Test that the default response lists every event"""
+        resp, body = self.get("/ledger")
+        data = json.loads(body)
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.getheader("Transfer-Encoding"), "chunked")
+        self.assertEqual(data["status"], "ok")
+        self.assertEqual(data["count"], 10)
+        self.assertEqual([e["hash"] for e in data["events"]], self.hashes)
+
+    def test_pagination_cursor(self):
+        """Test that after/limit pages through the ledger"""
+        _, body = self.get("/ledger?after=2&limit=3")
+        data = json.loads(body)
+        self.assertEqual([e["hash"] for e in data["events"]], self.hashes[3:6])
+        self.assertEqual(data["next_after"], 5)
+
+        _, body = self.get("/ledger?after=8&limit=3")
+        data = json.loads(body)
+        self.assertEqual([e["hash"] for e in data["events"]], self.hashes[9:])
+        self.assertIsNone(data["next_after"])
+
+    def test_ndjson_stream(self):
+        """Test that NDJSON mode writes one stored event per line"""
+        resp, body = self.get("/ledger?format=ndjson&after=4")
+        self.assertEqual(resp.getheader("Content-Type"), "application/x-ndjson")
+        lines = body.decode("utf-8").splitlines()
+        self.assertEqual([json.loads(line)["hash"] for line in lines], self.hashes[5:])
+
+    def test_after_hash_cursor(self):
+        """Test that a hash cursor resumes after that event"""
+        _, body = self.get(f"/ledger?after_hash={self.hashes[6]}")
+        data = json.loads(body)
+        self.assertEqual([e["hash"] for e in data["events"]], self.hashes[7:])
+
+        resp, _ = self.get("/ledger?after_hash=" + "f" * 64)
+        self.assertEqual(resp.status, 404)
+
+    def test_actor_action_time_filters(self):
+        """Test that query filters select matching events only"""
+        writer = LedgerWriter(self.ledger_path)
+        flagged = writer.append("auditor", "consent_violation_detected", {})
+        writer.close()
+
+        _, body = self.get("/ledger?actor=auditor&action=consent_violation_detected")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], [flagged])
+
+        _, body = self.get("/ledger?action=event&since=1970-01-01T00:00:00Z&limit=4")
+        data = json.loads(body)
+        self.assertEqual([e["hash"] for e in data["events"]], self.hashes[:4])
+        self.assertEqual(data["next_after"], 3)
+
+        resp, _ = self.get("/ledger?since=yesterday")
+        self.assertEqual(resp.status, 400)
+
+    def test_filters_without_index(self):
+        """Test that filters still find every event in a ledger written without a sidecar index"""
+        path = os.path.join(self.temp_dir, "unindexed.jsonl")
+        writer = LedgerWriter(path, index=False, merkle=False)
+        hashes = [writer.append("alice" if i % 2 else "bob", "event", {"i": i}) for i in range(6)]
+        writer.close()
+        audit_trail_api.LEDGER_PATH = path
+
+        _, body = self.get("/ledger?actor=alice")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], hashes[1::2])
+        _, body = self.get("/ledger?since=0&after=1&limit=3")
+        data = json.loads(body)
+        self.assertEqual([e["hash"] for e in data["events"]], hashes[2:5])
+        self.assertEqual(data["next_after"], 4)
+
+    def test_filters_with_stale_index(self):
+        """Test that events appended past the end of the index are still matched"""
+        writer = LedgerWriter(self.ledger_path, index=False, merkle=False)
+        unindexed = writer.append("tester", "event", {"i": 10})
+        writer.close()
+
+        _, body = self.get("/ledger?actor=tester")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], self.hashes + [unindexed])
+        _, body = self.get("/ledger?action=event&after=8")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], [self.hashes[9], unindexed])
+
+    def test_bad_cursor_rejected(self):
+        """Test that a non-numeric cursor is a client error"""
+        resp, _ = self.get("/ledger?after=abc")
+        self.assertEqual(resp.status, 400)
+
+    def test_unknown_path(self):
+        """Test that other paths return 404"""
+        resp, body = self.get("/nope")
+        self.assertEqual(resp.status, 404)
+        self.assertEqual(body, b"Not Found")
+
+
+class TestRawEndpoint(AuditApiTestCase):
+    """Test cases for the /ledger/raw endpoint"""
+
+    def read_ledger(self):
+        with open(self.ledger_path, "rb") as f:
+            return f.read()
+
+    def test_raw_download(self):
+        """Test that the stored bytes are returned with an ETag"""
+        resp, body = self.get("/ledger/raw")
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(body, self.read_ledger())
+        self.assertEqual(resp.getheader("Accept-Ranges"), "bytes")
+        self.assertIn(self.hashes[-1][:16], resp.getheader("ETag"))
+
+    def test_if_none_match(self):
+        """Test that an unchanged ledger returns 304 and a grown one does not"""
+        resp, _ = self.get("/ledger/raw")
+        etag = resp.getheader("ETag")
+        resp, body = self.get("/ledger/raw", {"If-None-Match": etag})
+        self.assertEqual(resp.status, 304)
+        self.assertEqual(body, b"")
+
+        writer = LedgerWriter(self.ledger_path)
+        writer.append("tester", "event", {"i": 10})
+        writer.close()
+        resp, _ = self.get("/ledger/raw", {"If-None-Match": etag})
+        self.assertEqual(resp.status, 200)
+        self.assertNotEqual(resp.getheader("ETag"), etag)
+
+    def test_range_tail(self):
+        """Test that a mirror can fetch only the bytes it does not have"""
+        data = self.read_ledger()
+        have = data.index(b"\n") + 1
+        resp, body = self.get("/ledger/raw", {"Range": f"bytes={have}-"})
+        self.assertEqual(resp.status, 206)
+        self.assertEqual(body, data[have:])
+        self.assertEqual(resp.getheader("Content-Range"), f"bytes {have}-{len(data) - 1}/{len(data)}")
+
+        resp, body = self.get("/ledger/raw", {"Range": "bytes=-10"})
+        self.assertEqual(body, data[-10:])
+
+        resp, _ = self.get("/ledger/raw", {"Range": f"bytes={len(data)}-"})
+        self.assertEqual(resp.status, 416)
+
+        resp, body = self.get("/ledger/raw", {"Range": "bytes=0-9", "If-Range": '"stale"'})
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(body, data)
+
+    def test_partial_line_excluded(self):
+        """Test that an append in progress is not served"""
+        data = self.read_ledger()
+        with open(self.ledger_path, "ab") as f:
+            f.write(b'{"partial": ')
+        resp, body = self.get("/ledger/raw")
+        self.assertEqual(body, data)
+
+    def test_malformed_last_line_excluded(self):
+        """Test that a complete but unparseable last line is left out instead of failing the request"""
+        data = self.read_ledger()
+        with open(self.ledger_path, "ab") as f:
+            f.write(b'{"timestamp": 1, "trunc\n')
+        resp, body = self.get("/ledger/raw")
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(body, data)
+        self.assertIn(self.hashes[-1][:16], resp.getheader("ETag"))
+
+    def test_head(self):
+        """Test that HEAD returns the headers without a body"""
+        conn = HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        conn.request("HEAD", "/ledger/raw")
+        resp = conn.getresponse()
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(int(resp.getheader("Content-Length")), len(self.read_ledger()))
+        self.assertEqual(resp.read(), b"")
+        conn.close()
+
+
+class TestSegmentsEndpoint(AuditApiTestCase):
+    """Test cases for serving a rotated ledger"""
+
+    def setUp(self):
+        super().setUp()
+        writer = LedgerWriter(self.ledger_path)
+        self.seal = writer.rotate()
+        self.hashes += [writer.append("tester", "event", {"i": i}) for i in range(10, 13)]
+        writer.close()
+
+    def test_list_segments(self):
+        """Test that the seals are listed without local paths"""
+        resp, body = self.get("/ledger/segments")
+        segments = json.loads(body)["segments"]
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(segments[0]["last_hash"], self.hashes[9])
+        self.assertNotIn("path", segments[0])
+
+    def test_sealed_segment_is_immutable(self):
+        """Test that a sealed segment is served with a digest ETag and long-lived caching"""
+        resp, body = self.get("/ledger/segments/1")
+        with open(self.seal["path"], "rb") as f:
+            self.assertEqual(body, f.read())
+        self.assertEqual(resp.getheader("ETag"), f'"{self.seal["sha256"]}"')
+        self.assertIn("immutable", resp.getheader("Cache-Control"))
+
+        resp, _ = self.get("/ledger/segments/1", {"If-None-Match": resp.getheader("ETag")})
+        self.assertEqual(resp.status, 304)
+        resp, _ = self.get("/ledger/segments/2")
+        self.assertEqual(resp.status, 404)
+
+    def test_ledger_spans_segments(self):
+        """Test that /ledger serves sealed events before the active ones, with one sequence across them"""
+        _, body = self.get("/ledger")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], self.hashes)
+
+        _, body = self.get("/ledger?after=8&limit=2")
+        data = json.loads(body)
+        self.assertEqual([e["hash"] for e in data["events"]], self.hashes[9:11])
+        self.assertEqual(data["next_after"], 10)
+
+        _, body = self.get("/ledger?after=11")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], self.hashes[12:])
+        _, body = self.get(f"/ledger?after_hash={self.hashes[10]}")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], self.hashes[11:])
+        _, body = self.get(f"/ledger?after_hash={self.hashes[7]}&limit=3")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], self.hashes[8:11])
+
+    def test_filters_span_segments(self):
+        """Test that filters match sealed and active events alike"""
+        _, body = self.get("/ledger?actor=tester&since=0")
+        self.assertEqual([e["hash"] for e in json.loads(body)["events"]], self.hashes)
+
+        _, body = self.get("/ledger?action=event&after=7&limit=3")
+        data = json.loads(body)
+        self.assertEqual([e["hash"] for e in data["events"]], self.hashes[8:11])
+        self.assertEqual(data["next_after"], 10)
+
+
+class TestMerkleEndpoints(AuditApiTestCase):
+    """Test cases for the /root and /proof endpoints"""
+
+    def test_proof_by_id_and_hash(self):
+        """Test that an event's inclusion proof verifies against the published root"""
+        _, body = self.get("/root")
+        root = json.loads(body)
+        self.assertEqual(root["size"], 10)
+        _, body = self.get(f"/proof/{self.hashes[4]}")
+        proof = json.loads(body)
+        self.assertEqual(proof["seq"], 4)
+        self.assertEqual(proof["root"], root["root"])
+        self.assertTrue(merkle.verify_event_proof(proof, expected=self.hashes[4]))
+        self.assertFalse(merkle.verify_event_proof(proof, expected=self.hashes[5]))
+
+        _, body = self.get(f"/proof/{proof['event']['id']}?size=5")
+        older = json.loads(body)
+        self.assertEqual(older["tree_size"], 5)
+        self.assertTrue(merkle.verify_event_proof(older, expected=proof["event"]["id"]))
+        resp, _ = self.get("/proof/no-such-event")
+        self.assertEqual(resp.status, 404)
+        resp, _ = self.get(f"/proof/{self.hashes[6]}?size=5")
+        self.assertEqual(resp.status, 400)
+
+    def test_consistency_between_roots(self):
+        """Test that a root seen earlier is proved to be a prefix of the current one"""
+        _, body = self.get("/root")
+        before = json.loads(body)
+        writer = LedgerWriter(self.ledger_path)
+        writer.append_batch([("tester", "event", {"i": i}, None) for i in range(10, 15)])
+        writer.close()
+        _, body = self.get(f"/root?from={before['size']}")
+        after = json.loads(body)
+        self.assertEqual(after["size"], 15)
+        self.assertEqual(after["from_root"], before["root"])
+        self.assertTrue(merkle.verify_consistency(10, 15, before["root"], after["root"], after["consistency"]))
+        resp, _ = self.get("/root?size=16")
+        self.assertEqual(resp.status, 400)
+
+    def test_tree_behind_ledger_reported(self):
+        """Test that a tree missing or behind the ledger is reported rather than served as complete"""
+        writer = LedgerWriter(self.ledger_path, merkle=False)
+        extra = writer.append("tester", "event", {"i": 10})
+        writer.close()
+        _, body = self.get("/root")
+        root = json.loads(body)
+        self.assertEqual((root["size"], root["ledger_size"]), (10, 11))
+        resp, _ = self.get(f"/proof/{extra}")
+        self.assertEqual(resp.status, 503)
+        resp, _ = self.get("/proof/no-such-event")
+        self.assertEqual(resp.status, 503)
+        resp, _ = self.get("/proof/" + "f" * 64)
+        self.assertEqual(resp.status, 404)
+
+        path = os.path.join(self.temp_dir, "treeless.jsonl")
+        writer = LedgerWriter(path, merkle=False)
+        event_hash = writer.append("tester", "event", {})
+        writer.close()
+        audit_trail_api.LEDGER_PATH = path
+        resp, _ = self.get("/root")
+        self.assertEqual(resp.status, 503)
+        resp, _ = self.get(f"/proof/{event_hash}")
+        self.assertEqual(resp.status, 503)
+
+
+class TestConcurrentServer(AuditApiTestCase):
+    """Test cases for the bounded threading server"""
+
+    def server_class(self, address, handler):
+        return audit_trail_api.BoundedThreadingHTTPServer(address, handler, max_connections=4, idle_timeout=2)
+
+    def test_keep_alive_reuses_connection(self):
+        """Test that several requests can share one HTTP/1.1 connection"""
+        conn = HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        for after in (0, 5):
+            conn.request("GET", f"/ledger?after={after}&limit=2")
+            resp = conn.getresponse()
+            data = json.loads(resp.read())
+            self.assertEqual(data["events"][0]["hash"], self.hashes[after + 1])
+        conn.close()
+
+    def test_stalled_client_does_not_block_others(self):
+        """Test that an idle connection leaves other clients served"""
+        stalled = socket.create_connection(("127.0.0.1", self.server.server_address[1]))
+        try:
+            stalled.sendall(b"GET /ledger HTTP/1.1\r\n")
+            resp, body = self.get("/ledger?limit=1")
+            self.assertEqual(resp.status, 200)
+            self.assertEqual(json.loads(body)["count"], 1)
+        finally:
+            stalled.close()
+
+
+class TestMetricsEndpoint(AuditApiTestCase):
+    """Test cases for the /metrics endpoint"""
+
+    def scrape(self):
+        resp, body = self.get("/metrics")
+        self.assertEqual(resp.status, 200)
+        self.assertTrue(resp.getheader("Content-Type").startswith("text/plain; version=0.0.4"))
+        samples = {}
+        for line in body.decode("utf-8").splitlines():
+            if line and not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_operation_latency_exported(self):
+        """Test that timed ledger operations show up as Prometheus histograms"""
+        count = 'cerl_operation_seconds_count{operation="verify_chain"}'
+        before = self.scrape().get(count, 0)
+        verify_chain(path=self.ledger_path)
+        samples = self.scrape()
+        self.assertEqual(samples["cerl_metrics_enabled"], 1)
+        self.assertEqual(samples[count], before + 1)
+        self.assertEqual(samples['cerl_operation_seconds_bucket{operation="verify_chain",le="+Inf"}'], before + 1)
+
+    def test_disabled_metrics_not_recorded(self):
+        """Test that nothing is recorded while metrics are switched off"""
+        count = 'cerl_operation_seconds_count{operation="verify_chain"}'
+        before = self.scrape().get(count, 0)
+        metrics.set_enabled(False)
+        try:
+            verify_chain(path=self.ledger_path)
+            samples = self.scrape()
+        finally:
+            metrics.set_enabled(True)
+        self.assertEqual(samples["cerl_metrics_enabled"], 0)
+        self.assertEqual(samples[count], before)
+
+
+class TestStreamEndpoint(AuditApiTestCase):
+    """Test cases for the /ledger/stream Server-Sent Events endpoint"""
+
+    def server_class(self, address, handler):
+        return audit_trail_api.BoundedThreadingHTTPServer(address, handler, max_connections=8, idle_timeout=5)
+
+    def setUp(self):
+        self.original_keepalive = audit_trail_api.STREAM_KEEPALIVE
+        audit_trail_api.STREAM_KEEPALIVE = 0.2
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        ledger_stream.close_broadcaster(self.ledger_path)
+        audit_trail_api.STREAM_KEEPALIVE = self.original_keepalive
+
+    def subscribe(self, path, headers=None):
+        conn = HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        conn.request("GET", path, headers=headers or {})
+        resp = conn.getresponse()
+        self.assertEqual(resp.getheader("Content-Type"), "text/event-stream")
+        return conn, resp
+
+    def read_events(self, resp, count):
+        events, seq = [], None
+        while len(events) < count:
+            line = resp.readline()
+            if not line:
+                break  # the server closed the stream
+            line = line.rstrip(b"\n")
+            if line.startswith(b"id: "):
+                seq = int(line[4:])
+            elif line.startswith(b"data: "):
+                events.append((seq, json.loads(line[6:])))
+        return events
+
+    def test_new_events_pushed_to_subscribers(self):
+        """Test that every subscriber receives events appended after it connected"""
+        subscribers = [self.subscribe("/ledger/stream") for _ in range(3)]
+        for _, resp in subscribers:
+            self.assertEqual(resp.readline(), b"retry: 2000\n")
+        writer = LedgerWriter(self.ledger_path)
+        new = writer.append_batch([("tester", "event", {"i": i}, None) for i in (10, 11)])
+        writer.close()
+        for conn, resp in subscribers:
+            events = self.read_events(resp, 2)
+            self.assertEqual([seq for seq, _ in events], [10, 11])
+            self.assertEqual([e["hash"] for _, e in events], new)
+            conn.close()
+
+    def test_resume_from_cursor(self):
+        """Test that since and Last-Event-ID replay the events after them from the ledger"""
+        conn, resp = self.subscribe("/ledger/stream?since=6")
+        self.assertEqual([e["hash"] for _, e in self.read_events(resp, 3)], self.hashes[7:])
+        conn.close()
+        conn, resp = self.subscribe("/ledger/stream", {"Last-Event-ID": "8"})
+        self.assertEqual(self.read_events(resp, 1)[0][1]["hash"], self.hashes[9])
+        conn.close()
+
+    def test_catch_up_skips_unreadable_line(self):
+        """Test that replaying from the ledger skips a corrupt line instead of dropping the stream"""
+        with open(self.ledger_path, "rb") as f:
+            lines = f.readlines()
+        lines[7] = b"#" * (len(lines[7]) - 1) + b"\n"
+        with open(self.ledger_path, "wb") as f:
+            f.writelines(lines)
+        conn, resp = self.subscribe("/ledger/stream?since=5")
+        events = self.read_events(resp, 3)
+        self.assertEqual([seq for seq, _ in events], [6, 8, 9])
+        self.assertEqual([e["hash"] for _, e in events], [self.hashes[6]] + self.hashes[8:])
+        conn.close()
+
+    def test_action_filter(self):
+        """Test that a subscriber only receives events with the requested action"""
+        conn, resp = self.subscribe("/ledger/stream?action=consent_violation_detected")
+        writer = LedgerWriter(self.ledger_path)
+        writer.append("tester", "event", {})
+        violation = writer.append("auditor", "consent_violation_detected", {"target": "private_data"})
+        writer.close()
+        self.assertEqual(self.read_events(resp, 1), [(11, read_event(11, self.ledger_path))])
+        self.assertEqual(read_event(11, self.ledger_path)["hash"], violation)
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
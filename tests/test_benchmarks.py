@@ -0,0 +1,102 @@
+"""
+Unit tests for the CERL-Preemptive benchmark suite and its synthetic data
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.consent_token_manager import TokenStore
+import compare
+import synthetic
+
+BENCHMARKS = os.path.join(os.path.dirname(__file__), '..', 'benchmarks')
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestSynthetic(BenchmarkTestCase):
+    """Test cases for the synthetic data generator"""
+
+    def test_ledger_deterministic_and_valid(self):
+        """Test that a seed always gives the same ledger, which verifies and is indexed"""
+        a = synthetic.generate_ledger(os.path.join(self.temp_dir, "a.jsonl"), 500, seed=4)
+        b = synthetic.generate_ledger(os.path.join(self.temp_dir, "b.jsonl"), 500, seed=4)
+        c = synthetic.generate_ledger(os.path.join(self.temp_dir, "c.jsonl"), 500, seed=5, sidecars=False)
+        with open(a, "rb") as fa, open(b, "rb") as fb, open(c, "rb") as fc:
+            data = fa.read()
+            self.assertEqual(data, fb.read())
+            self.assertNotEqual(data, fc.read())
+        self.assertEqual(consent_ledger.verify_chain(path=a).seq, 500)
+        self.assertEqual(consent_ledger.get_index(a).count(), 500)
+        self.assertEqual(consent_ledger.get_merkle(a).size(), 500)
+        self.assertEqual(consent_ledger.read_event(499, a)["timestamp"], synthetic.START + 0.499)
+
+    def test_token_ids_resolve(self):
+        """Test that generated token IDs are found by the token store, except expired ones"""
+        path = synthetic.generate_tokens(os.path.join(self.temp_dir, "tokens.jsonl"), 100, seed=2)
+        store = TokenStore(path)
+        self.assertIsNotNone(store.get(synthetic.token_id(0, 2)))
+        self.assertIsNone(store.get(synthetic.token_id(synthetic.EXPIRED_EVERY - 1, 2)))
+        self.assertIsNone(store.get(synthetic.token_id(0, 3)))
+
+    def test_counts(self):
+        """Test that counts with suffixes parse and format back"""
+        self.assertEqual(synthetic.parse_count("100M"), 100000000)
+        self.assertEqual(synthetic.parse_count("2.5k"), 2500)
+        self.assertEqual(synthetic.format_count(1000000), "1M")
+        self.assertEqual(synthetic.format_count(1500), "1500")
+
+
+class TestSuite(BenchmarkTestCase):
+    """Test cases for running the suite and comparing its results"""
+
+    def test_suite_and_compare(self):
+        """Test that a small suite run writes JSON results that compare cleanly with themselves"""
+        output = os.path.join(self.temp_dir, "results.json")
+        subprocess.run([sys.executable, os.path.join(BENCHMARKS, "suite.py"), "--sizes", "200", "--ops", "40",
+                        "--repeat", "1", "--clients", "2", "--data-dir", os.path.join(self.temp_dir, "data"),
+                        "--output", output], check=True, capture_output=True, timeout=300)
+        with open(output) as f:
+            report = json.load(f)
+        scenarios = {r["scenario"] for r in report["results"]}
+        self.assertEqual(scenarios, {"append", "validate", "tokens", "verify", "audit_api"})
+        self.assertTrue(all(r["value"] > 0 and r["better"] in ("higher", "lower") for r in report["results"]))
+
+        result = subprocess.run([sys.executable, os.path.join(BENCHMARKS, "compare.py"), output, output],
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stdout)
+
+    def test_regression_detected(self):
+        """Test that only changes in a metric's worse direction beyond the threshold count"""
+        def report(rate, latency):
+            return {"schema": 1, "environment": {}, "results": [
+                {"scenario": "append", "size": 1000, "metric": "rate", "value": rate, "unit": "ev/s",
+                 "better": "higher"},
+                {"scenario": "append", "size": 1000, "metric": "latency", "value": latency, "unit": "ms",
+                 "better": "lower"},
+            ]}
+
+        rows = compare.compare(report(100, 10), report(85, 9), threshold=10)
+        self.assertEqual([(row[2], row[-1]) for row in rows], [("rate", True), ("latency", False)])
+        rows = compare.compare(report(100, 10), report(120, 12), threshold=10)
+        self.assertEqual([(row[2], row[-1]) for row in rows], [("rate", False), ("latency", True)])
+
+
+if __name__ == '__main__':
+    unittest.main()
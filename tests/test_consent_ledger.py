@@ -0,0 +1,449 @@
+"""
+Unit tests for the CERL-Preemptive consent ledger
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.consent_ledger import LedgerWriter, GroupCommitWriter, GENESIS_HASH
+
+
+class LedgerTestCase(unittest.TestCase):
+    """Points the ledger module at a temporary file for each test"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "test_ledger.jsonl")
+        self.original_ledger_path = consent_ledger.LEDGER_PATH
+        consent_ledger.LEDGER_PATH = self.path
+
+    def tearDown(self):
+        consent_ledger.LEDGER_PATH = self.original_ledger_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def read_events(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def append_many(self, count):
+        for i in range(count):
+            consent_ledger.append_event("tester", "event", {"i": i})
+
+    def tamper(self, index):
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        offset = sum(len(line.encode("utf-8")) for line in lines[:index])
+        event = json.loads(lines[index])
+        event["payload"]["i"] = -1
+        lines[index] = json.dumps(event) + "\n"
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        return offset
+
+
+class TestLedgerWriter(LedgerTestCase):
+    """Test cases for the cached chain head"""
+
+    def test_empty_ledger_starts_at_genesis(self):
+        """Test that a missing ledger reports the genesis hash"""
+        self.assertEqual(consent_ledger.last_hash(), GENESIS_HASH)
+
+    def test_append_event_chains_and_verifies(self):
+        """Test that appended events link to the previous hash"""
+        first = consent_ledger.append_event("tester", "one", {"n": 1})
+        second = consent_ledger.append_event("tester", "two", {"n": 2})
+
+        events = self.read_events()
+        self.assertEqual([e["hash"] for e in events], [first, second])
+        self.assertEqual(events[1]["prev_hash"], first)
+        self.assertEqual(consent_ledger.last_hash(), second)
+        self.assertTrue(consent_ledger.verify_chain())
+
+    def test_head_recovered_from_large_trailing_event(self):
+        """Test that a new writer recovers a head longer than one read chunk"""
+        writer = LedgerWriter(self.path)
+        writer.append("tester", "small", {})
+        big = writer.append("tester", "big", {"blob": "x" * 50000})
+        writer.close()
+
+        recovered = LedgerWriter(self.path)
+        self.assertEqual(recovered.head(), big)
+        with open(self.path, "rb") as f:
+            f.seek(recovered.head_offset())
+            self.assertEqual(json.loads(f.readline())["hash"], big)
+        recovered.close()
+
+    def test_external_append_is_picked_up(self):
+        """Test that the cached head follows appends made by another writer"""
+        writer = LedgerWriter(self.path)
+        other = LedgerWriter(self.path)
+        writer.append("tester", "first", {})
+        external = other.append("tester", "second", {})
+
+        self.assertEqual(writer.head(), external)
+        writer.append("tester", "third", {})
+        self.assertTrue(consent_ledger.verify_chain())
+        writer.close()
+        other.close()
+
+    def test_replaced_file_is_picked_up(self):
+        """Test that the cached head is revalidated when the inode changes"""
+        writer = LedgerWriter(self.path)
+        writer.append("tester", "old", {})
+
+        replacement = os.path.join(self.temp_dir, "replacement.jsonl")
+        fresh = LedgerWriter(replacement)
+        new_head = fresh.append("tester", "new", {})
+        fresh.close()
+        os.replace(replacement, self.path)
+
+        self.assertEqual(writer.head(), new_head)
+        writer.append("tester", "after", {})
+        self.assertEqual(len(self.read_events()), 2)
+        self.assertTrue(consent_ledger.verify_chain())
+        writer.close()
+
+
+class TestGroupCommit(LedgerTestCase):
+    """Test cases for batched group-commit appends"""
+
+    def test_concurrent_submits_stay_chained(self):
+        """Test that events from many threads form a single linear chain"""
+        committer = GroupCommitWriter(LedgerWriter(self.path, durability="batch"))
+        futures = []
+        lock = threading.Lock()
+
+        def worker(n):
+            for i in range(50):
+                future = committer.submit(f"worker{n}", "event", {"i": i})
+                with lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        committer.flush()
+
+        self.assertTrue(all(f.done() for f in futures))
+        events = self.read_events()
+        self.assertEqual(len(events), 400)
+        self.assertEqual({e["hash"] for e in events}, {f.result() for f in futures})
+        self.assertTrue(consent_ledger.verify_chain())
+        committer.close()
+
+    def test_append_event_routes_through_group_commit(self):
+        """Test that enabling group commit keeps append_event's return value"""
+        consent_ledger.enable_group_commit(durability="every-event")
+        try:
+            h = consent_ledger.append_event("tester", "grouped", {})
+        finally:
+            consent_ledger.disable_group_commit()
+        self.assertEqual(consent_ledger.last_hash(), h)
+        self.assertEqual(self.read_events()[-1]["hash"], h)
+
+    def test_unknown_durability_rejected(self):
+        """Test that an unknown durability policy raises ValueError"""
+        with self.assertRaises(ValueError):
+            LedgerWriter(self.path, durability="sometimes")
+
+
+class TestVerifyChain(LedgerTestCase):
+    """Test cases for full and checkpointed incremental verification"""
+
+    def test_reports_first_bad_offset(self):
+        """Test that a tampered event is reported by byte offset"""
+        self.append_many(5)
+        offset = self.tamper(2)
+
+        result = consent_ledger.verify_chain()
+        self.assertFalse(result)
+        self.assertEqual(result.bad_offset, offset)
+        self.assertEqual(result.seq, 2)
+
+    def test_incremental_resumes_from_checkpoint(self):
+        """Test that incremental runs only cover newly appended events"""
+        self.append_many(3)
+        first = consent_ledger.verify_chain(incremental=True)
+        self.assertTrue(first)
+        self.assertTrue(os.path.exists(self.path + ".checkpoint"))
+
+        self.append_many(2)
+        second = consent_ledger.verify_chain(incremental=True)
+        self.assertTrue(second)
+        self.assertEqual(second.seq, 5)
+        self.assertEqual(second.offset, os.path.getsize(self.path))
+
+    def test_incremental_detects_rewritten_prefix(self):
+        """Test that changes before the checkpoint trigger a full re-verify"""
+        self.append_many(4)
+        consent_ledger.verify_chain(incremental=True)
+        offset = self.tamper(3)
+
+        result = consent_ledger.verify_chain(incremental=True)
+        self.assertFalse(result)
+        self.assertEqual(result.bad_offset, offset)
+
+    def test_checkpoint_with_bad_hmac_is_ignored(self):
+        """Test that a forged checkpoint is not trusted when a key is set"""
+        self.append_many(3)
+        consent_ledger.verify_chain(incremental=True, hmac_key=b"secret")
+        checkpoint = self.path + ".checkpoint"
+        self.assertIsNotNone(consent_ledger.load_checkpoint(checkpoint, b"secret"))
+        self.assertIsNone(consent_ledger.load_checkpoint(checkpoint, b"other"))
+
+        with open(checkpoint, "r", encoding="utf-8") as f:
+            cp = json.load(f)
+        cp["seq"] = 99
+        with open(checkpoint, "w", encoding="utf-8") as f:
+            json.dump(cp, f)
+        result = consent_ledger.verify_chain(incremental=True, hmac_key=b"secret")
+        self.assertTrue(result)
+        self.assertEqual(result.seq, 3)
+
+
+class TestParallelVerify(LedgerTestCase):
+    """Test cases for multi-process verification"""
+
+    def setUp(self):
+        super().setUp()
+        self.original_min_bytes = consent_ledger._PARALLEL_MIN_BYTES
+        consent_ledger._PARALLEL_MIN_BYTES = 0
+
+    def tearDown(self):
+        consent_ledger._PARALLEL_MIN_BYTES = self.original_min_bytes
+        super().tearDown()
+
+    def test_parallel_matches_serial(self):
+        """Test that chunked verification agrees with a single pass"""
+        self.append_many(200)
+        serial = consent_ledger.verify_chain()
+        parallel = consent_ledger.verify_chain(workers=3)
+        self.assertTrue(parallel)
+        self.assertEqual((parallel.seq, parallel.offset, parallel.head), (serial.seq, serial.offset, serial.head))
+
+    def test_parallel_reports_first_bad_offset(self):
+        """Test that a tampered event is located across chunks"""
+        self.append_many(200)
+        offset = self.tamper(150)
+        result = consent_ledger.verify_chain(workers=3)
+        self.assertFalse(result)
+        self.assertEqual(result.bad_offset, offset)
+        self.assertEqual(result.seq, 150)
+
+    def test_parallel_detects_removed_event(self):
+        """Test that a missing event breaks the link between events"""
+        self.append_many(200)
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        offset = sum(len(line.encode("utf-8")) for line in lines[:100])
+        del lines[100]
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        result = consent_ledger.verify_chain(workers=4)
+        self.assertFalse(result)
+        self.assertEqual(result.bad_offset, offset)
+
+
+class TestLineFormat(LedgerTestCase):
+    """Test cases for the v1 and v2 line formats"""
+
+    def write_mixed(self):
+        LedgerWriter(self.path, line_version=1).append_batch([("tester", "event", {"i": i}, None) for i in range(3)])
+        LedgerWriter(self.path).append_batch([("tester", "event", {"i": i}, None) for i in range(3, 6)])
+
+    def test_v2_line_is_the_hashed_bytes(self):
+        """Test that a v2 line hashes as stored and matches the v1 hash of the same event"""
+        h = LedgerWriter(self.path).append("tester", "event", {"nested": {"a": 1, "prev_hash": "x"}, "s": "é"})
+        with open(self.path, "rb") as f:
+            line = f.readline()
+        self.assertTrue(line.endswith(f', "v": 2, "hash": "{h}"}}\n'.encode()))
+        event = json.loads(line)
+        self.assertEqual(event["v"], 2)
+        self.assertTrue(consent_ledger._event_hash_ok(event))
+        self.assertEqual(consent_ledger._line_link(line), (True, h, GENESIS_HASH))
+
+    def test_mixed_ledger_verifies(self):
+        """Test that v1 and v2 lines chain and verify together, serially and in parallel"""
+        self.write_mixed()
+        self.assertEqual(consent_ledger.verify_chain().seq, 6)
+        with mock.patch.object(consent_ledger, "_PARALLEL_MIN_BYTES", 0):
+            self.assertEqual(consent_ledger.verify_chain(workers=2).seq, 6)
+
+    def test_tampered_v2_line_detected(self):
+        """Test that editing a v2 line's stored bytes breaks its hash"""
+        self.append_many(3)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        offset = data.index(b"\n") + 1
+        with open(self.path, "wb") as f:
+            f.write(data.replace(b'{"i": 1}', b'{"i": 7}'))
+        result = consent_ledger.verify_chain()
+        self.assertFalse(result)
+        self.assertEqual((result.bad_offset, result.reason), (offset, "hash mismatch"))
+
+    def test_migration_keeps_hashes(self):
+        """Test that migrating between formats keeps every hash and the index"""
+        self.write_mixed()
+        hashes = [e["hash"] for e in self.read_events()]
+        self.assertEqual(consent_ledger.migrate_ledger(line_version=2), 3)
+        self.assertEqual(consent_ledger.migrate_ledger(line_version=2), 0)
+        self.assertTrue(all(e["v"] == 2 for e in self.read_events()))
+        self.assertEqual([e["hash"] for e in self.read_events()], hashes)
+        self.assertEqual(consent_ledger.find_seq(hashes[4]), 4)
+        self.assertEqual(consent_ledger.read_event(5)["hash"], hashes[5])
+        self.assertTrue(consent_ledger.verify_chain())
+
+        self.assertEqual(consent_ledger.migrate_ledger(line_version=1), 6)
+        self.assertFalse(any("v" in e for e in self.read_events()))
+        self.assertEqual(consent_ledger.append_event("tester", "event", {}), consent_ledger.last_hash())
+        self.assertTrue(consent_ledger.verify_chain())
+
+    def test_migration_refuses_broken_chain(self):
+        """Test that a ledger that does not verify is left unchanged"""
+        self.append_many(5)
+        self.tamper(2)
+        with open(self.path, "rb") as f:
+            before = f.read()
+        with self.assertRaises(ValueError):
+            consent_ledger.migrate_ledger(line_version=1)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), before)
+        self.assertFalse(os.path.exists(self.path + ".migrate"))
+
+    def forged_line(self, prev, canonical=lambda raw: raw, **extra):
+        """A v2 line whose stored bytes hash correctly, built from `canonical` of the encoded event"""
+        event = {"timestamp": 1.5, "id": "forged", "actor": "mallory", "action": "event",
+                 "payload": {"a": 1, "b": 2}, "consent_token": None, "prev_hash": prev, **extra}
+        raw = canonical(json.dumps(event, sort_keys=True))
+        return consent_ledger._v2_line(raw, consent_ledger._hash(raw))
+
+    def test_extra_key_cannot_supply_prev_hash(self):
+        """Test that a prev_hash nested in a key after the top-level one is not taken as the link"""
+        head = consent_ledger.append_event("tester", "event", {})
+        line = self.forged_line("1" * 64, zz={"prev_hash": head})
+        self.assertEqual(consent_ledger._line_link(line)[2], "1" * 64)
+        with open(self.path, "rb+") as f:
+            first = f.readline()
+            f.write(line)
+        self.assertEqual(consent_ledger.verify_chain().reason, "broken prev_hash link")
+        with self.assertRaises(ValueError):
+            LedgerWriter(os.path.join(self.temp_dir, "replica.jsonl")).append_raw([first, line])
+
+    def test_non_canonical_v2_line_rejected(self):
+        """Test that v2 lines whose stored bytes are not the canonical encoding are not accepted"""
+        compact = self.forged_line(GENESIS_HASH, lambda raw: json.dumps(json.loads(raw), separators=(",", ":")))
+        self.assertFalse(consent_ledger._line_link(compact)[0])
+        unsorted = self.forged_line(GENESIS_HASH, lambda raw: raw.replace('"a": 1, "b": 2', '"b": 2, "a": 1'))
+        with self.assertRaises(ValueError):
+            LedgerWriter(self.path).append_raw([unsorted])
+        self.assertFalse(os.path.exists(self.path) and os.path.getsize(self.path))
+
+        with open(self.path, "wb") as f:
+            f.write(unsorted)
+        with self.assertRaises(ValueError):
+            consent_ledger.migrate_ledger(line_version=1)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), unsorted)
+
+
+
+class TestRotation(LedgerTestCase):
+    """Test cases for sealed segments"""
+
+    def setUp(self):
+        super().setUp()
+        self.writer = LedgerWriter(self.path, rotate_bytes=1500)
+        self.records = [self.writer.append_record("tester", "event", {"i": i}) for i in range(25)]
+
+    def tearDown(self):
+        self.writer.close()
+        super().tearDown()
+
+    def test_chain_and_sequence_continue_across_segments(self):
+        """Test that rotated segments chain together and keep global sequence numbers"""
+        seals = consent_ledger.list_seals(self.path)
+        self.assertGreater(len(seals), 2)
+        self.assertEqual([seq for seq, _ in self.records], list(range(25)))
+        self.assertEqual(seals[0]["prev_hash"], GENESIS_HASH)
+        for before, after in zip(seals, seals[1:]):
+            self.assertEqual(after["prev_hash"], before["last_hash"])
+            self.assertEqual(after["first_seq"], before["first_seq"] + before["count"])
+        self.assertEqual(self.read_events()[0]["prev_hash"], seals[-1]["last_hash"])
+
+        result = consent_ledger.verify_chain()
+        self.assertTrue(result)
+        self.assertEqual((result.seq, result.head), (25, self.records[-1][1]))
+        self.assertTrue(consent_ledger.verify_chain(workers=2))
+        self.assertEqual(LedgerWriter(self.path).event_count(), 25)
+
+    def test_read_and_find_in_sealed_segments(self):
+        """Test that lookups by sequence number and hash reach sealed segments"""
+        for seq, event_hash in self.records:
+            self.assertEqual(consent_ledger.read_event(seq)["hash"], event_hash)
+            self.assertEqual(consent_ledger.find_seq(event_hash), seq)
+        self.assertIsNone(consent_ledger.read_event(25))
+
+    def test_find_after_rotation_with_warm_cache(self):
+        """Test that hash lookups made before a rotation do not map sealed events onto the new active file"""
+        self.assertEqual(consent_ledger.find_seq(self.records[-1][1]), 24)
+        self.writer.rotate()
+        writer = LedgerWriter(self.path)
+        later = [writer.append_record("tester", "event", {"i": i}) for i in range(25, 45)]
+        writer.close()
+        for seq, event_hash in self.records[-3:] + later:
+            self.assertEqual(consent_ledger.find_seq(event_hash), seq)
+
+    def test_explicit_rotate(self):
+        """Test that rotate seals the active file and returns None when it is empty"""
+        seal = self.writer.rotate()
+        self.assertEqual(seal["last_hash"], self.records[-1][1])
+        self.assertEqual(seal["first_seq"] + seal["count"], 25)
+        self.assertIsNone(self.writer.rotate())
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertEqual(self.writer.append_record("tester", "event", {}), (25, self.writer.head()))
+        self.assertTrue(consent_ledger.verify_chain())
+
+    def test_rotate_by_age(self):
+        """Test that an active file older than rotate_seconds is sealed before the next append"""
+        writer = LedgerWriter(self.path, rotate_seconds=0)
+        sealed = len(consent_ledger.list_seals(self.path))
+        writer.append("tester", "event", {})
+        self.assertEqual(len(consent_ledger.list_seals(self.path)), sealed + 1)
+        self.assertEqual(len(self.read_events()), 1)
+
+    def test_tampered_segment_detected(self):
+        """Test that full runs verify the events of sealed segments"""
+        seal = consent_ledger.list_seals(self.path)[1]
+        with open(seal["path"], "rb") as f:
+            data = f.read()
+        with open(seal["path"], "wb") as f:
+            f.write(data.replace(b'"i": %d}' % (seal["first_seq"] + 1), b'"i": 0}', 1))
+
+        result = consent_ledger.verify_chain()
+        self.assertFalse(result)
+        self.assertEqual(result.seq, seal["first_seq"] + 1)
+        self.assertIn("000002.jsonl: hash mismatch", result.reason)
+        self.assertTrue(consent_ledger.verify_chain(incremental=True))
+        self.assertFalse(consent_ledger.verify_chain(workers=2))
+
+    def test_truncated_segment_detected(self):
+        """Test that incremental runs still notice a sealed segment that changed size"""
+        seal = consent_ledger.list_seals(self.path)[0]
+        with open(seal["path"], "ab") as f:
+            f.write(b"\n")
+        self.assertIn("size differs", consent_ledger.verify_chain(incremental=True).reason)
+
+if __name__ == '__main__':
+    unittest.main()
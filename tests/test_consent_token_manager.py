@@ -0,0 +1,168 @@
+"""
+Unit tests for the CERL-Preemptive consent token manager
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_token_manager
+from cerl_preemptive.consent_token_manager import TokenStore
+
+
+class TokenTestCase(unittest.TestCase):
+    """Points the token manager at a temporary file for each test"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "tokens.jsonl")
+        self.original_tokens = consent_token_manager.TOKENS
+        consent_token_manager.TOKENS = self.path
+        self._stdout = redirect_stdout(StringIO())
+        self._stdout.__enter__()
+
+    def tearDown(self):
+        self._stdout.__exit__(None, None, None)
+        consent_token_manager.TOKENS = self.original_tokens
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_record(self, token, expiry):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"token": token, "actor": "tester", "scope": "read", "expiry": expiry}) + "\n")
+
+
+class TestTokenStore(TokenTestCase):
+    """Test cases for the indexed token store"""
+
+    def test_issue_and_validate(self):
+        """Test that an issued token validates and an unknown one does not"""
+        token = consent_token_manager.issue_token("tester", "read", 1)
+        self.assertTrue(consent_token_manager.validate_token(token))
+        self.assertFalse(consent_token_manager.validate_token("missing"))
+
+    def test_expired_token_rejected(self):
+        """Test that a token past its expiry is invalid"""
+        self.write_record("old", time.time() - 10)
+        self.assertFalse(consent_token_manager.validate_token("old"))
+
+    def test_expired_token_reported_until_compacted(self):
+        """Test that an evicted token is reported as expired, not unknown, until compaction"""
+        self.write_record("old", time.time() - 10)
+        store = consent_token_manager.get_store()
+        self.assertIsNone(store.get("old"))
+        self.assertEqual(store.evict_expired(), 0)
+        self.assertEqual(store.get("old", include_expired=True)["token"], "old")
+        with redirect_stdout(StringIO()) as out:
+            self.assertFalse(consent_token_manager.validate_token("old"))
+        self.assertIn("Expired token for tester", out.getvalue())
+
+        store.compact()
+        with redirect_stdout(StringIO()) as out:
+            self.assertFalse(consent_token_manager.validate_token("old"))
+        self.assertIn("Token not found", out.getvalue())
+
+    def test_external_appends_are_indexed(self):
+        """Test that records written by another process become visible"""
+        store = TokenStore(self.path)
+        self.assertIsNone(store.get("late"))
+        self.write_record("late", time.time() + 60)
+        self.assertEqual(store.get("late")["token"], "late")
+
+    def test_snapshot_cold_start(self):
+        """Test that a snapshot is used and only newer records are streamed"""
+        self.write_record("a", time.time() + 60)
+        TokenStore(self.path).save_snapshot()
+        self.write_record("b", time.time() + 60)
+
+        store = TokenStore(self.path)
+        self.assertIsNotNone(store.get("a"))
+        self.assertIsNotNone(store.get("b"))
+        self.assertEqual(len(store), 2)
+
+    def test_stale_snapshot_ignored(self):
+        """Test that a snapshot for different file contents is rebuilt"""
+        self.write_record("a", time.time() + 60)
+        TokenStore(self.path).save_snapshot()
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"token": "z", "actor": "x", "scope": "y", "expiry": time.time() + 60}) + "\n")
+
+        store = TokenStore(self.path)
+        self.assertIsNone(store.get("a"))
+        self.assertIsNotNone(store.get("z"))
+
+
+class TestTokenExpiry(TokenTestCase):
+    """Test cases for TTL eviction and compaction"""
+
+    def test_expired_tokens_evicted_from_memory(self):
+        """Test that lapsed tokens leave the in-memory index"""
+        now = time.time()
+        self.write_record("short", now + 5)
+        self.write_record("long", now + 3600)
+        store = TokenStore(self.path)
+
+        self.assertEqual(store.evict_expired(now + 10), 1)
+        self.assertEqual(len(store), 1)
+        self.assertIsNotNone(store.get("long"))
+
+    def test_compact_rewrites_only_live_tokens(self):
+        """Test that compaction drops expired records from the file"""
+        now = time.time()
+        for i in range(5):
+            self.write_record(f"dead{i}", now - 1)
+        self.write_record("live", now + 3600)
+        store = TokenStore(self.path)
+
+        self.assertEqual(store.compact(), 5)
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["token"] for line in f], ["live"])
+        self.assertIsNotNone(store.get("live"))
+
+    def test_append_after_compaction(self):
+        """Test that the store keeps indexing after the file is replaced"""
+        self.write_record("dead", time.time() - 1)
+        consent_token_manager.get_store().compact()
+        token = consent_token_manager.issue_token("tester", "read", 1)
+
+        self.assertTrue(consent_token_manager.validate_token(token))
+        self.assertEqual(len(TokenStore(self.path)), 1)
+
+
+class TestTokenRevocation(TokenTestCase):
+    """Test cases for revoking tokens"""
+
+    def test_revoked_token_rejected_everywhere(self):
+        """Test that a revocation is seen by this and other stores and compacted away"""
+        token = consent_token_manager.issue_token("tester", "read", 1)
+        other = TokenStore(self.path)
+        self.assertIsNotNone(other.get(token))
+
+        self.assertTrue(consent_token_manager.revoke_token(token))
+        self.assertFalse(consent_token_manager.validate_token(token))
+        self.assertIsNone(other.get(token))
+        self.assertFalse(consent_token_manager.revoke_token(token))
+
+        self.assertEqual(other.compact(), 3)
+        self.assertEqual(os.path.getsize(self.path), 0)
+
+    def test_listeners_notified(self):
+        """Test that revocation listeners hear about revocations from any store"""
+        heard = []
+        consent_token_manager.add_revocation_listener(heard.append)
+        token = consent_token_manager.issue_token("tester", "read", 1)
+        TokenStore(self.path).revoke(token)
+        consent_token_manager.get_store().get(token)
+        self.assertIn(token, heard)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -177,6 +177,29 @@ class TestConsentValidator(unittest.TestCase):
         )
         self.assertTrue(result)
 
+    def test_validate_many(self):
+        """Test that a batch returns per-request results and one chained write"""
+        import json
+        import cerl_preemptive.consent_ledger as ledger_module
+        requests = [
+            {"action": "read", "target": "private_data", "consent_status": "granted", "actor": "a"},
+            {"action": "read", "target": "personal_profile", "consent_status": "not_granted", "actor": "b"},
+            {"action": "read", "target": "public_stats", "consent_status": "not_granted", "actor": "c"},
+        ]
+        results = self.validator.validate_many(requests)
+
+        self.assertEqual([bool(r) for r in results], [True, False, True])
+        self.assertIn("personal_profile", results[1].reason)
+        self.assertEqual(self.validator.get_violation_count(), 1)
+
+        with open(ledger_module.LEDGER_PATH, "r", encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([e["action"] for e in events],
+                         ["consent_validation_passed", "consent_violation_detected", "consent_validation_passed"])
+        self.assertEqual([e["hash"] for e in events], [r.event_hash for r in results])
+        self.assertTrue(ledger_module.verify_chain())
+        self.assertEqual(self.validator.validate_many([]), [])
+
 
 class TestProblemStatementScenario(unittest.TestCase):
     """Test the specific scenario from the problem statement"""
@@ -0,0 +1,151 @@
+"""
+Unit tests for the CERL-Preemptive decision cache
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger, consent_token_manager
+from cerl_preemptive.consent_validator import ConsentValidator, ConsentViolationError
+from cerl_preemptive.decision_cache import DecisionCache
+from cerl_preemptive.policy_engine import PolicyEngine
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+class DecisionCacheTestCase(unittest.TestCase):
+    """Points the ledger and token files at a temporary directory"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ledger_path = os.path.join(self.temp_dir, "ledger.jsonl")
+        self.original_ledger_path = consent_ledger.LEDGER_PATH
+        self.original_tokens = consent_token_manager.TOKENS
+        consent_ledger.LEDGER_PATH = self.ledger_path
+        consent_token_manager.TOKENS = os.path.join(self.temp_dir, "tokens.jsonl")
+        self._stdout = redirect_stdout(StringIO())
+        self._stdout.__enter__()
+
+    def tearDown(self):
+        self._stdout.__exit__(None, None, None)
+        consent_ledger.LEDGER_PATH = self.original_ledger_path
+        consent_token_manager.TOKENS = self.original_tokens
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def read_events(self):
+        with open(self.ledger_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class TestDecisionCache(DecisionCacheTestCase):
+    """Test cases for the LRU cache itself"""
+
+    def test_lru_eviction_and_counters(self):
+        """Test that the least recently used entry is evicted"""
+        cache = DecisionCache(max_entries=2)
+        keys = [cache.key({"target": t}) for t in "abc"]
+        cache.put(keys[0], True, None, "h0")
+        cache.put(keys[1], True, None, "h1")
+        self.assertIsNotNone(cache.get(keys[0]))
+        cache.put(keys[2], True, None, "h2")
+
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[2]).event_hash, "h2")
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "evictions": 1, "invalidations": 0, "size": 2})
+
+    def test_ttl_without_token(self):
+        """Test that untokened entries expire after the TTL"""
+        cache = DecisionCache(ttl=10)
+        key = cache.key({"target": "a"})
+        cache.put(key, True, None, "h", now=100)
+        self.assertIsNotNone(cache.get(key, now=109))
+        self.assertIsNone(cache.get(key, now=110))
+        self.assertEqual(len(cache), 0)
+
+    def test_token_bound_expiry_and_revocation(self):
+        """Test that token-backed entries follow the token's expiry and revocation"""
+        cache = DecisionCache(ttl=1)
+        token = consent_token_manager.issue_token("tester", "read", 1)
+        expiry = consent_token_manager.get_token(token)["expiry"]
+        key = cache.key({"target": "a", "consent_token": token})
+        self.assertTrue(cache.put(key, True, None, "h"))
+        self.assertIsNotNone(cache.get(key, now=time.time() + 60))
+        self.assertIsNone(cache.get(key, now=expiry))
+
+        cache.put(key, True, None, "h")
+        consent_token_manager.revoke_token(token)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+        self.assertFalse(cache.put(key, True, None, "h"))
+        self.assertFalse(cache.put(cache.key({"consent_token": "unknown"}), True, None, "h"))
+
+    def test_revocation_by_other_process(self):
+        """Test that a hit misses once another process revokes the token, even after compaction"""
+        cache = DecisionCache()
+        token = consent_token_manager.issue_token("tester", "read", 1)
+        key = cache.key({"target": "a", "consent_token": token})
+        self.assertTrue(cache.put(key, True, None, "h"))
+        self.assertIsNotNone(cache.get(key))
+
+        code = ("from cerl_preemptive.consent_token_manager import TokenStore; import sys; "
+                "store = TokenStore(sys.argv[1]); store.revoke(sys.argv[2]); store.compact()")
+        subprocess.run([sys.executable, "-c", code, str(consent_token_manager.TOKENS), token], cwd=ROOT,
+                       check=True, capture_output=True, timeout=60)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+        self.assertEqual(len(cache), 0)
+
+
+class TestCachedValidation(DecisionCacheTestCase):
+    """Test cases for ConsentValidator with a decision cache"""
+
+    def test_repeat_requests_log_compact_references(self):
+        """Test that a repeated request is answered from the cache"""
+        validator = ConsentValidator(cache=DecisionCache())
+        request = {"action": "read", "target": "private_data", "consent_status": "granted", "actor": "a"}
+        for _ in range(3):
+            self.assertTrue(validator.validate_request(request))
+
+        events = self.read_events()
+        self.assertEqual([e["action"] for e in events],
+                         ["consent_validation_passed", "consent_decision_cached", "consent_decision_cached"])
+        self.assertEqual(events[1]["payload"]["ref"], events[0]["hash"])
+        self.assertEqual(validator.get_cache_stats()["hits"], 2)
+        self.assertTrue(consent_ledger.verify_chain())
+
+    def test_cached_violation_still_raises(self):
+        """Test that cached denials keep raising and counting"""
+        validator = ConsentValidator(cache=DecisionCache())
+        request = {"target": "personal_data", "consent_status": "not_granted"}
+        for _ in range(2):
+            with self.assertRaises(ConsentViolationError):
+                validator.validate_request(request)
+        self.assertEqual(validator.get_violation_count(), 2)
+        results = validator.validate_many([request, {"target": "public"}])
+        self.assertEqual([bool(r) for r in results], [False, True])
+        self.assertEqual(validator.get_violation_count(), 3)
+
+    def test_policy_reload_misses(self):
+        """Test that decisions made under old rules are not reused"""
+        policy = PolicyEngine()
+        validator = ConsentValidator(policy=policy, cache=DecisionCache())
+        request = {"target": "health_record", "consent_status": "not_granted"}
+        self.assertTrue(validator.validate_request(request))
+        policy.load({"default": {"substrings": ["health"]}})
+        with self.assertRaises(ConsentViolationError):
+            validator.validate_request(request)
+
+
+if __name__ == '__main__':
+    unittest.main()
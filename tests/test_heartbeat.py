@@ -0,0 +1,101 @@
+"""
+Unit tests for the CERL-Preemptive heartbeat
+"""
+
+import unittest
+import sys
+import os
+import io
+import json
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger, heartbeat
+
+
+class HeartbeatTestCase(unittest.TestCase):
+    """Points the ledger module at a temporary file for each test"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "ledger.jsonl")
+        self.original_ledger_path = consent_ledger.LEDGER_PATH
+        consent_ledger.LEDGER_PATH = self.path
+
+    def tearDown(self):
+        consent_ledger.LEDGER_PATH = self.original_ledger_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def read_events(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class TestHeartbeat(HeartbeatTestCase):
+    """Test cases for appending heartbeats"""
+
+    def test_ticks_append_chained_events(self):
+        """Test that each tick appends one verifiable event"""
+        with redirect_stdout(io.StringIO()):
+            heartbeat.heartbeat(interval=0, ticks=3)
+        events = self.read_events()
+        self.assertEqual(len(events), 3)
+        self.assertTrue(all(e["action"] == "ledger_heartbeat" and e["actor"] == "system" for e in events))
+        self.assertEqual(events[1]["prev_hash"], events[0]["hash"])
+        self.assertTrue(consent_ledger.verify_chain(path=self.path))
+
+    def test_heartbeat_only_appends(self):
+        """Test that a tick leaves earlier bytes untouched"""
+        heartbeat.record_heartbeat()
+        with open(self.path, "rb") as f:
+            before = f.read()
+        heartbeat.record_heartbeat()
+        with open(self.path, "rb") as f:
+            self.assertTrue(f.read().startswith(before))
+
+
+class TestLegacyMigration(HeartbeatTestCase):
+    """Test cases for converting a legacy ledger.json array"""
+
+    def write_legacy(self, events, indent=2):
+        legacy = os.path.join(self.temp_dir, "ledger.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump(events, f, indent=indent)
+        return legacy
+
+    def test_iter_across_chunks(self):
+        """Test that elements split across read chunks are decoded"""
+        events = [{"id": str(i), "payload": "x" * (i % 7), "n": i * 1.5} for i in range(50)]
+        legacy = self.write_legacy(events)
+        with open(legacy, "r", encoding="utf-8") as f:
+            self.assertEqual(list(heartbeat.iter_legacy_events(f, chunk_size=7)), events)
+
+    def test_iter_empty_and_malformed(self):
+        """Test empty arrays, empty files and truncated input"""
+        self.assertEqual(list(heartbeat.iter_legacy_events(io.StringIO(" [ ] "))), [])
+        self.assertEqual(list(heartbeat.iter_legacy_events(io.StringIO(""))), [])
+        with self.assertRaises(ValueError):
+            list(heartbeat.iter_legacy_events(io.StringIO('[{"a": 1}, {"b"')))
+        with self.assertRaises(ValueError):
+            list(heartbeat.iter_legacy_events(io.StringIO('{"a": 1}')))
+
+    def test_migrate_legacy(self):
+        """Test that legacy heartbeats become chained events keeping their fields"""
+        legacy_events = [
+            {"id": f"h{i}", "actor": "system", "payload": "ledger_heartbeat", "timestamp": 1700000000 + i}
+            for i in range(5)
+        ]
+        legacy = self.write_legacy(legacy_events)
+        self.assertEqual(heartbeat.migrate_legacy(legacy, batch_size=2), 5)
+        events = self.read_events()
+        self.assertEqual([e["payload"]["migrated"] for e in events], legacy_events)
+        self.assertTrue(all(e["action"] == "ledger_heartbeat" for e in events))
+        self.assertTrue(consent_ledger.verify_chain(path=self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+Unit tests for the CERL-Preemptive ledger sidecar index
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.consent_ledger import LedgerWriter
+from cerl_preemptive.ledger_index import LedgerIndex
+
+
+class TestLedgerIndex(unittest.TestCase):
+    """Test cases for seq/offset and hash lookups"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "test_ledger.jsonl")
+        writer = LedgerWriter(self.path)
+        self.hashes = [writer.append("tester", "event", {"i": i}) for i in range(20)]
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def offsets(self):
+        offsets, pos = [], 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                offsets.append(pos)
+                pos += len(line)
+        return offsets
+
+    def test_writer_maintains_index(self):
+        """Test that appends record every event's offset and hash"""
+        index = LedgerIndex(self.path)
+        self.assertEqual(index.count(), 20)
+        self.assertEqual([index.offset_of(i) for i in range(20)], self.offsets())
+        self.assertEqual(index.seq_of_hash(self.hashes[7]), 7)
+        self.assertIsNone(index.seq_of_hash("f" * 64))
+
+    def test_read_event_and_find_seq(self):
+        """Test random access helpers on consent_ledger"""
+        self.assertEqual(consent_ledger.read_event(12, self.path)["hash"], self.hashes[12])
+        self.assertIsNone(consent_ledger.read_event(20, self.path))
+        self.assertEqual(consent_ledger.find_seq(self.hashes[3], self.path), 3)
+
+    def test_find_seq_past_stale_or_missing_index(self):
+        """Test that find_seq scans events the index does not cover, without writing the index"""
+        writer = LedgerWriter(self.path, index=False, merkle=False)
+        extra = writer.append("tester", "unindexed", {})
+        writer.close()
+        self.assertEqual(consent_ledger.find_seq(extra, self.path), 20)
+        self.assertEqual(consent_ledger.find_seq(self.hashes[19], self.path), 19)
+        self.assertIsNone(consent_ledger.find_seq("f" * 64, self.path))
+
+        os.remove(self.path + ".hidx")
+        self.assertEqual(consent_ledger.find_seq(self.hashes[4], self.path), 4)
+        self.assertEqual(consent_ledger.find_seq(extra, self.path), 20)
+        self.assertFalse(os.path.exists(self.path + ".hidx"))
+
+    def test_missing_index_rebuilt(self):
+        """Test that a deleted index is rebuilt from the ledger"""
+        os.remove(self.path + ".idx")
+        os.remove(self.path + ".hidx")
+        index = LedgerIndex(self.path)
+        index.sync()
+        self.assertEqual([index.offset_of(i) for i in range(20)], self.offsets())
+
+    def test_unindexed_appends_caught_up(self):
+        """Test that events written without the index are indexed on the next sync"""
+        writer = LedgerWriter(self.path, index=False)
+        extra = writer.append("tester", "unindexed", {})
+        writer.close()
+
+        index = LedgerIndex(self.path)
+        self.assertEqual(index.count(), 20)
+        index.sync()
+        self.assertEqual(index.count(), 21)
+        self.assertEqual(index.seq_of_hash(extra), 20)
+
+        writer = LedgerWriter(self.path)
+        self.assertEqual(writer.append_record("tester", "indexed", {})[0], 21)
+        writer.close()
+        self.assertEqual(LedgerIndex(self.path).count(), 22)
+
+    def test_stale_index_rebuilt(self):
+        """Test that an index for different ledger contents is discarded"""
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(lines[5:])
+
+        index = LedgerIndex(self.path)
+        index.sync()
+        self.assertEqual(index.count(), 15)
+        self.assertEqual(index.seq_of_hash(self.hashes[5]), 0)
+        self.assertEqual(json.loads(lines[5])["hash"], self.hashes[5])
+
+    def test_concurrent_hash_lookups(self):
+        """Test that threads sharing one index load its hashes once and still see later appends"""
+        index = LedgerIndex(os.path.join(self.temp_dir, "shared.jsonl"))
+        hashes = [f"{i:064x}" for i in range(20000)]
+        index.add([(seq, seq * 100, {"hash": h}) for seq, h in enumerate(hashes)])
+        barrier = threading.Barrier(8)
+        results = []
+
+        def lookup(n):
+            barrier.wait()
+            results.append(index.seq_of_hash(hashes[n * 1000]))
+
+        threads = [threading.Thread(target=lookup, args=(n,)) for n in range(8)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(sorted(results), [n * 1000 for n in range(8)])
+        self.assertEqual(index._hashes_read, os.path.getsize(index.hash_path))
+        index.add([(20000, 2000000, {"hash": "f" * 64})])
+        self.assertEqual(index.seq_of_hash("f" * 64), 20000)
+        index.close()
+
+
+class TestSecondaryIndexes(unittest.TestCase):
+    """Test cases for actor/action posting lists and the sparse time index"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "test_ledger.jsonl")
+        writer = LedgerWriter(self.path)
+        writer.append_batch([
+            (f"actor{i % 3}", "violation" if i % 5 == 0 else "passed", {"i": i}, None)
+            for i in range(300)
+        ])
+        writer.close()
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.events = [json.loads(line) for line in f]
+        self.index = LedgerIndex(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def matches(self, **filters):
+        return [seq for seq, _ in self.index.iter_matches(**filters)]
+
+    def expected(self, actor=None, action=None, since=None, until=None, after=-1):
+        return [
+            seq for seq, e in enumerate(self.events)
+            if seq > after
+            and (actor is None or e["actor"] == actor)
+            and (action is None or e["action"] == action)
+            and (since is None or e["timestamp"] >= since)
+            and (until is None or e["timestamp"] <= until)
+        ]
+
+    def test_actor_and_action_filters(self):
+        """Test that posting lists return exactly the matching events"""
+        self.assertEqual(self.matches(actor="actor1"), self.expected(actor="actor1"))
+        self.assertEqual(self.matches(actor="actor2", action="violation"),
+                         self.expected(actor="actor2", action="violation"))
+        self.assertEqual(self.matches(actor="nobody"), [])
+
+    def test_time_range(self):
+        """Test that since/until select the events inside the range"""
+        since = self.events[70]["timestamp"]
+        until = self.events[230]["timestamp"]
+        self.assertEqual(self.matches(since=since, until=until), self.expected(since=since, until=until))
+        self.assertEqual(self.matches(action="violation", since=since, after=150),
+                         self.expected(action="violation", since=since, after=150))
+
+    def test_query_skips_non_matching_events(self):
+        """Test that a narrow time range only considers nearby events"""
+        since = self.events[200]["timestamp"]
+        until = self.events[205]["timestamp"]
+        candidates = list(self.index.query(since=since, until=until))
+        self.assertLessEqual(len(candidates), 3 * 64)
+        self.assertTrue(set(self.expected(since=since, until=until)) <= set(candidates))
+
+    def test_secondary_indexes_rebuilt(self):
+        """Test that deleting the secondary indexes triggers a rebuild"""
+        shutil.rmtree(self.path + ".sidx")
+        self.index.sync()
+        self.assertEqual(self.matches(actor="actor0"), self.expected(actor="actor0"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Unit tests for CERL-Preemptive ledger replication
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import audit_trail_api, consent_ledger
+from cerl_preemptive.consent_ledger import LedgerWriter
+from cerl_preemptive.ledger_replica import LedgerFollower, ReplicationError
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def stored_lines(path):
+    return [line for _, line in consent_ledger._iter_lines(path)]
+
+
+class ReplicaTestCase(unittest.TestCase):
+    """Serves a rotated leader ledger of 30 events on an ephemeral port"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.leader_path = os.path.join(self.temp_dir, "leader.jsonl")
+        self.follower_path = os.path.join(self.temp_dir, "follower.jsonl")
+        self.leader = LedgerWriter(self.leader_path, rotate_bytes=3000)
+        self.leader.append_batch([("tester", "event", {"i": i}, None) for i in range(30)])
+
+        self.original_ledger_path = audit_trail_api.LEDGER_PATH
+        audit_trail_api.LEDGER_PATH = self.leader_path
+        self.server = audit_trail_api.BoundedThreadingHTTPServer(("127.0.0.1", 0), audit_trail_api.AuditHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.follower = LedgerFollower(self.url, self.follower_path, batch_size=7, timeout=5)
+
+    def tearDown(self):
+        self.follower.close()
+        self.follower.writer.close()
+        self.leader.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        audit_trail_api.LEDGER_PATH = self.original_ledger_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestCatchUp(ReplicaTestCase):
+    """Test cases for copying the leader's events"""
+
+    def test_copies_events_unchanged(self):
+        """Test that a new follower receives every event, sealed ones included, byte for byte"""
+        self.leader.append("tester", "event", {"i": 30})
+        self.assertTrue(consent_ledger.list_seals(self.leader_path))
+        self.assertEqual(self.follower.sync_once(), 31)
+        self.assertEqual(stored_lines(self.follower_path), stored_lines(self.leader_path))
+        self.assertTrue(consent_ledger.verify_chain(path=self.follower_path))
+        self.assertEqual(consent_ledger.get_merkle(self.follower_path).root(),
+                         consent_ledger.get_merkle(self.leader_path).root())
+
+    def test_only_new_events_sent(self):
+        """Test that later syncs apply just the events the follower lacks"""
+        self.assertEqual(self.follower.sync_once(limit=12), 12)
+        self.assertEqual(self.follower.sync_once(), 18)
+        self.assertEqual(self.follower.sync_once(), 0)
+        self.leader.append_batch([("tester", "event", {"i": i}, None) for i in range(30, 33)])
+        self.assertEqual(self.follower.sync_once(), 3)
+        self.assertEqual(self.follower.writer.head(), self.leader.head())
+
+    def test_long_poll_returns_on_append(self):
+        """Test that a waiting follower receives a new event without waiting out the poll"""
+        self.follower.sync_once()
+        timer = threading.Timer(0.2, self.leader.append, ("tester", "event", {"i": 30}))
+        timer.start()
+        start = time.monotonic()
+        self.assertEqual(self.follower.sync_once(wait=5), 1)
+        self.assertLess(time.monotonic() - start, 2)
+        timer.join()
+
+    def test_follower_process(self):
+        """Test that the command-line follower catches up from a separate process"""
+        subprocess.run([sys.executable, "-m", "cerl_preemptive.ledger_replica", "--leader", self.url,
+                        "--ledger", self.follower_path, "--once"], cwd=ROOT, check=True, capture_output=True,
+                       timeout=60)
+        self.assertEqual(stored_lines(self.follower_path), stored_lines(self.leader_path))
+
+
+class TestRejection(ReplicaTestCase):
+    """Test cases for refusing events that do not belong in the follower's ledger"""
+
+    def test_diverged_follower_stops(self):
+        """Test that a follower with its own events is refused by the leader"""
+        self.follower.sync_once(limit=5)
+        self.follower.writer.append("intruder", "event", {})
+        with self.assertRaises(ReplicationError):
+            self.follower.sync_once()
+
+    def test_tampered_event_not_written(self):
+        """Test that a batch containing a modified event is rejected as a whole"""
+        self.follower.sync_once(limit=28)
+        with open(self.leader_path, "rb") as f:
+            data = f.read()
+        with open(self.leader_path, "wb") as f:
+            f.write(data.replace(b'"i": 29', b'"i": 92', 1))
+        with self.assertRaises(ReplicationError):
+            self.follower.sync_once()
+        self.assertEqual(self.follower.writer.event_count(), 28)
+
+    def test_append_raw_checks_chain(self):
+        """Test that lines which do not chain onto the head are refused"""
+        lines = stored_lines(self.leader_path)
+        writer = LedgerWriter(os.path.join(self.temp_dir, "copy.jsonl"))
+        with self.assertRaises(ValueError):
+            writer.append_raw(lines[1:3])
+        records = writer.append_raw(lines[:3])
+        self.assertEqual([seq for seq, _ in records], [0, 1, 2])
+        with self.assertRaises(ValueError):
+            writer.append_raw(lines[3:4], prev=records[0][1])
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
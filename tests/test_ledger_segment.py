@@ -0,0 +1,155 @@
+"""
+Unit tests for the CERL-Preemptive binary ledger segments
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger, ledger_segment
+from cerl_preemptive.consent_ledger import LedgerWriter
+from cerl_preemptive.ledger_segment import SegmentReader, SegmentWriter
+
+
+class SegmentTestCase(unittest.TestCase):
+    """Builds a JSONL ledger with v1 and v2 lines in a temporary directory"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.jsonl = os.path.join(self.temp_dir, "ledger.jsonl")
+        self.segment = os.path.join(self.temp_dir, "ledger.cerlseg")
+        items = [("tester", "event", {"i": i, "name": "café"}, "tok" if i % 2 else None) for i in range(10)]
+        writer = LedgerWriter(self.jsonl, line_version=1, index=False)
+        writer.append_batch(items[:5])
+        writer.close()
+        writer = LedgerWriter(self.jsonl, index=False)
+        writer.append_batch(items[5:])
+        writer.append("auditor", "consent_violation_detected", {"target": "private_data"})
+        writer.close()
+        with open(self.jsonl, "rb") as f:
+            self.events = [json.loads(line) for line in f]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestConversion(SegmentTestCase):
+    """Test cases for converting between JSONL and segments"""
+
+    def test_round_trip_keeps_hashes(self):
+        """Test that both directions keep every event and hash"""
+        self.assertEqual(ledger_segment.jsonl_to_segment(self.jsonl, self.segment), 11)
+        self.assertLess(os.path.getsize(self.segment), os.path.getsize(self.jsonl) // 2)
+        result = consent_ledger.verify_chain(path=self.segment)
+        self.assertTrue(result)
+        self.assertEqual(result.head, self.events[-1]["hash"])
+
+        back = os.path.join(self.temp_dir, "back.jsonl")
+        self.assertEqual(ledger_segment.segment_to_jsonl(self.segment, back), 11)
+        self.assertTrue(consent_ledger.verify_chain(path=back))
+        with open(back, "rb") as f:
+            self.assertEqual([json.loads(line)["hash"] for line in f], [e["hash"] for e in self.events])
+
+    def test_nonstandard_event_kept_raw(self):
+        """Test that an event with extra fields is stored as its JSONL line"""
+        event = {"timestamp": 1, "id": "legacy-1", "actor": "a", "action": "b", "payload": {},
+                 "consent_token": None, "prev_hash": self.events[-1]["hash"], "extra": True}
+        event["hash"] = consent_ledger._hash(json.dumps(event, sort_keys=True))
+        with open(self.jsonl, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+        self.assertEqual(ledger_segment.jsonl_to_segment(self.jsonl, self.segment), 11)
+        self.assertTrue(consent_ledger.verify_chain(path=self.segment))
+        with SegmentReader(self.segment) as reader:
+            self.assertEqual(list(reader)[-1], event)
+
+    def test_tampered_event_detected(self):
+        """Test that a modified payload fails verification"""
+        ledger_segment.jsonl_to_segment(self.jsonl, self.segment)
+        with open(self.segment, "rb") as f:
+            data = f.read()
+        with open(self.segment, "wb") as f:
+            f.write(data.replace(b'"i": 3', b'"i": 4', 1))
+        result = consent_ledger.verify_chain(path=self.segment)
+        self.assertFalse(result)
+        self.assertEqual(result.seq, 3)
+        self.assertEqual(result.reason, "hash mismatch")
+
+
+class TestSegmentReader(SegmentTestCase):
+    """Test cases for scanning segments"""
+
+    def test_scan_decodes_events(self):
+        """Test that scanned events equal the JSONL events"""
+        ledger_segment.jsonl_to_segment(self.jsonl, self.segment)
+        with SegmentReader(self.segment) as reader:
+            self.assertEqual(list(reader), [{k: v for k, v in e.items() if k != "v"} for e in self.events])
+
+    def test_scan_filters(self):
+        """Test that actor and action filters select matching events only"""
+        ledger_segment.jsonl_to_segment(self.jsonl, self.segment)
+        with SegmentReader(self.segment) as reader:
+            found = list(reader.scan(action="consent_violation_detected"))
+            self.assertEqual([e["hash"] for e in found], [self.events[-1]["hash"]])
+            self.assertEqual(len(list(reader.scan(actor="tester", action="event"))), 10)
+            self.assertEqual(list(reader.scan(actor="nobody")), [])
+
+    def test_rejects_other_files(self):
+        """Test that a JSONL file is not read as a segment"""
+        with self.assertRaises(ValueError):
+            SegmentReader(self.jsonl)
+
+
+class TestSegmentWriter(SegmentTestCase):
+    """Test cases for appending to segments"""
+
+    def test_append_continues_chain(self):
+        """Test that a writer resumes the converted chain and new strings are interned"""
+        ledger_segment.jsonl_to_segment(self.jsonl, self.segment)
+        writer = SegmentWriter(self.segment)
+        self.assertEqual(writer.head(), self.events[-1]["hash"])
+        self.assertEqual(writer.event_count(), 11)
+        seq, event_hash = writer.append_record("service", "consent_validation_passed", {"x": 1}, "tok")
+        writer.append("tester", "event", {"odd": None})
+        writer.close()
+        self.assertEqual(seq, 11)
+        self.assertEqual(consent_ledger.verify_chain(path=self.segment).seq, 13)
+
+        other = SegmentWriter(self.segment)
+        self.assertEqual(other.event_count(), 13)
+        with SegmentReader(self.segment) as reader:
+            self.assertEqual(list(reader)[11]["hash"], event_hash)
+
+    def test_incomplete_record_truncated(self):
+        """Test that a torn final record is dropped before the next append"""
+        writer = SegmentWriter(self.segment)
+        writer.append("a", "b", {})
+        with open(self.segment, "ab") as f:
+            f.write(b"\x40\x00\x00\x00\x01partial")
+        with SegmentReader(self.segment) as reader:
+            self.assertEqual(len(list(reader)), 1)
+        writer.append("a", "b", {})
+        writer.close()
+        self.assertEqual(consent_ledger.verify_chain(path=self.segment).seq, 2)
+
+    def test_append_event_uses_segment_backend(self):
+        """Test that a LEDGER_PATH ending in .cerlseg writes a segment"""
+        original = consent_ledger.LEDGER_PATH
+        consent_ledger.LEDGER_PATH = self.segment
+        try:
+            event_hash = consent_ledger.append_event("tester", "event", {})
+            self.assertIsInstance(consent_ledger.get_writer(), SegmentWriter)
+            self.assertEqual(consent_ledger.verify_chain().head, event_hash)
+        finally:
+            consent_ledger.get_writer().close()
+            consent_ledger._WRITERS.pop(consent_ledger._ledger_key(), None)
+            consent_ledger.LEDGER_PATH = original
+
+
+if __name__ == '__main__':
+    unittest.main()
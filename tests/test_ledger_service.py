@@ -0,0 +1,131 @@
+"""
+Unit tests for multi-process ledger appends
+"""
+
+import unittest
+import sys
+import os
+import json
+import multiprocessing
+import shutil
+import tempfile
+import threading
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger
+from cerl_preemptive.consent_ledger import LedgerWriter
+from cerl_preemptive.ledger_service import LedgerService, LedgerClient
+
+
+def _append_from_process(path, worker, count):
+    writer = LedgerWriter(path)
+    for i in range(count):
+        writer.append(f"process{worker}", "event", {"i": i})
+    writer.close()
+
+
+class TestLedgerService(unittest.TestCase):
+    """Test cases for the Unix socket ledger writer service"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ledger_path = os.path.join(self.temp_dir, "test_ledger.jsonl")
+        self.socket_path = os.path.join(self.temp_dir, "ledger.sock")
+        self.server = LedgerService(self.socket_path, self.ledger_path)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def read_events(self):
+        with open(self.ledger_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_pipelined_appends_return_seq_and_hash(self):
+        """Test that pipelined requests get consecutive sequence numbers"""
+        client = LedgerClient(self.socket_path)
+        records = client.append_records([("tester", "event", {"i": i}, None) for i in range(20)])
+        client.close()
+
+        self.assertEqual([seq for seq, _ in records], list(range(20)))
+        self.assertEqual([h for _, h in records], [e["hash"] for e in self.read_events()])
+
+    def test_many_clients_keep_chain_linear(self):
+        """Test that concurrent clients never fork the chain"""
+        def worker(n):
+            client = LedgerClient(self.socket_path)
+            for i in range(25):
+                client.append(f"client{n}", "event", {"i": i})
+            client.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.read_events()), 150)
+        original = consent_ledger.LEDGER_PATH
+        consent_ledger.LEDGER_PATH = self.ledger_path
+        try:
+            self.assertTrue(consent_ledger.verify_chain())
+        finally:
+            consent_ledger.LEDGER_PATH = original
+
+    def test_remote_writer_routes_append_event(self):
+        """Test that append_event can be routed through the service"""
+        client = LedgerClient(self.socket_path)
+        consent_ledger.set_remote_writer(client, self.ledger_path)
+        original = consent_ledger.LEDGER_PATH
+        consent_ledger.LEDGER_PATH = self.ledger_path
+        try:
+            h = consent_ledger.append_event("tester", "remote", {})
+        finally:
+            consent_ledger.LEDGER_PATH = original
+            consent_ledger.set_remote_writer(None, self.ledger_path)
+            client.close()
+        self.assertEqual(self.read_events()[-1]["hash"], h)
+
+
+@unittest.skipIf(consent_ledger.fcntl is None, "fcntl not available")
+class TestFileLockedAppends(unittest.TestCase):
+    """Test cases for the embedded fcntl lock fallback"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ledger_path = os.path.join(self.temp_dir, "test_ledger.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_processes_share_one_chain(self):
+        """Test that several processes appending directly keep the chain valid"""
+        procs = [
+            multiprocessing.Process(target=_append_from_process, args=(self.ledger_path, n, 50))
+            for n in range(4)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        writer = LedgerWriter(self.ledger_path)
+        self.assertEqual(writer.event_count(), 200)
+        self.assertEqual(writer.append_record("tester", "last", {})[0], 200)
+        writer.close()
+        original = consent_ledger.LEDGER_PATH
+        consent_ledger.LEDGER_PATH = self.ledger_path
+        try:
+            self.assertTrue(consent_ledger.verify_chain())
+        finally:
+            consent_ledger.LEDGER_PATH = original
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Unit tests for the CERL-Preemptive ledger broadcaster
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive.consent_ledger import LedgerWriter
+from cerl_preemptive.ledger_stream import LedgerBroadcaster
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+class TestLedgerBroadcaster(unittest.TestCase):
+    """Test cases for following a ledger and buffering its events"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "ledger.jsonl")
+        self.writer = LedgerWriter(self.path)
+        self.hashes = self.writer.append_batch([("tester", "event", {"i": i}, None) for i in range(5)])
+        self.broadcaster = LedgerBroadcaster(self.path, buffer_events=4, poll_interval=0.02)
+
+    def tearDown(self):
+        self.broadcaster.close()
+        self.writer.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def hashes_of(self, entries):
+        return [json.loads(line)["hash"] for _, line, _, _ in entries]
+
+    def test_starts_at_end(self):
+        """Test that earlier events are not buffered and must be read from the ledger"""
+        self.assertEqual(self.broadcaster.next_seq, 5)
+        self.assertEqual(self.broadcaster.wait_for(4, timeout=0.05), [])
+        with self.assertRaises(LookupError):
+            self.broadcaster.wait_for(3, timeout=0.05)
+
+    def test_in_process_append(self):
+        """Test that an append by this process is published with its sequence number"""
+        new = self.writer.append("tester", "event", {"i": 5})
+        entries = self.broadcaster.wait_for(4, timeout=2)
+        self.assertEqual([(seq, actor, action) for seq, _, actor, action in entries], [(5, "tester", "event")])
+        self.assertEqual(self.hashes_of(entries), [new])
+
+    def test_other_process_append(self):
+        """Test that an append by another process is picked up by polling"""
+        code = ("from cerl_preemptive.consent_ledger import LedgerWriter; import sys; "
+                "print(LedgerWriter(sys.argv[1]).append('other', 'event', {}))")
+        out = subprocess.run([sys.executable, "-c", code, self.path], cwd=ROOT, check=True,
+                             capture_output=True, text=True, timeout=60)
+        self.assertEqual(self.hashes_of(self.broadcaster.wait_for(4, timeout=5)), [out.stdout.strip()])
+
+    def test_buffer_bounded(self):
+        """Test that only the newest events stay buffered"""
+        new = self.writer.append_batch([("tester", "event", {"i": i}, None) for i in range(5, 11)])
+        self.assertEqual(self.hashes_of(self.broadcaster.wait_for(6, timeout=2)), new[2:])
+        with self.assertRaises(LookupError):
+            self.broadcaster.wait_for(5)
+
+    def test_rotation_continues_sequence(self):
+        """Test that events keep their sequence numbers when the ledger rotates"""
+        before = self.writer.append("tester", "event", {"i": 5})
+        self.writer.rotate()
+        after = self.writer.append("tester", "event", {"i": 6})
+        entries = []
+        while len(entries) < 2:
+            entries += self.broadcaster.wait_for(4 + len(entries), timeout=2)
+        self.assertEqual([seq for seq, _, _, _ in entries], [5, 6])
+        self.assertEqual(self.hashes_of(entries), [before, after])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Unit tests for the CERL-Preemptive Merkle accumulator
+"""
+
+import unittest
+import sys
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger, merkle
+from cerl_preemptive.consent_ledger import LedgerWriter
+from cerl_preemptive.merkle import MerkleAccumulator
+
+
+def reference_root(hashes):
+    """Merkle tree hash computed directly from the RFC 6962 definition"""
+    if not hashes:
+        return hashlib.sha256(b"").hexdigest()
+    if len(hashes) == 1:
+        return merkle.leaf_hash(hashes[0]).hex()
+    k = merkle._split(len(hashes))
+    return merkle._node(bytes.fromhex(reference_root(hashes[:k])), bytes.fromhex(reference_root(hashes[k:]))).hex()
+
+
+class MerkleTestCase(unittest.TestCase):
+    """Writes a rotated ledger of 21 events in a temporary directory"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "ledger.jsonl")
+        writer = LedgerWriter(self.path, rotate_bytes=2000)
+        writer.append_batch([("tester", "event", {"i": i}, None) for i in range(5)])
+        for i in range(5, 21):
+            writer.append("tester", "event", {"i": i})
+        writer.close()
+        self.events = [json.loads(line) for _, line in consent_ledger._iter_lines(self.path)]
+        self.hashes = [e["hash"] for e in self.events]
+        self.tree = MerkleAccumulator(self.path)
+
+    def tearDown(self):
+        self.tree.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestAccumulator(MerkleTestCase):
+    """Test cases for maintaining the tree"""
+
+    def test_writer_keeps_tree_current(self):
+        """Test that appends across sealed segments extend the tree to the RFC 6962 root"""
+        self.assertGreater(len(consent_ledger.list_seals(self.path)), 1)
+        self.assertEqual(self.tree.size(), 21)
+        for n in range(22):
+            self.assertEqual(self.tree.root(n), reference_root(self.hashes[:n]))
+
+    def test_id_lookup(self):
+        """Test that event ids resolve to sequence numbers"""
+        self.assertEqual(self.tree.seq_of_id(self.events[13]["id"]), 13)
+        self.assertIsNone(self.tree.seq_of_id("no-such-event"))
+
+    def test_interrupted_update_repaired(self):
+        """Test that missing upper levels and leaves are rebuilt before the next append"""
+        os.truncate(os.path.join(self.tree.directory, "level-01"), 0)
+        os.truncate(os.path.join(self.tree.directory, "level-00"), 32 * 17)
+        self.assertEqual(self.tree.root(), reference_root(self.hashes[:17]))
+        writer = LedgerWriter(self.path)
+        self.hashes.append(writer.append("tester", "event", {}))
+        writer.close()
+        self.assertEqual(self.tree.size(), 22)
+        self.assertEqual(self.tree.root(), reference_root(self.hashes))
+
+    def test_rebuild_replaces_foreign_tree(self):
+        """Test that a tree that does not match the ledger is rebuilt from it"""
+        with open(os.path.join(self.tree.directory, "level-00"), "r+b") as f:
+            f.seek(32 * 20)
+            f.write(b"\0" * 32)
+        writer = LedgerWriter(self.path)
+        writer.append("tester", "event", {})
+        writer.close()
+        self.assertEqual(self.tree.size(), 22)
+        self.assertEqual(self.tree.root(21), reference_root(self.hashes))
+
+    def test_reopened_after_ledger_removed(self):
+        """Test that a closed writer starts a new tree when its ledger and sidecars were deleted"""
+        path = os.path.join(self.temp_dir, "scratch.jsonl")
+        writer = LedgerWriter(path)
+        writer.append("tester", "event", {"i": 0})
+        writer.close()
+        for name in os.listdir(self.temp_dir):
+            if name.startswith("scratch.jsonl"):
+                target = os.path.join(self.temp_dir, name)
+                shutil.rmtree(target) if os.path.isdir(target) else os.remove(target)
+        event_hash = writer.append("tester", "event", {"i": 1})
+        writer.close()
+        self.assertEqual(MerkleAccumulator(path).root(), reference_root([event_hash]))
+
+
+class TestProofs(MerkleTestCase):
+    """Test cases for generating and checking proofs"""
+
+    def test_inclusion_proofs(self):
+        """Test that every event proves against every tree containing it, and only there"""
+        for size in range(1, 22):
+            root = self.tree.root(size)
+            for seq in range(size):
+                proof = self.tree.inclusion_proof(seq, size)
+                self.assertLessEqual(len(proof), size.bit_length())
+                self.assertTrue(merkle.verify_inclusion(self.hashes[seq], seq, size, proof, root))
+                self.assertFalse(merkle.verify_inclusion(self.hashes[seq - 1], seq, size, proof, root)
+                                 if seq else merkle.verify_inclusion(self.hashes[seq], seq, size, proof,
+                                                                     self.tree.root(size - 1)))
+
+    def test_consistency_proofs(self):
+        """Test that every smaller tree proves to be a prefix of every larger one"""
+        for size in range(22):
+            for old in range(size + 1):
+                proof = self.tree.consistency_proof(old, size)
+                self.assertTrue(merkle.verify_consistency(old, size, self.tree.root(old), self.tree.root(size), proof))
+                if 0 < old < size:
+                    forged = reference_root(self.hashes[1:old + 1])
+                    self.assertFalse(merkle.verify_consistency(old, size, forged, self.tree.root(size), proof))
+
+    def test_event_proof_checks_event_body(self):
+        """Test that an event edited after the fact, or not the one asked for, does not verify"""
+        proof = {"seq": 7, "tree_size": 21, "root": self.tree.root(),
+                 "audit_path": self.tree.inclusion_proof(7), "event": self.events[7]}
+        self.assertTrue(merkle.verify_event_proof(proof, expected=self.hashes[7]))
+        self.assertFalse(merkle.verify_event_proof(proof, expected=self.hashes[8]))
+        self.assertFalse(merkle.verify_event_proof(proof, expected=self.events[8]["id"]))
+        proof["event"] = dict(self.events[7], payload={"i": 70})
+        self.assertFalse(merkle.verify_event_proof(proof))
+
+    def test_sizes_out_of_range(self):
+        """Test that proofs for trees larger than the ledger are refused"""
+        with self.assertRaises(ValueError):
+            self.tree.root(22)
+        with self.assertRaises(ValueError):
+            self.tree.inclusion_proof(21)
+        with self.assertRaises(ValueError):
+            self.tree.consistency_proof(5, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
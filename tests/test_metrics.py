@@ -0,0 +1,162 @@
+"""
+Unit tests for CERL-Preemptive metrics
+"""
+
+import unittest
+import sys
+import os
+import asyncio
+import gc
+import shutil
+import tempfile
+import threading
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive import consent_ledger, metrics
+from cerl_preemptive.consent_validator import ConsentValidator, ConsentViolationError, VIOLATIONS
+
+VIOLATING_REQUEST = {
+    "action": "access_user_data",
+    "target": "private_data",
+    "purpose": "marketing",
+    "consent_status": "not_granted",
+    "urgency": "none",
+    "potential_harm": "privacy_violation",
+    "actor": "tester",
+}
+
+
+def run_threads(target, count=8):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+class TestCounter(unittest.TestCase):
+    """Test cases for per-thread counters"""
+
+    def test_threads_add_up(self):
+        """Test that increments from many threads are all counted, after the threads exit too"""
+        counter = metrics.counter("test_threads_total", "Test counter")
+
+        def work():
+            for _ in range(1000):
+                counter.inc()
+
+        run_threads(work)
+        gc.collect()
+        self.assertEqual(counter.value(), 8000)
+        counter.inc(5)
+        self.assertEqual(counter.value(), 8005)
+
+    def test_same_name_same_metric(self):
+        """Test that registering a name twice returns the same metric, and a clash of kinds fails"""
+        self.assertIs(metrics.counter("test_same_total", "Test", kind="a"),
+                      metrics.counter("test_same_total", "Test", kind="a"))
+        self.assertIsNot(metrics.counter("test_same_total", "Test", kind="a"),
+                         metrics.counter("test_same_total", "Test", kind="b"))
+        with self.assertRaises(ValueError):
+            metrics.histogram("test_same_total", "Test")
+
+
+class TestHistogram(unittest.TestCase):
+    """Test cases for latency histograms and their Prometheus rendering"""
+
+    def test_buckets_rendered_cumulatively(self):
+        """Test that observations land in the first bucket they fit and render as running totals"""
+        hist = metrics.histogram("test_latency_seconds", "Test histogram", operation="x")
+        for seconds in (0.00001, 0.0003, 0.0003, 20.0):
+            hist.observe(seconds)
+        text = metrics.render()
+        self.assertIn("# TYPE test_latency_seconds histogram", text)
+        self.assertIn('test_latency_seconds_bucket{operation="x",le="1e-05"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{operation="x",le="0.00025"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{operation="x",le="0.0005"} 3', text)
+        self.assertIn('test_latency_seconds_bucket{operation="x",le="10.0"} 3', text)
+        self.assertIn('test_latency_seconds_bucket{operation="x",le="+Inf"} 4', text)
+        self.assertIn('test_latency_seconds_count{operation="x"} 4', text)
+        self.assertEqual(hist.count(), 4)
+
+    def test_timed_records_failures(self):
+        """Test that `timed` records calls that raise, and awaits coroutines"""
+        @metrics.timed("test_fails")
+        def fails():
+            raise KeyError("x")
+
+        @metrics.timed("test_coroutine")
+        async def coroutine():
+            await asyncio.sleep(0.01)
+            return 7
+
+        with self.assertRaises(KeyError):
+            fails()
+        self.assertEqual(metrics.operation("test_fails").count(), 1)
+        self.assertEqual(asyncio.run(coroutine()), 7)
+        hist = metrics.operation("test_coroutine")
+        self.assertEqual(hist.count(), 1)
+        self.assertIn('cerl_operation_seconds_bucket{operation="test_coroutine",le="0.005"} 0', metrics.render())
+
+    def test_disabled_records_nothing(self):
+        """Test that nothing is recorded while metrics are switched off"""
+        hist = metrics.operation("test_disabled")
+        timed = metrics.timed("test_disabled")(lambda: 1)
+        metrics.set_enabled(False)
+        try:
+            self.assertEqual(timed(), 1)
+            hist.observe(0.1)
+            self.assertIn("cerl_metrics_enabled 0", metrics.render())
+        finally:
+            metrics.set_enabled(True)
+        self.assertEqual(hist.count(), 0)
+        self.assertEqual(timed(), 1)
+        self.assertEqual(hist.count(), 1)
+
+
+class TestValidatorMetrics(unittest.TestCase):
+    """Test cases for the validator's violation counts"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.original_ledger_path = consent_ledger.LEDGER_PATH
+        consent_ledger.LEDGER_PATH = os.path.join(self.temp_dir, "ledger.jsonl")
+
+    def tearDown(self):
+        consent_ledger.LEDGER_PATH = self.original_ledger_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_violation_count_shared_between_threads(self):
+        """Test that violations found by one validator in many threads are all counted"""
+        validator = ConsentValidator()
+        before = VIOLATIONS.value()
+        requests = metrics.operation("validate_request").count()
+
+        def work():
+            for _ in range(25):
+                with self.assertRaises(ConsentViolationError):
+                    validator.validate_request(VIOLATING_REQUEST)
+
+        run_threads(work)
+        self.assertEqual(validator.get_violation_count(), 200)
+        self.assertEqual(VIOLATIONS.value(), before + 200)
+        self.assertEqual(metrics.operation("validate_request").count(), requests + 200)
+
+    def test_violation_count_kept_when_disabled(self):
+        """Test that the validator's own count does not depend on metrics being on and can be reset"""
+        validator = ConsentValidator()
+        metrics.set_enabled(False)
+        try:
+            with self.assertRaises(ConsentViolationError):
+                validator.validate_request(VIOLATING_REQUEST)
+        finally:
+            metrics.set_enabled(True)
+        self.assertEqual(validator.violation_count, 1)
+        validator.violation_count = 0
+        self.assertEqual(validator.get_violation_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
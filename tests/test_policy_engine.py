@@ -0,0 +1,152 @@
+"""
+Unit tests for the CERL-Preemptive policy engine
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cerl_preemptive.policy_engine import PolicyEngine, PolicyError, _Automaton
+from cerl_preemptive.consent_validator import ConsentValidator, ConsentViolationError
+
+
+class TestAutomaton(unittest.TestCase):
+    """Test cases for the Aho-Corasick matcher"""
+
+    def test_matches_like_substring_search(self):
+        """Test that the automaton agrees with `in` on overlapping words"""
+        words = ["he", "she", "his", "hers", "ushers", "pri", "private", "ate"]
+        automaton = _Automaton(words)
+        for text in ["ushers", "ahishers", "private_data", "xyz", "sh", "h", "", "privat", "late"]:
+            found = automaton.search(text)
+            expected = any(w in text for w in words)
+            self.assertEqual(found is not None, expected, text)
+            if found is not None:
+                self.assertIn(found, text)
+
+
+class TestPolicyEngine(unittest.TestCase):
+    """Test cases for rule sets, tenants and reloading"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "policy.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_policy(self, config):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+
+    def test_default_rules(self):
+        """Test that the defaults keep the private/personal behaviour"""
+        engine = PolicyEngine()
+        self.assertTrue(engine.is_sensitive("Private_Data"))
+        self.assertTrue(engine.is_sensitive("user_PERSONAL_info"))
+        self.assertFalse(engine.is_sensitive("public_stats"))
+
+    def test_rule_kinds_and_tenants(self):
+        """Test substrings, patterns and exact targets per tenant"""
+        engine = PolicyEngine({
+            "default": {"substrings": ["private"]},
+            "tenants": {
+                "clinic": {"substrings": ["diagnosis"], "patterns": [r"^patient-\d+$"], "exact": ["Records"]},
+                "isolated": {"substrings": ["secret"], "inherit": False},
+            },
+        })
+        self.assertEqual(engine.match("lab_diagnosis", "clinic"), "substring:diagnosis")
+        self.assertEqual(engine.match("PATIENT-42", "clinic"), "pattern:PATIENT-42")
+        self.assertEqual(engine.match("records", "clinic"), "exact:records")
+        self.assertFalse(engine.is_sensitive("records_archive", "clinic"))
+        self.assertTrue(engine.is_sensitive("private_notes", "clinic"))
+        self.assertFalse(engine.is_sensitive("private_notes", "isolated"))
+        self.assertFalse(engine.is_sensitive("lab_diagnosis"))
+        self.assertTrue(engine.is_sensitive("private_notes", "unknown-tenant"))
+
+    def test_invalid_rules_rejected(self):
+        """Test that bad configurations raise PolicyError and keep the old rules"""
+        engine = PolicyEngine()
+        for config in ({"default": {"patterns": ["("]}}, {"default": {"regex": []}},
+                       {"default": {"substrings": [1]}}, []):
+            with self.assertRaises(PolicyError):
+                engine.load(config)
+        self.assertTrue(engine.is_sensitive("private_data"))
+
+    def test_hot_reload(self):
+        """Test that a changed file is picked up and a broken one is not"""
+        self.write_policy({"default": {"substrings": ["private"]}})
+        engine = PolicyEngine(path=self.path)
+        self.assertFalse(engine.reload_if_changed())
+        self.assertFalse(engine.is_sensitive("health_record"))
+
+        self.write_policy({"default": {"substrings": ["health"]}})
+        os.utime(self.path, ns=(0, 10 ** 18))
+        self.assertTrue(engine.reload_if_changed())
+        self.assertTrue(engine.is_sensitive("health_record"))
+        self.assertFalse(engine.is_sensitive("private_data"))
+
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        os.utime(self.path, ns=(0, 2 * 10 ** 18))
+        with self.assertRaises(PolicyError):
+            engine.reload_if_changed()
+        self.assertTrue(engine.is_sensitive("health_record"))
+
+    def test_swap_is_atomic_under_concurrent_matching(self):
+        """Test that readers never see a half-loaded rule table"""
+        engine = PolicyEngine({"default": {"substrings": ["a"]}, "tenants": {"t": {"substrings": ["b"]}}})
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            while not stop.is_set():
+                if not engine.is_sensitive("b", "t"):
+                    errors.append("tenant rules missing")
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for i in range(200):
+            engine.load({"default": {"substrings": [f"x{i}"]}, "tenants": {"t": {"substrings": ["b"]}}})
+        stop.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+
+class TestValidatorPolicy(unittest.TestCase):
+    """Test cases for ConsentValidator with a custom policy"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        import cerl_preemptive.consent_ledger as ledger_module
+        self.original_ledger_path = ledger_module.LEDGER_PATH
+        ledger_module.LEDGER_PATH = os.path.join(self.temp_dir, "test_ledger.jsonl")
+
+    def tearDown(self):
+        import cerl_preemptive.consent_ledger as ledger_module
+        ledger_module.LEDGER_PATH = self.original_ledger_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_tenant_rules_apply(self):
+        """Test that the request's tenant selects its rule set"""
+        validator = ConsentValidator(PolicyEngine({
+            "default": {"substrings": ["private"]},
+            "tenants": {"clinic": {"exact": ["lab_results"]}},
+        }))
+        request = {"target": "lab_results", "consent_status": "not_granted"}
+        self.assertTrue(validator.validate_request(request))
+        with self.assertRaises(ConsentViolationError):
+            validator.validate_request({**request, "tenant": "clinic"})
+
+
+if __name__ == '__main__':
+    unittest.main()